@@ -0,0 +1,327 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from context import Context  # noqa: E402
+from decision_maker import DecisionMaker  # noqa: E402
+from inventory import Inventory  # noqa: E402
+from models import AirportTables, FlightRecord  # noqa: E402
+from parser import Parser  # noqa: E402
+from simulator import Simulator  # noqa: E402
+from snapshot import TABLE_FIELDS  # noqa: E402
+from state import State  # noqa: E402
+from utils import CLASS_KEYS, DATA_DIR  # noqa: E402
+
+"""
+Microbenchmarks for the round hot paths, at the bundled size and at
+synthetic multiples of it.
+
+A world at scale k is the bundled network copied k times (k hubs, k * 161
+airports, k * ~7.3k flights, every copy with its own ids). Each case is
+timed call by call while a session is driven against the local simulator:
+
+    process          Inventory.process (State.init_update_state)
+    make_decision    DecisionMaker.make_decision
+    to_dict          HourRequestDto.to_dict
+    update_state     State.update_state (flight updates, retiring landed flights)
+    insert_processing  Inventory.insert_processing, random landings
+
+The timed session runs `--repeat` times and each case keeps its fastest
+pass (by median). A separate traced pass gives the peak memory allocated during a single call.
+Results are compared with benchmarks/baseline.json; any case whose median
+latency grows by more than the threshold, plus `--slack-us` so timer noise
+on cases of a few microseconds does not count, makes the run fail. A fixed
+calibration workload is timed with every run and stored with the baseline:
+the baseline is scaled by how much slower or faster the machine is today,
+so a busy host does not read as a regression.
+
+    python benchmarks/run.py                     # 1x and 10x, compare
+    python benchmarks/run.py --scales 1,10,100 --rounds 24
+    python benchmarks/run.py --save-baseline     # after an intended change
+"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def scaled_world(scale: int):
+    # (context, flight records) of the bundled network copied `scale` times
+    base = Context()
+    records = Parser().parse_flights(os.path.join(DATA_DIR, "flights.csv"))
+    if scale == 1:
+        return base, records
+
+    airports = sorted(base.airport_dict.values(), key=lambda airport: airport.index)
+    ids, codes, names = [], [], []
+    for copy in range(scale):
+        suffix = f"~{copy}" if copy else ""
+        ids += [airport.id + suffix for airport in airports]
+        codes += [airport.code + suffix for airport in airports]
+        names += [airport.name + suffix for airport in airports]
+    tables = AirportTables(
+        **{name: np.tile(getattr(base.tables, name), (scale, 1)) for name in TABLE_FIELDS}
+    )
+    context = Context.from_tables(base.aircraft_dict, ids, codes, names, tables)
+
+    scaled = list(records)
+    for copy in range(1, scale):
+        suffix = f"~{copy}"
+        for r in records:
+            scaled.append(
+                FlightRecord(
+                    r.flight_id + suffix,
+                    r.flight_number + suffix,
+                    r.origin_airport_id + suffix,
+                    r.destination_airport_id + suffix,
+                    r.aircraft_type_id,
+                    r.departure,
+                    r.arrival,
+                    r.distance,
+                    r.planned_passengers,
+                    r.actual_passengers,
+                )
+            )
+    return context, scaled
+
+
+def fresh_context(context: Context) -> Context:
+    # shared parameters, private stock
+    return context.with_stock()
+
+
+def drive_session(context, simulator, rounds: int, observe: Callable) -> None:
+    # one session, every hot-path call goes through observe(case, fn, *args)
+    session = simulator.new_session()
+    state = State(fresh_context(context))
+    decision_maker = DecisionMaker(state.context)
+    for _ in range(rounds):
+        observe("process", state.init_update_state)
+        decision = observe("make_decision", decision_maker.make_decision, state)
+        body = observe("to_dict", decision.to_dict)
+        response = session.play_round(body)
+        observe("update_state", state.update_state, response)
+
+
+def drive_inserts(context, calls: int, observe: Callable, seed: int = 7) -> None:
+    inventory = Inventory(fresh_context(context))
+    rng = random.Random(seed)
+    codes = inventory.context.airport_codes
+    longest = int(context.processing_time.max())
+    for i in range(calls):
+        hour = rng.randrange(inventory.horizon - longest)
+        observe(
+            "insert_processing",
+            inventory.insert_processing,
+            hour,
+            rng.randrange(1, 50),
+            CLASS_KEYS[i % len(CLASS_KEYS)],
+            rng.choice(codes),
+        )
+
+
+def timed_pass(run: Callable[[Callable], None]) -> Dict[str, List[int]]:
+    samples: Dict[str, List[int]] = {}
+
+    def observe(case, fn, *args):
+        start = time.perf_counter_ns()
+        result = fn(*args)
+        samples.setdefault(case, []).append(time.perf_counter_ns() - start)
+        return result
+
+    # like timeit: a collection landing in one call is noise, not its cost
+    gc.collect()
+    gc.disable()
+    try:
+        run(observe)
+    finally:
+        gc.enable()
+    return samples
+
+
+def traced_pass(run: Callable[[Callable], None]) -> Dict[str, int]:
+    # peak bytes allocated during one call, worst call per case
+    peaks: Dict[str, int] = {}
+
+    def observe(case, fn, *args):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = fn(*args)
+        peak = tracemalloc.get_traced_memory()[1] - before
+        peaks[case] = max(peaks.get(case, 0), peak)
+        return result
+
+    tracemalloc.start()
+    try:
+        run(observe)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def summarize(samples: List[int], peak: int) -> dict:
+    ns = np.array(samples, dtype=np.float64)
+    return {
+        "calls": len(samples),
+        "ops_per_s": round(len(samples) / (ns.sum() / 1e9), 1),
+        "p50_us": round(float(np.percentile(ns, 50)) / 1000, 2),
+        "p95_us": round(float(np.percentile(ns, 95)) / 1000, 2),
+        "p99_us": round(float(np.percentile(ns, 99)) / 1000, 2),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def best_of(run: Callable[[Callable], None], repeat: int) -> Dict[str, List[int]]:
+    # per case, the pass with the lowest median: noise only ever adds time
+    best: Dict[str, List[int]] = {}
+    for _ in range(repeat):
+        for case, values in timed_pass(run).items():
+            if case not in best or np.median(values) < np.median(best[case]):
+                best[case] = values
+    return best
+
+
+def run_scale(scale: int, rounds: int, inserts: int, repeat: int) -> Dict[str, dict]:
+    context, records = scaled_world(scale)
+    simulator = Simulator(context=context, records=records)
+
+    def session(observe):
+        drive_session(context, simulator, rounds, observe)
+
+    def insert(observe):
+        drive_inserts(context, inserts, observe)
+
+    samples = {**best_of(session, repeat), **best_of(insert, repeat)}
+    peaks = {**traced_pass(session), **traced_pass(insert)}
+    return {
+        f"{case}@{scale}x": summarize(values, peaks.get(case, 0))
+        for case, values in samples.items()
+    }
+
+
+def calibrate(repeat: int = 15) -> float:
+    # median us of a fixed mix of Python and small-array NumPy work, the
+    # kind the hot paths do
+    rng = np.random.default_rng(0)
+    matrix = rng.integers(0, 100, (160, 4))
+    rows = [list(range(8)) for _ in range(200)]
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(20):
+            total = matrix.copy()
+            total += matrix
+            np.flatnonzero(total[:, 0] > 50)
+            {str(i): row[:] for i, row in enumerate(rows)}
+        samples.append(time.perf_counter_ns() - start)
+    return float(np.median(samples)) / 1000
+
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    threshold: float,
+    slack_us: float,
+    speed: float = 1.0,
+) -> List[str]:
+    # `speed`: calibration time now / at the baseline, the baseline is scaled by it
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        expected = reference["p50_us"] * speed
+        ratio = result["p50_us"] / expected if expected else 1.0
+        if result["p50_us"] > expected * (1 + threshold) + slack_us:
+            regressions.append(
+                f"{key}: p50 {expected:.2f} (machine-adjusted) -> {result['p50_us']} us"
+                f" ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Round hot-path benchmarks")
+    arg_parser.add_argument("--scales", default="1,10", help="comma separated, e.g. 1,10,100")
+    arg_parser.add_argument("--rounds", type=int, default=72)
+    arg_parser.add_argument("--inserts", type=int, default=20000)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed passes per case")
+    arg_parser.add_argument(
+        "--threshold", type=float, default=0.5, help="allowed median slowdown, 0.5 = +50%%"
+    )
+    arg_parser.add_argument(
+        "--slack-us", type=float, default=10.0, help="absolute median slowdown always allowed"
+    )
+    arg_parser.add_argument("--save-baseline", action="store_true")
+    arg_parser.add_argument("--out", help="also write the results to this JSON file")
+    args = arg_parser.parse_args()
+
+    calibration = calibrate()
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        start = time.perf_counter()
+        results.update(run_scale(scale, args.rounds, args.inserts, args.repeat))
+        print(f"scale {scale}x done in {time.perf_counter() - start:.1f} s")
+
+    print(f"{'case':<28}{'ops/s':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'peak KB':>10}")
+    for key, r in results.items():
+        print(
+            f"{key:<28}{r['ops_per_s']:>12,.0f}{r['p50_us']:>10}{r['p95_us']:>10}"
+            f"{r['p99_us']:>10}{r['peak_kb']:>10}"
+        )
+
+    # again after the cases, the machine's load changes while they run
+    calibration = min(calibration, calibrate())
+    print(f"calibration {calibration:.1f} us")
+    report = {
+        "machine": platform.platform(),
+        "python": platform.python_version(),
+        "rounds": args.rounds,
+        "calibration_us": calibration,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE):
+            with open(BASELINE) as f:
+                baseline = json.load(f).get("results", {})
+        baseline.update(results)
+        report["results"] = baseline
+        with open(BASELINE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {BASELINE}")
+        return
+
+    if not os.path.exists(BASELINE):
+        print("No baseline yet, run with --save-baseline.")
+        return
+    with open(BASELINE) as f:
+        saved = json.load(f)
+    # baselines saved before calibration existed are compared as they are
+    speed = calibration / saved["calibration_us"] if "calibration_us" in saved else 1.0
+    print(f"machine speed vs baseline: {speed:.2f}x the time")
+    regressions = compare(results, saved["results"], args.threshold, args.slack_us, speed)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%} + {args.slack_us:g} us:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regression beyond {args.threshold:.0%} + {args.slack_us:g} us of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
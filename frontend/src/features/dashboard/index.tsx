@@ -10,7 +10,8 @@ import {
   XAxis,
   YAxis,
 } from "recharts";
-import { useQuery } from "@tanstack/react-query";
+import { useEffect } from "react";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
 import {
   AlertTriangle,
   ArrowDownRight,
@@ -24,7 +25,12 @@ import { Badge } from "@/components/ui/badge";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { Skeleton } from "@/components/ui/skeleton";
 import { useScenario } from "@/context/scenario-context";
-import { fetchDashboard } from "@/lib/api";
+import {
+  fetchDashboard,
+  liveDashboard,
+  liveFeedEnabled,
+  subscribeLive,
+} from "@/lib/api";
 import { formatCost, formatNumber } from "@/lib/utils";
 import type {
   DashboardPayload,
@@ -387,11 +393,20 @@ function LoadingState() {
 
 function DashboardPage() {
   const { scenarioId } = useScenario();
+  const queryClient = useQueryClient();
   const { data, isLoading, isError } = useQuery({
     queryKey: ["dashboard", scenarioId],
     queryFn: () => fetchDashboard(scenarioId),
   });
 
+  // every round of a live run replaces the cached payload
+  useEffect(() => {
+    if (!liveFeedEnabled) return;
+    return subscribeLive((snapshot) =>
+      queryClient.setQueryData(["dashboard", scenarioId], liveDashboard(snapshot)),
+    );
+  }, [queryClient, scenarioId]);
+
   if (isError) {
     return (
       <Card className="glass">
@@ -12,6 +12,9 @@ import type {
   DashboardPayload,
   FlightFilter,
   FlightRow,
+  LiveRound,
+  LiveSnapshot,
+  NetworkNode,
   Scenario,
   SimulationResult,
   StrategyParams,
@@ -20,6 +23,12 @@ import type {
 
 const wait = (ms = 220) => new Promise((resolve) => setTimeout(resolve, ms));
 
+// a running bot started with FEED_PORT, e.g. VITE_LIVE_FEED_URL=http://localhost:8765
+const LIVE_FEED_URL: string | undefined = import.meta.env.VITE_LIVE_FEED_URL;
+export const liveFeedEnabled = Boolean(LIVE_FEED_URL);
+
+const sum = (values: number[]) => values.reduce((total, value) => total + value, 0);
+
 const fuzzyMatch = (value: number, range?: [number, number]) => {
   if (!range) return true;
   return value >= range[0] && value <= range[1];
@@ -38,10 +47,113 @@ export async function fetchScenarioSummary(id: string): Promise<StrategySummary>
 export async function fetchDashboard(
   scenarioId: string,
 ): Promise<DashboardPayload> {
+  if (LIVE_FEED_URL) {
+    return liveDashboard(await fetchLiveSnapshot());
+  }
   await wait();
   return buildDashboardPayload(scenarioId);
 }
 
+export async function fetchLiveSnapshot(): Promise<LiveSnapshot> {
+  const response = await fetch(`${LIVE_FEED_URL}/live/snapshot`);
+  if (!response.ok) {
+    throw new Error(`Live feed: ${response.status}`);
+  }
+  return response.json();
+}
+
+// applies the round deltas to the last snapshot, returns the unsubscribe
+export function subscribeLive(
+  onUpdate: (snapshot: LiveSnapshot) => void,
+): () => void {
+  const source = new EventSource(`${LIVE_FEED_URL}/live/stream`);
+  let current: LiveSnapshot | null = null;
+
+  source.addEventListener("snapshot", (event) => {
+    current = JSON.parse(event.data) as LiveSnapshot;
+    onUpdate(current);
+  });
+  source.addEventListener("round", (event) => {
+    if (!current) return;
+    const round = JSON.parse(event.data) as LiveRound;
+    current = {
+      ...current,
+      ...round,
+      stock: { ...current.stock, ...round.stock },
+      history: [
+        ...current.history,
+        {
+          round: round.round ?? 0,
+          totalCost: round.totalCost,
+          penaltyCost: round.penaltyCost,
+        },
+      ],
+    };
+    onUpdate(current);
+  });
+  return () => source.close();
+}
+
+export function liveDashboard(
+  snapshot: LiveSnapshot,
+  maxNodes = 24,
+): DashboardPayload {
+  const airports = Object.keys(snapshot.stock).map((code) => {
+    const stock = sum(snapshot.stock[code]);
+    const capacity = sum(snapshot.capacity[code] ?? []);
+    return { code, stock, capacity };
+  });
+  // the busiest airports, on a circle
+  const shown = airports
+    .sort((a, b) => b.stock - a.stock)
+    .slice(0, maxNodes);
+  const nodes = shown.map((airport, index): NetworkNode => {
+    const angle = (2 * Math.PI * index) / shown.length;
+    const fill = airport.capacity ? airport.stock / airport.capacity : 0;
+    return {
+      code: airport.code,
+      name: `Airport ${airport.code}`,
+      region: index === 0 ? "Core" : "Regional",
+      stock: airport.stock,
+      capacity: airport.capacity,
+      imbalance: airport.stock - airport.capacity,
+      x: 0.5 + 0.42 * Math.cos(angle),
+      y: 0.5 + 0.42 * Math.sin(angle),
+      risk: fill > 1 ? "high" : fill < 0.1 ? "medium" : "low",
+    };
+  });
+
+  return {
+    kpis: [
+      { label: "Total cost", value: snapshot.totalCost, unit: "cost" },
+      { label: "Penalty cost", value: snapshot.penaltyCost, unit: "cost" },
+      { label: "Flights loaded", value: snapshot.flightsLoaded },
+      { label: "Round", value: snapshot.round ?? 0, helper: "of 720" },
+    ],
+    costSeries: snapshot.history.map((point) => ({
+      round: point.round,
+      operational: point.totalCost - point.penaltyCost,
+      penalty: point.penaltyCost,
+      total: point.totalCost,
+    })),
+    penaltyBreakdown: Object.entries(snapshot.penalties).map(([code, penalty]) => ({
+      type: code,
+      value: penalty.cost,
+    })),
+    network: { nodes, edges: [] },
+    strategy: {
+      title: "Live run",
+      description: "Streamed from the running bot.",
+      chips: snapshot.classes,
+      rules: [],
+    },
+    highlight: `${Object.values(snapshot.penalties).reduce(
+      (total, penalty) => total + penalty.count,
+      0,
+    )} penalties so far.`,
+  };
+}
+
 export async function fetchFlights(
   filters?: FlightFilter,
 ): Promise<FlightRow[]> {
@@ -128,3 +128,31 @@ export type SimulationResult = {
   penaltyBreakdown: PenaltySlice[];
   insight: string;
 };
+
+// live feed of a running bot, see src/feed.py
+export type LivePenalty = {
+  count: number;
+  cost: number;
+};
+
+export type LiveHistoryPoint = {
+  round: number;
+  totalCost: number;
+  penaltyCost: number;
+};
+
+export type LiveRound = {
+  round: number | null;
+  totalCost: number;
+  penaltyCost: number;
+  penalties: Record<string, LivePenalty>;
+  flightsLoaded: number;
+  // only the airports whose stock changed, per class in `classes` order
+  stock: Record<string, number[]>;
+};
+
+export type LiveSnapshot = LiveRound & {
+  classes: string[];
+  history: LiveHistoryPoint[];
+  capacity: Record<string, number[]>;
+};
@@ -1,50 +1,69 @@
-import requests
+from concurrent.futures import Future
+from metrics import Metrics
 from models import HourRequestDto
+from transport import RequestsTransport
 
 # ApiClient = interact with the API, start/end sessions, play a round
 
 class ApiClient:
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, transport=None, metrics=None):
         self.base_url = base_url
         self.api_key = api_key
         self.session_id = None
-        self._session = requests.Session()
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.metrics = metrics if metrics is not None else Metrics()
+        # headers only change when the session starts
+        self._headers = {"API-KEY": self.api_key}
 
     def _get_headers(self):
-        headers = {"API-KEY": self.api_key}
-        if self.session_id:
-            headers["SESSION-ID"] = self.session_id
-        return headers
+        return self._headers
 
     def start_session(self) -> str:
         url = f"{self.base_url}/api/v1/session/start"
-        headers = {"API-KEY": self.api_key}
-        response = self._session.post(url, headers=headers)
+        response = self.transport.submit(url, {"API-KEY": self.api_key}).result()
         response.raise_for_status()
         self.session_id = response.text
+        self._headers = {"API-KEY": self.api_key, "SESSION-ID": self.session_id}
         print(f"Session started: {self.session_id}")
         return self.session_id
 
-    def play_round(self, hour_request: HourRequestDto) -> dict:
+    def resume_session(self, session_id: str) -> None:
+        # continue a session started by an earlier process
+        self.session_id = session_id
+        self._headers = {"API-KEY": self.api_key, "SESSION-ID": self.session_id}
+
+    def send_round(self, hour_request: HourRequestDto) -> Future:
+        # returns as soon as the request is handed to the transport,
+        # collect the answer with receive_round()
         if not self.session_id:
             raise Exception("Session not started. Call start_session() first.")
 
         url = f"{self.base_url}/api/v1/play/round"
 
-        request_body = hour_request.to_dict()
+        with self.metrics.phase("encode"):
+            request_body = hour_request.to_dict()
 
-        response = self._session.post(
-            url, headers=self._get_headers(), json=request_body
-        )
-        response.raise_for_status()
-        return response.json()
+        with self.metrics.phase("send"):
+            return self.transport.submit(url, self._get_headers(), request_body)
+
+    def receive_round(self, pending: Future) -> dict:
+        with self.metrics.phase("receive"):
+            response = pending.result()
+            response.raise_for_status()
+            return response.json()
+
+    def play_round(self, hour_request: HourRequestDto) -> dict:
+        return self.receive_round(self.send_round(hour_request))
 
     def end_session(self) -> dict:
         if not self.session_id:
             raise Exception("Session not started.")
 
         url = f"{self.base_url}/api/v1/session/end"
-        response = self._session.post(url, headers=self._get_headers())
+        response = self.transport.submit(url, self._get_headers()).result()
         response.raise_for_status()
         print("Session ended.")
         return response.json()
+
+    def close(self) -> None:
+        self.transport.close()
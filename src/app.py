@@ -1,86 +1,296 @@
+import asyncio
 import os
-from typing import Dict
+from typing import Dict, Optional
 import requests
 from dotenv import load_dotenv
 from api_client import ApiClient
+from archive import FlightArchive
+from checkpoint import Checkpoint, Checkpointer, load_checkpoint
+from transport import is_connection_error, make_transport
 from models import *
 
 from dataclasses import dataclass
 from state import State
 from context import Context
 from decision_maker import DecisionMaker
+from feed import LiveFeed
+from metrics import Metrics
+from replay import RecordingTransport
+from utils import DATA_DIR
 
 """
 Main app class.
 """
 
-DATA_DIR = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"
-)
-
 
 @dataclass
 class App:
     context: Context = field(default_factory=Context)
     state: State = field(init=False)
     decisionMaker: DecisionMaker = field(init=False)
+    # connects through .env settings when not given
+    client: Optional[ApiClient] = None
+    # per-phase timers, METRICS=1 in .env turns them on
+    metrics: Optional[Metrics] = None
+    # where the round log / snapshots go, None = no checkpoints
+    checkpoint_dir: Optional[str] = None
+    # per-round KPIs for the frontend, FEED_PORT in .env starts one
+    feed: Optional[LiveFeed] = None
+    # decision mode, DECISION_MODE in .env when not given
+    mode: Optional[str] = None
+    # where retired flights are written, None = compressed in memory
+    archive_dir: Optional[str] = None
 
     def __post_init__(self):
+        load_dotenv()
+        if self.metrics is None:
+            self.metrics = Metrics(enabled=os.getenv("METRICS", "0") == "1")
         # all share the same context reference
-        self.state = State(self.context)
-        self.decisionMaker = DecisionMaker(self.context)
+        self.state = State(self.context, archive=FlightArchive(self.archive_dir))
+        self.decisionMaker = DecisionMaker(
+            self.context,
+            mode=self.mode or os.getenv("DECISION_MODE", "greedy"),
+        )
 
     def connect_api(self):
-        load_dotenv()
         BASE_URL = os.getenv("BASE_URL", "http://localhost:8080")
         API_KEY = os.getenv("API_KEY")
 
         if not API_KEY:
             raise ValueError("API_KEY not found in .env file or environment variables.")
 
+        # "requests" (blocking) or "async" (pooled aiohttp, pipelined rounds)
+        transport = make_transport(
+            os.getenv("TRANSPORT", "requests"),
+            timeout=float(os.getenv("HTTP_TIMEOUT", "30")),
+            retries=int(os.getenv("HTTP_RETRIES", "3")),
+        )
+
+        # every request / response to a replayable trace (see replay.py)
+        if os.getenv("RECORD_TRACE"):
+            transport = RecordingTransport(transport, os.getenv("RECORD_TRACE"))
+
         # play with the api
-        self.client = ApiClient(base_url=BASE_URL, api_key=API_KEY)
+        self.client = ApiClient(base_url=BASE_URL, api_key=API_KEY, transport=transport)
+
+    def record_round(self, response: dict):
+        # bookkeeping for a finished round, runs while the next one is in flight
+        for penalty in response["penalties"]:
+            self.totalPenalty += penalty["penalty"]
+            pen_code = penalty["code"]
+
+            if pen_code not in self.penal:
+                self.penal[pen_code] = 0
+
+            self.penal[pen_code] += 1
 
-    def run(self):
+    def checkpoint_data(self, decision: HourRequestDto) -> dict:
+        # taken after `decision` was sent, before its response arrived;
+        # copies only, the checkpointer pickles them on its own thread
+        return {
+            "time": self.state.time,
+            "state": self.state.checkpoint(),
+            "stock": self.context.snapshot_stock(),
+            "planner": self.decisionMaker.checkpoint(),
+            "total_penalty": self.totalPenalty,
+            "penal": dict(self.penal),
+            "decision": decision,
+        }
+
+    def resume(self, checkpoint: Checkpoint) -> Optional[dict]:
+        # rebuilds the state from the checkpoint, returns the last response
+        if checkpoint.finished:
+            raise ValueError("The checkpointed session already finished.")
+        self.client.resume_session(checkpoint.session_id)
+        self.state.archive.open(checkpoint.session_id)
+        responses = dict(checkpoint.responses)
+        previous = None
+
+        snapshot = checkpoint.snapshot
+        if snapshot is not None:
+            self.context.restore_stock(snapshot["stock"])
+            self.state.restore(snapshot["state"])
+            self.decisionMaker.restore(snapshot.get("planner"))
+            self.totalPenalty, self.penal = snapshot["total_penalty"], snapshot["penal"]
+            # the snapshot's round was sent, its response may not have been logged
+            hour = self.state.time
+            previous = responses.get(hour)
+            if previous is None:
+                previous = self.client.play_round(snapshot["decision"])
+                self.checkpointer.round_received(hour, previous)
+            self.state.update_state(previous)
+
+        mismatches = 0
+        while self.state.time in responses:
+            hour = self.state.time
+            self.state.init_update_state()
+            decision = self.decisionMaker.make_decision(self.state)
+            logged = checkpoint.requests.get(hour)
+            if logged is not None and logged != decision.to_dict():
+                mismatches += 1
+            if previous is not None:
+                self.record_round(previous)
+            previous = responses[hour]
+            self.state.update_state(previous)
+
+        print(
+            f"Resumed session {checkpoint.session_id} at hour {self.state.time}"
+            + (f", {mismatches} replayed decisions differ from the log" if mismatches else "")
+        )
+        return previous
+
+    def run(self, resume: bool = False) -> dict:
         # connect the api
-        self.connect_api()
+        if self.client is None:
+            self.connect_api()
+        metrics = self.client.metrics = self.metrics
+        if metrics.enabled and os.getenv("METRICS_PORT"):
+            metrics.serve(int(os.getenv("METRICS_PORT")))
+        if self.feed is None and os.getenv("FEED_PORT"):
+            self.feed = LiveFeed(
+                self.context, port=int(os.getenv("FEED_PORT")), archive=self.state.archive
+            )
+            self.feed.start()
+        feed = self.feed
+        inventory = self.state.inventory
+        checkpointer = self.checkpointer = (
+            Checkpointer(self.checkpoint_dir) if self.checkpoint_dir else None
+        )
+        result = {"cost": None, "penalty": 0, "penalties": {}, "error": None}
+        # the server was unreachable: leave the session open for --resume
+        resumable = False
         try:
-            self.client.start_session()
+            end_time = 30 * 24
+            self.totalPenalty, self.penal = 0, {}
+            previous = response = None
 
-            end_time, totalPenalty = 30 * 24, 0
-            penal = {}
+            if resume:
+                if checkpointer is None:
+                    raise ValueError("Resuming needs a checkpoint directory.")
+                checkpoint = load_checkpoint(self.checkpoint_dir)
+                checkpointer.reopen()
+                previous = response = self.resume(checkpoint)
+            else:
+                self.client.start_session()
+                self.state.archive.open(self.client.session_id)
+                if checkpointer is not None:
+                    checkpointer.start(self.client.session_id)
 
             # main loop for every hour
             while self.state.time < end_time:
-                self.state.init_update_state()
+                metrics.begin_round(self.state.time)
+                applied = inventory.applied_events
+                with metrics.phase("init_update_state"):
+                    self.state.init_update_state()
+                metrics.count("inventory_events", inventory.applied_events - applied)
                 # 1. make a descision
-                decision = self.decisionMaker.make_decision(self.state)
+                with metrics.phase("make_decision"):
+                    decision = self.decisionMaker.make_decision(self.state)
+                metrics.count("loads_emitted", len(decision.flight_loads))
 
-                # 2. send the decision and get the next round
-                response = self.client.play_round(decision)
-
-                for penalty in response["penalties"]:
-                    totalPenalty += penalty["penalty"]
-                    pen_code = penalty["code"]
-
-                    if pen_code not in penal:
-                        penal[pen_code] = 0
-
-                    penal[pen_code] += 1
+                # 2. send the decision, account the last round while it is in flight
+                pending = self.client.send_round(decision)
+                if previous is not None:
+                    with metrics.phase("record_round"):
+                        self.record_round(previous)
+                if checkpointer is not None:
+                    with metrics.phase("checkpoint"):
+                        checkpointer.round_sent(self.state.time, decision.to_dict())
+                        if checkpointer.due(self.state.time):
+                            checkpointer.snapshot(self.checkpoint_data(decision))
+                response = self.client.receive_round(pending)
+                if checkpointer is not None:
+                    checkpointer.round_received(self.state.time, response)
 
                 # 3. update the state with the next round
-                self.state.update_state(response)
+                hour = self.state.time
+                with metrics.phase("update_state"):
+                    self.state.update_state(response)
+                metrics.count("flights_processed", len(response["flightUpdates"]))
+                if feed is not None:
+                    with metrics.phase("feed"):
+                        feed.publish(hour, response, self.context.stock, len(decision.flight_loads))
+                metrics.end_round()
+                previous = response
 
+            self.record_round(previous)
+            self.state.retire_flights(force=True)
+            self.state.archive.flush()
             lastCost = response["totalCost"]
-            print(f"Last Cost: {lastCost:,.2f} Total penalty: {totalPenalty:,.2f}")
-            print(f"Penalties are: {penal}")
+            print(
+                f"Last Cost: {lastCost:,.2f} Total penalty: {self.totalPenalty:,.2f}"
+            )
+            print(f"Penalties are: {self.penal}")
+            result.update(cost=lastCost, penalty=self.totalPenalty, penalties=self.penal)
+            if checkpointer is not None:
+                checkpointer.finish()
         except requests.exceptions.HTTPError as e:
             print(f"HTTP Error: {e.response.status_code} {e.response.reason}")
             print(e.response.json())
+            result["error"] = f"HTTP {e.response.status_code}"
         except Exception as e:
             print(f"Exception: {e}")
+            result["error"] = str(e)
+            resumable = is_connection_error(e)
         finally:
             # warning: session closes automatically on the last day
             MAX_END_TIME = 24 * 30
-            if self.state.time < MAX_END_TIME:
-                self.client.end_session()
+            if checkpointer is not None and resumable:
+                # leave the session open, main.py --resume continues it
+                print(f"Checkpoint kept in {self.checkpoint_dir}, run with --resume.")
+            elif self.client.session_id and self.state.time < MAX_END_TIME:
+                try:
+                    self.client.end_session()
+                except Exception as e:
+                    print(f"Could not end the session: {e}")
+            self.client.close()
+            if checkpointer is not None:
+                checkpointer.close()
+            if feed is not None:
+                feed.close()
+            if metrics.enabled:
+                for name, stats in metrics.summary()["phases"].items():
+                    print(
+                        f"{name:>18}: mean {stats['mean_ms']:.3f} ms, "
+                        f"p95 {stats['p95_ms']:.3f} ms, total {stats['total_s']:.2f} s"
+                    )
+                metrics.export(os.getenv("METRICS_REPORT", "metrics.json"))
+                metrics.close()
+        return result
+
+    async def run_async(self) -> dict:
+        # the main loop as a coroutine: a round waits on the transport's
+        # future instead of blocking, so sessions can share one thread
+        # (see runner.py). No checkpoints, metrics or live feed here.
+        result = {"cost": None, "penalty": 0, "penalties": {}, "error": None}
+        end_time = 30 * 24
+        self.totalPenalty, self.penal = 0, {}
+        previous = response = None
+        try:
+            await asyncio.to_thread(self.client.start_session)
+            self.state.archive.open(self.client.session_id)
+            while self.state.time < end_time:
+                self.state.init_update_state()
+                decision = self.decisionMaker.make_decision(self.state)
+                pending = self.client.send_round(decision)
+                if previous is not None:
+                    self.record_round(previous)
+                await asyncio.wrap_future(pending)
+                response = self.client.receive_round(pending)
+                self.state.update_state(response)
+                previous = response
+
+            self.record_round(previous)
+            self.state.retire_flights(force=True)
+            self.state.archive.flush()
+            result.update(
+                cost=response["totalCost"], penalty=self.totalPenalty, penalties=self.penal
+            )
+        except requests.exceptions.HTTPError as e:
+            result["error"] = f"HTTP {e.response.status_code}"
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            if self.client.session_id and self.state.time < end_time:
+                await asyncio.to_thread(self.client.end_session)
+        return result
@@ -0,0 +1,355 @@
+import argparse
+import io
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils import ARCHIVE_DIR, CLASS_KEYS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+"""
+FlightArchive = the flights that are done with, out of the live FlightTable.
+
+A flight is retired once it landed and its kits went to processing
+(State.retire_flights). Its row leaves the table, so the table only holds
+flights that still need a decision, and the archive keeps it for analytics
+and the frontend:
+
+    archive.query(airport="HUB1", start=48, end=72, flight_number="AB1137")
+
+returns a DataFrame of the matching flights (departure hour in
+[start, end), airport as origin or destination).
+
+Retired rows are buffered and written in chunks of `chunk_rows` flights,
+one compressed .npz of columns per chunk under directory/<session id>/.
+Chunks are never rewritten. Without a directory the compressed chunks stay
+in memory. Every chunk keeps its departure range, airports and flight
+numbers, so a query only opens the chunks that can match.
+
+A full chunk is compressed and written on the archive's own thread, the
+game thread only hands its rows over; flush() waits for the writes.
+Queries see the rows in flight too. Only query() needs pandas, and it
+imports it itself so the bot starts without it.
+
+checkpoint() / restore() follow State: the snapshot holds the rows not
+in a written chunk and how many flights were (the chunks themselves when
+they are in memory), restore() drops chunks written after it, the
+replayed rounds write them again.
+"""
+
+# FlightTable columns kept for a retired flight
+ARCHIVE_COLUMNS = (
+    "origin",
+    "destination",
+    "departure",
+    "arrival",
+    "aircraft",
+    "distance",
+    "passengers",
+    "load",
+)
+
+CHUNK_PREFIX = "flights-"
+
+
+@dataclass(frozen=True)
+class _Chunk:
+    # first archive row in the chunk, rows, and where the .npz is
+    start: int
+    rows: int
+    source: Union[str, bytes]
+    first_departure: int
+    last_departure: int
+    airports: frozenset
+    numbers: frozenset
+
+    def load(self) -> dict:
+        source = self.source if isinstance(self.source, str) else io.BytesIO(self.source)
+        with np.load(source, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+
+def _summary(start: int, rows: int, source, data: dict) -> _Chunk:
+    airports = data["airport_codes"]
+    used = np.union1d(data["origin"], data["destination"])
+    return _Chunk(
+        start=start,
+        rows=rows,
+        source=source,
+        first_departure=int(data["departure"].min()),
+        last_departure=int(data["departure"].max()),
+        airports=frozenset(airports[used].tolist()),
+        numbers=frozenset(data["numbers"].tolist()),
+    )
+
+
+class FlightArchive:
+    def __init__(self, directory: Optional[str] = None, chunk_rows: int = 4096):
+        # None = compressed chunks in memory
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        # the session's chunk directory, set by open()
+        self.path: Optional[str] = None
+        self.chunks: List[_Chunk] = []
+        # (first archive row, batches) handed to the writer, not written yet
+        self.writing: List[Tuple[int, List[dict]]] = []
+        # FlightTable.retire() batches not in a chunk yet
+        self.pending: List[dict] = []
+        self.pending_rows = 0
+        # queries may run on another thread (the live feed)
+        self._lock = threading.Lock()
+        # started by the first full chunk
+        self._queue: Optional[queue.Queue] = None
+
+    def __len__(self) -> int:
+        return self.queued + self.pending_rows
+
+    @property
+    def flushed(self) -> int:
+        # flights in written chunks
+        return self.chunks[-1].start + self.chunks[-1].rows if self.chunks else 0
+
+    @property
+    def queued(self) -> int:
+        # flights in written chunks or handed to the writer
+        if self.writing:
+            start, batches = self.writing[-1]
+            return start + sum(len(batch["ids"]) for batch in batches)
+        return self.flushed
+
+    def open(self, session_id: str) -> None:
+        # chunks go to directory/<session_id>/, a new session starts empty
+        self.wait()
+        with self._lock:
+            self.chunks, self.writing, self.pending, self.pending_rows = [], [], [], 0
+            if self.directory:
+                self.path = os.path.join(self.directory, session_id)
+                os.makedirs(self.path, exist_ok=True)
+
+    def append(self, batch: dict) -> None:
+        # rows from FlightTable.retire()
+        if not len(batch["ids"]):
+            return
+        with self._lock:
+            self.pending.append(batch)
+            self.pending_rows += len(batch["ids"])
+        if self.pending_rows >= self.chunk_rows:
+            self.hand_over()
+
+    def _merge(self, batches: List[dict]) -> dict:
+        # one column dict from retire() batches; the tables' code lists only
+        # grow, so the last batch's lists cover every batch
+        last = batches[-1]
+        data = {
+            name: np.concatenate([batch[name] for batch in batches])
+            for name in ARCHIVE_COLUMNS
+        }
+        data["ids"] = np.array([i for batch in batches for i in batch["ids"]], dtype=str)
+        data["numbers"] = np.array(
+            [n for batch in batches for n in batch["numbers"]], dtype=str
+        )
+        data["airport_codes"] = np.array(last["airport_codes"], dtype=str)
+        data["aircraft_codes"] = np.array(last["aircraft_codes"], dtype=str)
+        return data
+
+    def hand_over(self) -> None:
+        # the buffered rows become a chunk, written on the archive's thread
+        if not self.pending:
+            return
+        if self._queue is None:
+            self._queue = queue.Queue()
+            threading.Thread(target=self._drain, name="flight-archive", daemon=True).start()
+        with self._lock:
+            item = (self.queued, self.pending)
+            self.writing.append(item)
+            self.pending, self.pending_rows = [], 0
+        self._queue.put(item)
+
+    def _drain(self) -> None:
+        while True:
+            start, batches = self._queue.get()
+            try:
+                self._write(start, batches)
+            except Exception as e:
+                print(f"Flight archive write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, start: int, batches: List[dict]) -> None:
+        data = self._merge(batches)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **data)
+        source = buffer.getvalue()
+        if self.path:
+            path = os.path.join(self.path, f"{CHUNK_PREFIX}{start:010d}.npz")
+            try:
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(source)
+                os.replace(f"{path}.tmp", path)
+                source = path
+            except OSError as e:
+                # the chunk stays in memory, the session goes on
+                print(f"Could not write {path}: {e}")
+        chunk = _summary(start, len(data["ids"]), source, data)
+        with self._lock:
+            self.chunks.append(chunk)
+            # one writer, chunks are written in the order handed over
+            self.writing.pop(0)
+
+    def wait(self) -> None:
+        # every chunk handed over is written
+        if self._queue is not None:
+            self._queue.join()
+
+    def flush(self) -> None:
+        # the buffered rows become a chunk, returns once it is written
+        self.hand_over()
+        self.wait()
+
+    def checkpoint(self) -> dict:
+        with self._lock:
+            return {
+                "flushed": self.flushed,
+                # rows in flight are not on disk yet, a resume writes them again
+                "pending": [b for _, batches in self.writing for b in batches]
+                + self.pending,
+                # in memory the chunks themselves, on disk they stay there
+                "chunks": None if self.path else list(self.chunks),
+            }
+
+    def _scan(self, limit: float) -> List[_Chunk]:
+        # the chunks on disk that start before archive row `limit`, the
+        # others are deleted
+        chunks = []
+        for name in sorted(os.listdir(self.path)):
+            if not (name.startswith(CHUNK_PREFIX) and name.endswith(".npz")):
+                continue
+            path = os.path.join(self.path, name)
+            start = int(name[len(CHUNK_PREFIX) : -len(".npz")])
+            if start >= limit:
+                os.remove(path)
+                continue
+            with np.load(path, allow_pickle=False) as columns:
+                columns = {key: columns[key] for key in columns.files}
+            chunks.append(_summary(start, len(columns["ids"]), path, columns))
+        return chunks
+
+    def restore(self, data: dict) -> None:
+        # chunks up to the snapshot, the buffered rows from it; chunks
+        # written after the snapshot are dropped, the replay writes them again
+        self.wait()
+        if self.path:
+            chunks = self._scan(data["flushed"])
+        else:
+            chunks = list(data["chunks"])
+        if sum(chunk.rows for chunk in chunks) != data["flushed"]:
+            raise ValueError("Flight archive chunks do not match the checkpoint.")
+        with self._lock:
+            self.chunks, self.writing = chunks, []
+            self.pending = list(data["pending"])
+            self.pending_rows = sum(len(batch["ids"]) for batch in self.pending)
+
+    @classmethod
+    def read(cls, directory: str, session_id: str) -> "FlightArchive":
+        # a finished (or running) session's chunks, for analytics
+        archive = cls(directory)
+        archive.path = os.path.join(directory, session_id)
+        if not os.path.isdir(archive.path):
+            raise ValueError(f"No archive for session {session_id} in {directory}")
+        archive.chunks = archive._scan(np.inf)
+        return archive
+
+    def query(
+        self,
+        airport: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        flight_number: Optional[str] = None,
+    ) -> "pd.DataFrame":
+        # retired flights departing in [start, end), from or to `airport`
+        import pandas as pd
+
+        with self._lock:
+            chunks = list(self.chunks)
+            pending = [b for _, batches in self.writing for b in batches] + self.pending
+        lo = -np.inf if start is None else start
+        hi = np.inf if end is None else end
+
+        parts = []
+        for chunk in chunks:
+            if chunk.last_departure < lo or chunk.first_departure >= hi:
+                continue
+            if airport is not None and airport not in chunk.airports:
+                continue
+            if flight_number is not None and flight_number not in chunk.numbers:
+                continue
+            parts.append(chunk.load())
+        if pending:
+            parts.append(self._merge(pending))
+        frames = [self._select(data, airport, lo, hi, flight_number) for data in parts]
+        if not frames:
+            return self._frame(None, np.zeros(0, dtype=np.int64))
+        return pd.concat(frames, ignore_index=True)
+
+    def _select(self, data, airport, lo, hi, flight_number) -> "pd.DataFrame":
+        departure = data["departure"]
+        mask = (departure >= lo) & (departure < hi)
+        if airport is not None:
+            codes = data["airport_codes"].tolist()
+            index = codes.index(airport) if airport in codes else -1
+            mask &= (data["origin"] == index) | (data["destination"] == index)
+        if flight_number is not None:
+            mask &= data["numbers"] == flight_number
+        return self._frame(data, np.flatnonzero(mask))
+
+    @staticmethod
+    def _frame(data: Optional[dict], rows: np.ndarray) -> "pd.DataFrame":
+        import pandas as pd
+
+        if data is None:
+            columns = ["flight_id", "flight_number", "origin", "destination", "aircraft"]
+            columns += ["departure", "arrival", "distance"]
+            columns += [f"{cls}_{kind}" for kind in ("passengers", "kits") for cls in CLASS_KEYS]
+            return pd.DataFrame(columns=columns)
+        airports, aircraft = data["airport_codes"], data["aircraft_codes"]
+        frame = {
+            "flight_id": data["ids"][rows],
+            "flight_number": data["numbers"][rows],
+            "origin": airports[data["origin"][rows]],
+            "destination": airports[data["destination"][rows]],
+            "aircraft": aircraft[data["aircraft"][rows]],
+            "departure": data["departure"][rows],
+            "arrival": data["arrival"][rows],
+            "distance": data["distance"][rows],
+        }
+        for ci, cls in enumerate(CLASS_KEYS):
+            frame[f"{cls}_passengers"] = data["passengers"][rows, ci]
+        for ci, cls in enumerate(CLASS_KEYS):
+            frame[f"{cls}_kits"] = data["load"][rows, ci]
+        return pd.DataFrame(frame)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Query the retired flights of a session")
+    arg_parser.add_argument("session_id")
+    arg_parser.add_argument("--archive-dir", default=os.getenv("ARCHIVE_DIR", ARCHIVE_DIR))
+    arg_parser.add_argument("--airport", default=None)
+    arg_parser.add_argument("--start", type=int, default=None, help="first departure hour")
+    arg_parser.add_argument("--end", type=int, default=None, help="departure hours before it")
+    arg_parser.add_argument("--flight-number", default=None)
+    args = arg_parser.parse_args()
+
+    archive = FlightArchive.read(args.archive_dir, args.session_id)
+    flights = archive.query(args.airport, args.start, args.end, args.flight_number)
+    print(flights.to_string(index=False))
+    print(f"{len(flights)} of {len(archive)} flights")
+
+
+if __name__ == "__main__":
+    main()
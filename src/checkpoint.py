@@ -0,0 +1,131 @@
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from roundlog import RoundLogWriter, read_records
+
+"""
+Checkpointer = crash-safe record of a running session, for --resume.
+
+directory/rounds.log  append-only RoundLog: b"S" session id, then per round
+                      b"Q" the request sent and b"R" the response, b"E" once
+                      the session is over
+directory/snapshot.pkl  full State + stock + bookkeeping every
+                      `snapshot_every` rounds, replaced atomically
+
+A snapshot is taken after a round's request is sent and before its
+response arrives. The game thread only copies the state's arrays;
+pickling, compression and disk writes happen on the log's writer thread,
+whichever transport is used. Resuming loads the last
+snapshot, replays the logged responses after it through the normal
+decision code, and carries on live with the same session id.
+"""
+
+LOG_NAME = "rounds.log"
+SNAPSHOT_NAME = "snapshot.pkl"
+
+
+@dataclass
+class Checkpoint:
+    session_id: str
+    snapshot: Optional[dict]
+    # (hour, response) logged at or after the snapshot's hour
+    responses: List[Tuple[int, dict]] = field(default_factory=list)
+    # hour -> request body, to check the replayed decisions
+    requests: dict = field(default_factory=dict)
+    finished: bool = False
+
+
+@dataclass
+class Checkpointer:
+    directory: str
+    snapshot_every: int = 24
+
+    def __post_init__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.log: Optional[RoundLogWriter] = None
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.directory, LOG_NAME)
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_NAME)
+
+    def start(self, session_id: str) -> None:
+        # a new session replaces whatever the directory held
+        if os.path.exists(self.snapshot_path):
+            os.remove(self.snapshot_path)
+        self.log = RoundLogWriter(self.log_path)
+        self.log.write(b"S", 0, {"session_id": session_id})
+
+    def reopen(self) -> None:
+        # continue the log of a resumed session
+        self.log = RoundLogWriter(self.log_path, append=True)
+
+    def round_sent(self, hour: int, body: dict) -> None:
+        self.log.write(b"Q", hour, body)
+
+    def round_received(self, hour: int, response: dict) -> None:
+        self.log.write(b"R", hour, response)
+
+    def due(self, hour: int) -> bool:
+        return hour > 0 and hour % self.snapshot_every == 0
+
+    def snapshot(self, data: dict) -> None:
+        # `data` must be copies (App.checkpoint_data), the game goes on while
+        # the log thread pickles and writes it
+        path = self.snapshot_path
+
+        def write():
+            blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            # the log must hold every round the snapshot builds on
+            self.log.sync()
+            os.replace(tmp_path, path)
+
+        self.log.call(write)
+
+    def finish(self) -> None:
+        self.log.write(b"E", 0, {})
+
+    def close(self) -> None:
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+
+def load_checkpoint(directory: str) -> Checkpoint:
+    log_path = os.path.join(directory, LOG_NAME)
+    if not os.path.exists(log_path):
+        raise ValueError(f"No checkpoint in {directory}")
+
+    snapshot = None
+    snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, "rb") as f:
+            snapshot = pickle.load(f)
+    first_hour = snapshot["time"] if snapshot else 0
+
+    session_id, finished = None, False
+    responses, requests = [], {}
+    for kind, hour, payload in read_records(log_path):
+        if kind == b"S":
+            session_id = payload["session_id"]
+        elif kind == b"E":
+            finished = True
+        elif hour >= first_hour:
+            if kind == b"R":
+                responses.append((hour, payload))
+            elif kind == b"Q":
+                requests[hour] = payload
+
+    if session_id is None:
+        raise ValueError(f"Checkpoint log {log_path} has no session")
+    return Checkpoint(session_id, snapshot, responses, requests, finished)
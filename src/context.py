@@ -1,8 +1,12 @@
-from dataclasses import field
-from typing import Optional, Dict
-from parser import Parser
-from models import Aircraft, Airport, PlannedFlight, HourRequestDto
+import copy
+from collections.abc import Mapping
+from dataclasses import field, fields
+from typing import Optional, Dict, List
+import numpy as np
+from models import Aircraft, Airport, AirportTables, PlannedFlight, HourRequestDto
 from dataclasses import dataclass
+from snapshot import load_static_data
+from utils import CAPACITY_FIELDS, CLASS_KEYS, DATA_DIR
 
 """
 Context = data from CSV that doesn't change every hour (every API call)
@@ -10,9 +14,45 @@ The data consists of:
 Airports
 Flight Schedule
 Airplane types
+
+Per-airport numbers live in airport x class matrices (AirportTables),
+rows indexed by airport_index, columns by CLASS_INDEX.
+The CSVs are read through a cached binary snapshot (see snapshot.py).
+
+The stock matrix is the only part a session changes. Sessions can share
+one parsed Context: freeze() makes its tables read-only and with_stock()
+gives a session its own stock over the shared rest (see runner.py).
+Its airport_dict hands out Airport views over the session's tables, built
+on first access so forking a context stays cheap.
 """
 
 
+class SessionAirports(Mapping):
+    # airport code -> Airport view over a with_stock() context's tables
+    def __init__(self, airports: Mapping, tables: AirportTables):
+        if isinstance(airports, SessionAirports):
+            airports = airports.shared
+        # the parsed views, over the shared tables
+        self.shared = airports
+        self.tables = tables
+        self._views: Dict[str, Airport] = {}
+
+    def __getitem__(self, code: str) -> Airport:
+        view = self._views.get(code)
+        if view is None:
+            airport = self.shared[code]
+            view = self._views[code] = Airport(
+                airport.id, airport.code, airport.name, airport.index, self.tables
+            )
+        return view
+
+    def __iter__(self):
+        return iter(self.shared)
+
+    def __len__(self) -> int:
+        return len(self.shared)
+
+
 @dataclass
 class Context:
     # key is aircraft_id
@@ -24,11 +64,94 @@ class Context:
 
     airport_id_to_code: Dict[str, str] = field(default_factory=dict)
 
+    # airport code -> row in the tables, and back
+    airport_index: Dict[str, int] = field(default_factory=dict)
+    airport_codes: List[str] = field(default_factory=list)
+    tables: AirportTables = field(default_factory=lambda: AirportTables.empty(0))
+
     def __post_init__(self):
-        # parse and get initial data from the csv's
-        parser = Parser()
-        self.aircraft_dict = parser.parse_aircraft("../data/aircraft_types.csv")
-        self.airport_dict = parser.parse_airports("../data/airports_with_stocks.csv")
+        if not self.airport_dict:
+            # initial data from the csv's, compiled once into a snapshot
+            self.aircraft_dict, self.airport_dict, self.tables = load_static_data(
+                DATA_DIR
+            )
         self.airport_id_to_code = {
             airport.id: code for code, airport in self.airport_dict.items()
         }
+        self.airport_codes = list(self.airport_dict)
+        self.airport_index = {
+            code: airport.index for code, airport in self.airport_dict.items()
+        }
+
+    @classmethod
+    def from_tables(
+        cls,
+        aircraft_dict: Dict[str, Aircraft],
+        airport_ids: List[str],
+        airport_codes: List[str],
+        airport_names: List[str],
+        tables: AirportTables,
+    ) -> "Context":
+        # build from already parsed data, no csv reading
+        airport_dict = {
+            code: Airport(id=airport_id, code=code, name=name, index=i, tables=tables)
+            for i, (airport_id, code, name) in enumerate(
+                zip(airport_ids, airport_codes, airport_names)
+            )
+        }
+        return cls(aircraft_dict=aircraft_dict, airport_dict=airport_dict, tables=tables)
+
+    @property
+    def stock(self) -> np.ndarray:
+        return self.tables.stock
+
+    @property
+    def capacity(self) -> np.ndarray:
+        return self.tables.capacity
+
+    @property
+    def processing_time(self) -> np.ndarray:
+        return self.tables.processing_time
+
+    @property
+    def processing_cost(self) -> np.ndarray:
+        return self.tables.processing_cost
+
+    @property
+    def loading_cost(self) -> np.ndarray:
+        return self.tables.loading_cost
+
+    def freeze(self) -> "Context":
+        # read-only tables, a write to the shared stock raises instead of leaking
+        for table in fields(self.tables):
+            getattr(self.tables, table.name).flags.writeable = False
+        return self
+
+    def with_stock(self, stock: Optional[np.ndarray] = None) -> "Context":
+        # shares everything but the stock, a copy of this one by default
+        session = copy.copy(self)
+        session.tables = self.tables.with_stock(
+            self.tables.stock.copy() if stock is None else stock
+        )
+        session.airport_dict = SessionAirports(self.airport_dict, session.tables)
+        return session
+
+    def kit_capacity(self, aircraft_codes: List[str]) -> np.ndarray:
+        # kits per class each aircraft type carries, rows follow
+        # `aircraft_codes` (a FlightTable's), unknown types carry none
+        capacity = np.zeros((len(aircraft_codes), len(CLASS_KEYS)), dtype=np.int64)
+        for i, code in enumerate(aircraft_codes):
+            aircraft = self.aircraft_dict.get(code)
+            if aircraft is not None:
+                capacity[i] = [getattr(aircraft, CAPACITY_FIELDS[cls]) for cls in CLASS_KEYS]
+        return capacity
+
+    def snapshot_stock(self) -> np.ndarray:
+        return self.tables.stock.copy()
+
+    def restore_stock(self, snapshot: np.ndarray) -> None:
+        self.tables.stock[:] = snapshot
+
+    def over_capacity(self) -> np.ndarray:
+        # kits above capacity per airport and class (0 where within limits)
+        return np.maximum(self.tables.stock - self.tables.capacity, 0)
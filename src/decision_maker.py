@@ -1,8 +1,11 @@
-from dataclasses import dataclass
-from typing import Dict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
 
 from context import Context
 from models import *
+from planner import FlowPlanner
 from utils import *
 from state import State
 
@@ -13,65 +16,127 @@ A strategy is implemented here to give an 'optimal' response
 
 """
 
+CHECKED_IN = FlightStatus.CHECKED_IN.value
+LANDED = FlightStatus.LANDED.value
+
 
 @dataclass
 class DecisionMaker:
     context: Context
+    # share of the passengers of each class we load kits for
+    bias: Dict[str, float] = field(default_factory=lambda: dict(BIAS))
+    # "greedy" = load for the passengers on board, "planner" = min-cost flow
+    mode: str = "greedy"
+    planner: Optional[FlowPlanner] = None
 
     def __post_init__(self):
-        pass
+        if self.mode not in ("greedy", "planner"):
+            raise ValueError(f"Unknown decision mode: {self.mode}")
 
     def empty_decision(self, state: State) -> HourRequestDto:
         # empty decision = do nothing
         day, hour = decode_time(state.time)
         return HourRequestDto(day, hour)
 
-    def make_decision(self, state: State) -> HourRequestDto:
-        # our strategy
-        loads = []
-        for flight in state.flights_dict.values():
-            if flight.status == FlightStatus.CHECKED_IN:
-                if flight.load:
-                    continue
-
-                pca = PerClassAmount()
-                origin_id = flight.origin_airport_id
-                aircraft_id = flight.aircraft_id
-                airport = self.context.airport_dict[origin_id]
-                aircraft = self.context.aircraft_dict[aircraft_id]
-
-                for cls in CLASS_KEYS:
-                    wanted = flight.passengers[cls]
-
-                    stock_attr = STOCK_FIELDS[cls]
-                    capacity_attr = CAPACITY_FIELDS[cls]
-                    pca_attr = PCA_FIELDS[cls]
-
-                    current = getattr(airport, stock_attr)
-                    capacity = getattr(aircraft, capacity_attr)
-
-                    # we decide here which customers to satisfy based on a BIAS.
-                    use = max(0, min(capacity, current, wanted * BIAS[cls]))
-                    setattr(pca, pca_attr, use)
-                    setattr(airport, stock_attr, current - use)
-                    flight.load[cls] = use
-
-                loads.append(FlightLoadDto(flight.flight_id, pca))
-
-            elif flight.status == FlightStatus.LANDED:
-                if not flight.load:
-                    continue
-                for cls in CLASS_KEYS:
-                    state.inventory.insert_processing(
-                        state.time, flight.load[cls], cls, flight.destination_airport_id
-                    )
-                flight.load = {}
-
-            elif flight.status == FlightStatus.SCHEDULED:
-                continue
+    def checkpoint(self) -> Optional[dict]:
+        # the planner's warm start, None in greedy mode
+        return None if self.planner is None else self.planner.checkpoint()
+
+    def restore(self, data: Optional[dict]) -> None:
+        if data is not None:
+            self.planner = FlowPlanner(self.context)
+            self.planner.restore(data)
+
+    def plan(self, state: State) -> Dict[str, Dict[str, int]]:
+        # kits per class for this round's flights, empty = greedy for all
+        if self.mode != "planner":
+            return {}
+        if self.planner is None:
+            self.planner = FlowPlanner(self.context)
+        return self.planner.plan(state)
+
+    def what_if(
+        self, state: State, planned: Optional[Dict[str, Dict[str, int]]] = None, hours: int = 0
+    ) -> State:
+        # a fork of `state` after this round's decision (`planned`, greedy
+        # without) and the next `hours` hours of arrivals; `state` itself
+        # and the planner's warm start are not changed
+        child = state.fork()
+        self.make_decision(child, planned or {})
+        if hours:
+            child.inventory.process(child.time + hours)
+        return child
+
+    def make_decision(
+        self, state: State, planned: Optional[Dict[str, Dict[str, int]]] = None
+    ) -> HourRequestDto:
+        # our strategy; `planned` (flight id -> kits per class) overrides it
+        if planned is None:
+            planned = self.plan(state)
+        # only flights that just checked in or landed need a decision
+        table = state.flights
+        changed = np.array(state.changed_rows, dtype=np.int64)
+        status = table.status[changed]
+        loaded = table.loaded[changed]
+        boarding = changed[(status == CHECKED_IN) & ~loaded]
+        landed = changed[(status == LANDED) & loaded]
+
+        # landed kits go through processing (>= 1h), they never reach
+        # this round's loads
+        loads = self.load(state, boarding, planned)
+        if len(landed):
+            state.inventory.insert_processing_rows(
+                state.time, table.load[landed], table.destination[landed]
+            )
+            table.loaded[landed] = False
 
         # send stuff
         day, hour = decode_time(state.time)
         resp = HourRequestDto(day, hour)
         resp.flight_loads = loads
         return resp
+
+    def load(
+        self, state: State, rows: np.ndarray, planned: Dict[str, Dict[str, int]]
+    ) -> List[FlightLoadDto]:
+        # kits for every boarding flight (table rows) at once:
+        # use = max(0, min(kit capacity, stock left, passengers * bias)),
+        # the flights of one airport draw from its stock in row order
+        if not len(rows):
+            return []
+        table = state.flights
+        # the state's, a fork has its own
+        stock = state.context.stock
+        bias = np.array([self.bias[cls] for cls in CLASS_KEYS])
+        wanted = np.floor(table.passengers[rows] * bias).astype(np.int64)
+        if planned:
+            # planned kits may exceed the passengers, to reposition
+            for i, flight_id in enumerate(table.ids[row] for row in rows.tolist()):
+                if flight_id in planned:
+                    wanted[i] = [planned[flight_id][cls] for cls in CLASS_KEYS]
+        capacity = self.context.kit_capacity(table.aircraft_codes)[table.aircraft[rows]]
+        wanted = np.clip(wanted, 0, capacity)
+
+        # grouped by origin, row order kept inside a group: a flight gets
+        # what the stock has left after the flights before it in the group
+        order = np.argsort(table.origin[rows], kind="stable")
+        origins = table.origin[rows][order]
+        wanted = wanted[order]
+        new_group = np.r_[True, origins[1:] != origins[:-1]]
+        first = np.flatnonzero(new_group)
+        before = wanted.cumsum(axis=0) - wanted
+        before -= before[first][np.cumsum(new_group) - 1]
+        use = np.clip(stock[origins] - before, 0, wanted)
+        stock[origins[first]] -= np.add.reduceat(use, first, axis=0)
+
+        # back to row order
+        load = np.empty_like(use)
+        load[order] = use
+        table.load[rows] = load
+        table.loaded[rows] = True
+        state.inventory.commit_loads(state.time, load, table.origin[rows])
+        ids = table.ids
+        return [
+            FlightLoadDto(ids[row], PerClassAmount(*kits))
+            for row, kits in zip(rows.tolist(), load.tolist())
+        ]
@@ -0,0 +1,328 @@
+import argparse
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from context import Context
+from models import FlightStatus, HourRequestDto
+from simulator import CHECK_IN_LEAD
+from state import State
+from utils import *
+
+"""
+Evaluator = what a round will cost, computed locally before it is sent.
+
+The server charges a round when its clock moves to the next hour: the
+purchases, then the departures (loading and transport cost, unfulfilled
+passengers, flight overload, negative stock at the origins), the landings
+(processing cost) and the arrivals (stock over capacity). Everything but
+the loads is known from the state, so:
+
+    evaluator.evaluate(state, decision)   RoundCost of one decision, itemised
+    boarding = evaluator.boarding(state)  this round's flights, once
+    evaluator.score(boarding, loads)      cost of (K, flights, 4) load plans
+
+evaluate() matches the round's totalCost increment as long as the local
+stock matches the server's. Both take the state BEFORE the decision
+(make_decision changes it): call them first, or on a fork.
+
+score() is for picking a plan: the round's penalties plus what the kits
+cost along their route, loading, transport and the processing they pay
+when they land (which the server charges on a later round). The per-kit
+coefficients of every flight and class are precomputed as (flights, 4)
+matrices, so a plan is a few array products: thousands per millisecond.
+"""
+
+LANDED = FlightStatus.LANDED.value
+
+KIT_COSTS = np.array([KIT_COST[cls] for cls in CLASS_KEYS])
+KIT_WEIGHTS = np.array([KIT_WEIGHT[cls] for cls in CLASS_KEYS])
+
+
+@dataclass
+class RoundCost:
+    purchase: float = 0.0
+    loading: float = 0.0
+    transport: float = 0.0
+    processing: float = 0.0
+    # penalty code -> cost
+    penalties: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def cost(self) -> float:
+        return self.purchase + self.loading + self.transport + self.processing
+
+    @property
+    def penalty(self) -> float:
+        return sum(self.penalties.values())
+
+    @property
+    def total(self) -> float:
+        return self.cost + self.penalty
+
+
+@dataclass
+class Boarding:
+    # the flights departing after a round, rows in table order, and the
+    # per-kit coefficients of every (flight, class)
+    hour: int
+    rows: np.ndarray
+    ids: List[str]
+    passengers: np.ndarray
+    capacity: np.ndarray
+    loading: np.ndarray
+    transport: np.ndarray
+    processing: np.ndarray
+    # flights that also land next hour, their processing is this round's
+    lands: np.ndarray
+    # flights sorted by origin: order, first of each group, group airports
+    order: np.ndarray
+    first: np.ndarray
+    origins: np.ndarray
+    # per origin: stock before the departures, kits arriving next hour, capacity
+    stock: np.ndarray
+    arrivals: np.ndarray
+    room: np.ndarray
+    # decision-free part of the round: landings, arrivals at other airports
+    fixed_processing: float
+    fixed_overflow: float
+
+    def plan(self, loads: Dict[str, np.ndarray]) -> np.ndarray:
+        # (flights, 4) plan from flight id -> kits per class, others load 0
+        plan = np.zeros((len(self.rows), len(CLASS_KEYS)), dtype=np.int64)
+        for i, flight_id in enumerate(self.ids):
+            if flight_id in loads:
+                plan[i] = loads[flight_id]
+        return plan
+
+
+@dataclass
+class Evaluator:
+    context: Context
+
+    def __post_init__(self):
+        self.kit_cost = KIT_COSTS
+        # penalty per missing / extra kit, per class
+        self.unfulfilled = KIT_COSTS * PENALTY_FACTORS["UNFULFILLED_PASSENGERS"]
+        self.overload = KIT_COSTS * PENALTY_FACTORS["FLIGHT_OVERLOAD"]
+        self.negative = KIT_COSTS * PENALTY_FACTORS["NEGATIVE_INVENTORY"]
+        self.overflow = KIT_COSTS * PENALTY_FACTORS["OVER_CAPACITY"]
+        # aircraft codes of the table the cost_per_kg_per_km column was built for
+        self._aircraft_codes: List[str] = []
+        self._cost_per_kg_km = np.zeros(0)
+
+    def _aircraft_rates(self, aircraft_codes: List[str]) -> np.ndarray:
+        # cost_per_kg_per_km per aircraft index of the table, rebuilt when
+        # the table learns a new type
+        if aircraft_codes != self._aircraft_codes:
+            aircraft = self.context.aircraft_dict
+            self._cost_per_kg_km = np.array(
+                [
+                    aircraft[code].cost_per_kg_per_km if code in aircraft else 0.0
+                    for code in aircraft_codes
+                ]
+            )
+            self._aircraft_codes = list(aircraft_codes)
+        return self._cost_per_kg_km
+
+    def boarding(self, state: State) -> Boarding:
+        context, table = self.context, state.flights
+        t = state.time
+        departure = t + CHECK_IN_LEAD
+        size = table.size
+        status = table.status[:size]
+        rows = table.rows(FlightStatus.CHECKED_IN)
+        rows = rows[table.departure[rows] == departure]
+        origin, destination = table.origin[rows], table.destination[rows]
+
+        rates = self._aircraft_rates(table.aircraft_codes)[table.aircraft[rows]]
+        transport = np.outer(table.distance[rows] * rates, KIT_WEIGHTS)
+
+        # kits of the flights landed this round, inserted by the decision
+        stock = state.context.stock.astype(np.int64)
+        arrivals = state.inventory.slots[departure % state.inventory.horizon].astype(np.int64)
+        landed = table.rows(FlightStatus.LANDED)
+        landed = landed[table.loaded[landed]]
+        if len(landed):
+            airports = np.repeat(table.destination[landed], len(CLASS_KEYS))
+            classes = np.tile(np.arange(len(CLASS_KEYS)), len(landed))
+            hours = table.arrival[landed].repeat(len(CLASS_KEYS)) + (
+                context.processing_time[airports, classes]
+            )
+            kits = table.load[landed].ravel()
+            now = hours < departure
+            np.add.at(stock, (airports[now], classes[now]), kits[now])
+            due = hours == departure
+            np.add.at(arrivals, (airports[due], classes[due]), kits[due])
+
+        # flights landing next hour that are already in the air
+        flying = np.flatnonzero(table.loaded[:size] & (table.arrival[:size] == departure))
+        flying = flying[status[flying] != LANDED]
+        fixed_processing = float(
+            (table.load[flying] * context.processing_cost[table.destination[flying]]).sum()
+        )
+
+        order = np.argsort(origin, kind="stable")
+        sorted_origins = origin[order]
+        new_group = np.ones(len(sorted_origins), dtype=bool)
+        new_group[1:] = sorted_origins[1:] != sorted_origins[:-1]
+        first = np.flatnonzero(new_group)
+        origins = sorted_origins[first]
+
+        # arrivals at airports no flight leaves from do not depend on the loads
+        over = np.maximum(stock + arrivals - context.capacity, 0) * (arrivals > 0)
+        over[origins] = 0
+        fixed_overflow = float((over * self.overflow).sum())
+
+        return Boarding(
+            hour=t,
+            rows=rows,
+            ids=[table.ids[row] for row in rows.tolist()],
+            passengers=table.passengers[rows].astype(np.int64),
+            capacity=context.kit_capacity(table.aircraft_codes)[table.aircraft[rows]],
+            loading=context.loading_cost[origin],
+            transport=transport,
+            processing=context.processing_cost[destination],
+            lands=table.arrival[rows] == departure,
+            order=order,
+            first=first,
+            origins=origins,
+            stock=stock[origins],
+            arrivals=arrivals[origins],
+            room=context.capacity[origins],
+            fixed_processing=fixed_processing,
+            fixed_overflow=fixed_overflow,
+        )
+
+    def _parts(self, boarding: Boarding, loads: np.ndarray) -> Dict[str, np.ndarray]:
+        # per candidate (leading axis) cost items of (K, flights, 4) loads
+        loads = np.maximum(loads, 0)
+        parts = {
+            "loading": np.einsum("kfc,fc->k", loads, boarding.loading),
+            "transport": np.einsum("kfc,fc->k", loads, boarding.transport),
+            "UNFULFILLED_PASSENGERS": np.maximum(boarding.passengers - loads, 0)
+            .sum(axis=1)
+            @ self.unfulfilled,
+            "FLIGHT_OVERLOAD": np.maximum(loads - boarding.capacity, 0).sum(axis=1)
+            @ self.overload,
+        }
+        if not len(boarding.rows):
+            zero = np.zeros(len(loads))
+            parts.update(NEGATIVE_INVENTORY=zero, OVER_CAPACITY=zero)
+            return parts
+        # stock of each origin once its flights are gone, then next hour's arrivals
+        left = boarding.stock - np.add.reduceat(loads[:, boarding.order], boarding.first, axis=1)
+        parts["NEGATIVE_INVENTORY"] = np.maximum(-left, 0).sum(axis=1) @ self.negative
+        over = np.maximum(left + boarding.arrivals - boarding.room, 0) * (boarding.arrivals > 0)
+        parts["OVER_CAPACITY"] = over.sum(axis=1) @ self.overflow
+        return parts
+
+    def score(self, boarding: Boarding, loads: np.ndarray) -> np.ndarray:
+        # cost of each load plan: (K, flights, 4) -> (K,), (flights, 4) -> scalar
+        single = loads.ndim == 2
+        loads = loads[None] if single else loads
+        parts = self._parts(boarding, loads)
+        total = sum(parts.values()) + np.einsum(
+            "kfc,fc->k", np.maximum(loads, 0), boarding.processing
+        )
+        return total[0] if single else total
+
+    def evaluate(self, state: State, decision: HourRequestDto) -> RoundCost:
+        # the cost the server will add for this round's `decision`
+        boarding = self.boarding(state)
+        table = state.flights
+        result = RoundCost()
+
+        if decision.kit_purchasing_orders:
+            orders = decision.kit_purchasing_orders.to_dict()
+            result.purchase = float(
+                sum(max(orders[cls], 0) * KIT_COST[cls] for cls in CLASS_KEYS)
+            )
+
+        loads, wrong = {}, 0
+        for flight_load in decision.flight_loads:
+            kits = flight_load.loaded_kits.to_dict()
+            row = table.index.get(flight_load.flight_id)
+            if row is None or table.departure[row] != boarding.hour + CHECK_IN_LEAD:
+                wrong += sum(abs(kits[cls]) for cls in CLASS_KEYS)
+                continue
+            loads[flight_load.flight_id] = [kits[cls] for cls in CLASS_KEYS]
+        plan = boarding.plan(loads)
+
+        parts = {name: float(value[0]) for name, value in self._parts(boarding, plan[None]).items()}
+        result.loading = parts.pop("loading")
+        result.transport = parts.pop("transport")
+        result.processing = boarding.fixed_processing + float(
+            (np.maximum(plan[boarding.lands], 0) * boarding.processing[boarding.lands]).sum()
+        )
+        parts["OVER_CAPACITY"] += boarding.fixed_overflow
+        if wrong:
+            parts["INCORRECT_FLIGHT_LOAD"] = (
+                wrong * KIT_COST["economy"] * PENALTY_FACTORS["INCORRECT_FLIGHT_LOAD"]
+            )
+        result.penalties = {code: cost for code, cost in parts.items() if cost}
+        return result
+
+
+def main():
+    from api_client import ApiClient
+    from app import App
+    from simulator import LocalTransport, Simulator
+
+    arg_parser = argparse.ArgumentParser(
+        description="Predicted vs charged round cost over a local session"
+    )
+    arg_parser.add_argument("--hours", type=int, default=0, help="rounds to play, 0 = the whole session")
+    arg_parser.add_argument("--candidates", type=int, default=1000, help="plans per score call")
+    arg_parser.add_argument("--seed", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    context = Context()
+    app = App(
+        context=context.with_stock(),
+        client=ApiClient("local", "evaluator", LocalTransport(Simulator(context=context))),
+    )
+    evaluator = Evaluator(app.context)
+    rng = np.random.default_rng(args.seed)
+
+    app.client.start_session()
+    last_cost, worst, rounds = 0.0, 0.0, 0
+    scored, score_time = 0, 0.0
+    end_time = min(END_TIME, args.hours) if args.hours else END_TIME
+    while app.state.time < end_time:
+        app.state.init_update_state()
+        before = app.state.fork()
+        decision = app.decisionMaker.make_decision(app.state)
+        predicted = evaluator.evaluate(before, decision)
+
+        boarding = evaluator.boarding(before)
+        if len(boarding.rows):
+            # the greedy plan, perturbed
+            plans = boarding.plan(
+                {
+                    load.flight_id: [load.loaded_kits.to_dict()[cls] for cls in CLASS_KEYS]
+                    for load in decision.flight_loads
+                }
+            ) + rng.integers(-3, 4, (args.candidates, len(boarding.rows), len(CLASS_KEYS)))
+            start = time.perf_counter()
+            evaluator.score(boarding, plans)
+            score_time += time.perf_counter() - start
+            scored += args.candidates
+
+        response = app.client.receive_round(app.client.send_round(decision))
+        charged = response["totalCost"] - last_cost
+        last_cost = response["totalCost"]
+        worst = max(worst, abs(predicted.total - charged))
+        rounds += 1
+        app.state.update_state(response)
+    app.client.end_session()
+
+    print(f"{rounds} rounds, largest |predicted - charged| {worst:,.4f}")
+    if scored:
+        print(f"{scored / score_time:,.0f} plans scored per second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import queue
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from context import Context
+from utils import CLASS_KEYS
+
+"""
+LiveFeed = per-round KPIs for the frontend cockpit, served over HTTP.
+
+    GET /live/snapshot   the whole current state as JSON
+    GET /live/stream     Server-Sent Events: a "snapshot" event, then one
+                         "round" event per round
+    GET /live/history    retired flights from the session's FlightArchive,
+                         ?airport=&start=&end=&flight= narrow it down
+
+A round event carries the totals (cost, penalties by code, flights loaded)
+and the stock of only the airports whose stock changed since the previous
+round, so a client applies it on top of what it has. Stock values are
+absolute, not increments.
+
+App.run calls publish() once per round. It copies the stock matrix and
+puts the round on a bounded queue, it never waits: when the feed thread is
+behind, the round is skipped and its penalties and loads are carried into
+the next one (totals stay exact, the stock is a full matrix anyway).
+
+The server runs on its own event loop thread (aiohttp, imported there).
+Every client has a small queue of encoded events. A client that lets it
+fill up is downsampled: its queue is dropped and it gets a fresh snapshot
+when it catches up. A client whose socket stops taking data for
+`write_timeout` seconds is disconnected; EventSource reconnects by itself.
+"""
+
+_RESYNC = object()
+
+
+class _Client:
+    def __init__(self, size: int):
+        # (round, encoded event) or _RESYNC
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.resyncs = 0
+
+    def offer(self, hour: int, event: bytes) -> None:
+        try:
+            self.queue.put_nowait((hour, event))
+        except asyncio.QueueFull:
+            # too slow for every round: skip to a snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_RESYNC)
+            self.resyncs += 1
+
+    def close(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+def sse(kind: str, data: bytes) -> bytes:
+    return b"event: " + kind.encode() + b"\ndata: " + data + b"\n\n"
+
+
+class LiveFeed:
+    def __init__(
+        self,
+        context: Context,
+        port: int = 8765,
+        host: str = "0.0.0.0",
+        queue_size: int = 64,
+        client_queue: int = 16,
+        write_timeout: float = 5.0,
+        history: int = 30 * 24,
+        archive=None,
+    ):
+        self.codes = list(context.airport_codes)
+        self.capacity = context.capacity.tolist()
+        self.port = port
+        self.host = host
+        self.client_queue = client_queue
+        self.write_timeout = write_timeout
+        # FlightArchive behind /live/history, None = no history endpoint
+        self.archive = archive
+        # rounds skipped because the feed thread was behind
+        self.skipped = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        # penalties / loads of skipped rounds, added to the next published one
+        self._carry_penalties: Dict[str, List[float]] = {}
+        self._carry_loaded = 0
+
+        # feed thread state, the totals every client converges to
+        self.round: Optional[int] = None
+        self.total_cost = 0.0
+        self.penalties: Dict[str, Dict[str, float]] = {}
+        self.flights_loaded = 0
+        self.history: deque = deque(maxlen=history)
+        self._stock: Optional[np.ndarray] = None
+        self._clients: Set[_Client] = set()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runner = None
+        self._consumer: Optional[asyncio.Task] = None
+
+    # game loop side
+
+    def publish(self, hour: int, response: dict, stock: np.ndarray, flights_loaded: int) -> None:
+        penalties = self._carry_penalties
+        for penalty in response["penalties"]:
+            entry = penalties.setdefault(penalty["code"], [0, 0.0])
+            entry[0] += 1
+            entry[1] += penalty["penalty"]
+        loaded = self._carry_loaded + flights_loaded
+        try:
+            self._queue.put_nowait((hour, response["totalCost"], penalties, stock.copy(), loaded))
+        except queue.Full:
+            self._carry_penalties, self._carry_loaded = penalties, loaded
+            self.skipped += 1
+            return
+        self._carry_penalties, self._carry_loaded = {}, 0
+
+    # feed thread
+
+    def start(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="live-feed", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result()
+        print(f"Live feed on http://{self.host}:{self.port}/live/stream")
+
+    async def _serve(self) -> None:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/live/snapshot", self._snapshot_handler)
+        app.router.add_get("/live/stream", self._stream_handler)
+        if self.archive is not None:
+            app.router.add_get("/live/history", self._history_handler)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._consumer = self._loop.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        while True:
+            item = await self._loop.run_in_executor(None, self._queue.get)
+            if item is None:
+                return
+            self._apply(*item)
+
+    def _apply(self, hour, total_cost, penalties, stock, loaded) -> None:
+        if self._stock is None:
+            changed = range(len(self.codes))
+        else:
+            changed = np.flatnonzero((stock != self._stock).any(axis=1)).tolist()
+        self._stock = stock
+        self.round = hour
+        self.total_cost = total_cost
+        for code, (count, cost) in penalties.items():
+            entry = self.penalties.setdefault(code, {"count": 0, "cost": 0.0})
+            entry["count"] += count
+            entry["cost"] += cost
+        self.flights_loaded += loaded
+        penalty_cost = sum(entry["cost"] for entry in self.penalties.values())
+        self.history.append({"round": hour, "totalCost": total_cost, "penaltyCost": penalty_cost})
+
+        event = json.dumps(
+            {
+                **self._totals(),
+                "stock": {self.codes[i]: stock[i].tolist() for i in changed},
+            },
+            separators=(",", ":"),
+        ).encode()
+        # encoded once, shared by every client
+        for client in self._clients:
+            client.offer(hour, event)
+
+    def _totals(self) -> dict:
+        return {
+            "round": self.round,
+            "totalCost": self.total_cost,
+            "penaltyCost": self.history[-1]["penaltyCost"] if self.history else 0.0,
+            "penalties": self.penalties,
+            "flightsLoaded": self.flights_loaded,
+        }
+
+    def snapshot(self) -> dict:
+        if self._stock is None:
+            stock = [[0] * len(CLASS_KEYS)] * len(self.codes)
+        else:
+            stock = self._stock.tolist()
+        return {
+            **self._totals(),
+            "classes": list(CLASS_KEYS),
+            "history": list(self.history),
+            "capacity": dict(zip(self.codes, self.capacity)),
+            "stock": dict(zip(self.codes, stock)),
+        }
+
+    async def _snapshot_handler(self, request):
+        from aiohttp import web
+
+        return web.json_response(
+            self.snapshot(), headers={"Access-Control-Allow-Origin": "*"}
+        )
+
+    async def _history_handler(self, request):
+        from aiohttp import web
+
+        query = request.query
+        try:
+            start = int(query["start"]) if "start" in query else None
+            end = int(query["end"]) if "end" in query else None
+        except ValueError:
+            raise web.HTTPBadRequest(text="start and end are hours")
+        # chunks are read from disk, off the event loop
+        flights = await self._loop.run_in_executor(
+            None, self.archive.query, query.get("airport"), start, end, query.get("flight")
+        )
+        return web.Response(
+            text=flights.to_json(orient="records"),
+            content_type="application/json",
+            headers={"Access-Control-Allow-Origin": "*"},
+        )
+
+    async def _stream_handler(self, request):
+        from aiohttp import web
+
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "Access-Control-Allow-Origin": "*",
+            }
+        )
+        await response.prepare(request)
+        client = _Client(self.client_queue)
+        self._clients.add(client)
+        try:
+            client.queue.put_nowait(_RESYNC)
+            sent_round = -1
+            while True:
+                item = await client.queue.get()
+                if item is None:
+                    break
+                if item is _RESYNC:
+                    data = sse("snapshot", json.dumps(self.snapshot()).encode())
+                    sent_round = self.round if self.round is not None else -1
+                else:
+                    hour, event = item
+                    # already part of the snapshot sent after a resync
+                    if hour <= sent_round:
+                        continue
+                    data = sse("round", event)
+                    sent_round = hour
+                await asyncio.wait_for(response.write(data), self.write_timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(client)
+        return response
+
+    async def _shutdown(self) -> None:
+        # the queued rounds reach the clients, then their streams end
+        await self._consumer
+        for client in self._clients:
+            client.close()
+        await self._runner.cleanup()
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        self._queue.put(None)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
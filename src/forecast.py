@@ -0,0 +1,122 @@
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Dict
+
+import numpy as np
+
+from context import Context
+from utils import *
+
+"""
+Forecast = expected kit demand per (airport, hour, class) for the session.
+
+The weekly flight_plan.csv is expanded over the session (day 0 is a
+Monday) and every planned departure gets the mean actual passengers of its
+route and class from flights.csv. The tensor is cached on disk keyed by a
+hash of the input files, so only the first use pays for building it.
+"""
+
+FORECAST_INPUTS = ("flight_plan.csv", "flights.csv", "airports_with_stocks.csv")
+
+
+@dataclass
+class Forecast:
+    # expected passengers departing per (airport, hour, class)
+    demand: np.ndarray
+    airport_index: Dict[str, int] = field(repr=False)
+
+    def __post_init__(self):
+        # running totals over the hours, for O(1) window sums
+        n_airports, _, n_classes = self.demand.shape
+        self.cumulative = np.concatenate(
+            [np.zeros((n_airports, 1, n_classes)), self.demand.cumsum(axis=1)], axis=1
+        )
+
+    @property
+    def horizon(self) -> int:
+        return self.demand.shape[1]
+
+    def expected(self, airport_code: str, hour: int, cls: str) -> float:
+        if not 0 <= hour < self.horizon:
+            return 0.0
+        return float(
+            self.demand[self.airport_index[airport_code], hour, CLASS_INDEX[cls]]
+        )
+
+    def window(self, airport_code: str, t0: int, t1: int) -> np.ndarray:
+        # expected departures per class in hours [t0, t1)
+        t0, t1 = min(max(t0, 0), self.horizon), min(max(t1, 0), self.horizon)
+        ai = self.airport_index[airport_code]
+        return self.cumulative[ai, max(t1, t0)] - self.cumulative[ai, t0]
+
+
+def input_hash(data_dir: str, horizon: int) -> str:
+    digest = hashlib.sha256(str(horizon).encode())
+    for name in FORECAST_INPUTS:
+        with open(os.path.join(data_dir, name), "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def route_means(context: Context, data_dir: str) -> Dict[tuple, np.ndarray]:
+    # mean actual passengers per class for every (origin, destination) code pair
+    from parser import Parser
+
+    totals, counts = {}, {}
+    for record in Parser().parse_flights(os.path.join(data_dir, "flights.csv")):
+        route = (
+            context.airport_id_to_code.get(record.origin_airport_id),
+            context.airport_id_to_code.get(record.destination_airport_id),
+        )
+        pax = np.array([record.actual_passengers[cls] for cls in CLASS_KEYS])
+        totals[route] = totals.get(route, 0) + pax
+        counts[route] = counts.get(route, 0) + 1
+    return {route: totals[route] / counts[route] for route in totals}
+
+
+def build_forecast(
+    context: Context, data_dir: str = DATA_DIR, horizon: int = END_TIME
+) -> np.ndarray:
+    from parser import Parser
+
+    parser = Parser()
+    plan = parser.parse_scheduled_flights(os.path.join(data_dir, "flight_plan.csv"))
+    means = route_means(context, data_dir)
+    fallback = np.mean(list(means.values()), axis=0) if means else np.zeros(len(CLASS_KEYS))
+
+    demand = np.zeros((len(context.airport_codes), horizon, len(CLASS_KEYS)))
+    days = np.arange((horizon + 23) // 24)
+    for origin, planned in plan.items():
+        if origin not in context.airport_index:
+            continue
+        ai = context.airport_index[origin]
+        for flight in planned:
+            expected = means.get((flight.depart_code, flight.arrival_code), fallback)
+            active = days[np.isin(days % 7, flight.flight_days)]
+            hours = active * 24 + flight.scheduled_depart
+            hours = hours[hours < horizon]
+            demand[ai, hours] += expected
+    return demand
+
+
+def load_forecast(
+    context: Context, data_dir: str = DATA_DIR, horizon: int = END_TIME
+) -> Forecast:
+    cache_dir = os.path.join(data_dir, ".cache")
+    cache_path = os.path.join(cache_dir, f"forecast-{input_hash(data_dir, horizon)}.npz")
+
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            demand = cached["demand"]
+    else:
+        demand = build_forecast(context, data_dir, horizon).astype(np.float32)
+        os.makedirs(cache_dir, exist_ok=True)
+        # write then rename, a crashed run never leaves a half-written cache
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, demand=demand)
+        os.replace(tmp_path, cache_path)
+        print(f"Built demand forecast {demand.shape}, cached at {cache_path}")
+
+    return Forecast(demand, context.airport_index)
@@ -1,77 +1,306 @@
+import copy
 from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
 from utils import *
 from context import Context
+from timeline import StockTimeline
 
 """
 Inventory manages kits. We can send/update resources.
+
+Pending arrivals live in a calendar queue (timing wheel): one
+airport x class delta matrix per hour slot, slot = hour % horizon.
+The horizon covers the longest processing time / purchase lead time, so
+memory stays bounded however long the session runs, and applying an hour
+is a single matrix add. A Fenwick tree of slot matrices (_WheelSums) is
+kept next to the wheel, so pending(t0, t1) over any window is two
+O(log horizon) prefix reads.
+
+Every stock change also goes to a StockTimeline, which answers projected
+stock / first overflow questions without replaying the queue.
+
+fork() gives a child for what-if steps (inserts, process, loads) that
+never touches its parent. The slots and the timeline trees stay shared
+until one side writes them; the stock matrix is copied (airports x 4).
 """
 
 
+class _WheelSums:
+    # Fenwick tree over the wheel slots, every node an airport x class
+    # matrix: an update or a prefix sum is O(log horizon) matrix adds,
+    # in place (a gather / scatter over the nodes is slower at this size)
+    def __init__(self, horizon: int, shape: tuple):
+        # node 0 is not part of the tree, padding adds land there
+        self.tree = np.zeros((horizon + 1,) + shape, dtype=np.int64)
+        # nodes an update of slot s touches / the prefix of slots [0, s) reads
+        self.up: List[List[int]] = []
+        for s in range(horizon):
+            nodes, i = [], s + 1
+            while i <= horizon:
+                nodes.append(i)
+                i += i & -i
+            self.up.append(nodes)
+        # the same, one row per slot padded with node 0, for batches
+        width = max(len(nodes) for nodes in self.up)
+        self.up_rows = np.array([nodes + [0] * (width - len(nodes)) for nodes in self.up])
+        self.down: List[List[int]] = []
+        for s in range(horizon + 1):
+            nodes, i = [], s
+            while i > 0:
+                nodes.append(i)
+                i -= i & -i
+            self.down.append(nodes)
+
+    def copy(self) -> "_WheelSums":
+        sums = copy.copy(self)
+        sums.tree = self.tree.copy()
+        return sums
+
+    def add(self, s: int, delta: np.ndarray) -> None:
+        # delta (airports x classes) into slot s
+        tree = self.tree
+        for node in self.up[s]:
+            tree[node] += delta
+
+    def remove(self, s: int, slot: np.ndarray) -> None:
+        # slot s was applied
+        tree = self.tree
+        for node in self.up[s]:
+            tree[node] -= slot
+
+    def add_one(self, s: int, ai: int, ci: int, quantity: int) -> None:
+        tree = self.tree
+        for node in self.up[s]:
+            tree[node, ai, ci] += quantity
+
+    def add_many(
+        self, slots: np.ndarray, airports: np.ndarray, classes: np.ndarray, quantities
+    ) -> None:
+        # quantities[i] kits into (airports[i], classes[i]) of slot slots[i]
+        np.add.at(
+            self.tree,
+            (self.up_rows[slots], airports[:, None], classes[:, None]),
+            quantities[:, None],
+        )
+
+    def prefix(self, s: int) -> np.ndarray:
+        # slots [0, s)
+        tree = self.tree
+        total = np.zeros(tree.shape[1:], dtype=np.int64)
+        for node in self.down[s]:
+            total += tree[node]
+        return total
+
+
 @dataclass
 class Inventory:
     context: Context
-    processing_dict: dict[int, list[tuple]] = field(default_factory=dict)
+    # number of hour slots in the wheel, 0 = derive from the context
+    horizon: int = 0
+    # first hour that has not been processed yet
+    time: int = 0
+    # arrivals that left an airport above capacity
+    overflow_events: int = 0
+    # (airport, class) arrivals applied to the stock
+    applied_events: int = 0
+
+    def __post_init__(self):
+        if not self.horizon:
+            longest = max(int(self.context.processing_time.max(initial=0)), *RLT.values())
+            # power of two, so a slot is hour & (horizon - 1)
+            self.horizon = 1 << longest.bit_length()
+        n_airports = len(self.context.airport_codes)
+        # the matrix of every empty slot, never written
+        self._empty = np.zeros((n_airports, len(CLASS_KEYS)), dtype=np.int64)
+        self._empty.flags.writeable = False
+        self.slots: List[np.ndarray] = [self._empty] * self.horizon
+        # slots only this inventory references, the others are copied first
+        self._owned = [False] * self.horizon
+        self._sums = self._new_sums()
+        self._sums_owned = True
+        self.timeline = self._new_timeline()
+
+    def _new_sums(self) -> _WheelSums:
+        sums = _WheelSums(self.horizon, self._empty.shape)
+        for s, slot in enumerate(self.slots):
+            if slot is not self._empty:
+                sums.add(s, slot)
+        return sums
+
+    def _new_timeline(self) -> StockTimeline:
+        timeline = StockTimeline(
+            self.context.stock,
+            self.context.capacity,
+            window=4 * self.horizon,
+            start=self.time,
+        )
+        # arrivals already queued (none on a fresh inventory)
+        for h in range(self.time, self.time + self.horizon):
+            slot = self.slots[h % self.horizon]
+            for ai, ci in zip(*slot.nonzero()):
+                timeline.add(int(ai), int(ci), h, int(slot[ai, ci]))
+        return timeline
+
+    def checkpoint(self) -> dict:
+        # the timeline is derived data, it is rebuilt on restore
+        return {
+            "time": self.time,
+            "wheel": np.stack(self.slots),
+            "overflow_events": self.overflow_events,
+            "applied_events": self.applied_events,
+        }
+
+    def restore(self, data: dict) -> None:
+        # the context stock must be restored first
+        self.time = data["time"]
+        self.slots = [slot.copy() for slot in data["wheel"]]
+        self.horizon = len(self.slots)
+        self._owned = [True] * self.horizon
+        self._sums, self._sums_owned = self._new_sums(), True
+        self.overflow_events = data["overflow_events"]
+        self.applied_events = data["applied_events"]
+        self.timeline = self._new_timeline()
+
+    def fork(self, context: Optional[Context] = None) -> "Inventory":
+        # copy-on-write child, over `context` (a with_stock() of ours by default)
+        child = copy.copy(self)
+        child.context = self.context.with_stock() if context is None else context
+        child.slots = list(self.slots)
+        # every slot is shared now, both sides copy before writing
+        self._owned = [False] * self.horizon
+        child._owned = [False] * self.horizon
+        self._sums_owned = child._sums_owned = False
+        child.timeline = self.timeline.fork()
+        return child
+
+    def _slot(self, s: int) -> np.ndarray:
+        # slot s, safe to write
+        if not self._owned[s]:
+            self.slots[s] = self.slots[s].copy()
+            self._owned[s] = True
+        return self.slots[s]
+
+    def _writable_sums(self) -> _WheelSums:
+        if not self._sums_owned:
+            self._sums = self._sums.copy()
+            self._sums_owned = True
+        return self._sums
+
+    def _indices(self, kit_type: str, airport_id: str, where: str) -> tuple:
+        if kit_type not in CLASS_INDEX:
+            raise ValueError(f"Kit type unrecognized: {where}")
+        return CLASS_INDEX[kit_type], self.context.airport_index[airport_id]
+
+    def _push(self, hour: int, quantity: int, ci: int, ai: int) -> None:
+        if hour < self.time:
+            # that hour was already applied, the kits are available now
+            self.context.stock[ai, ci] += quantity
+            self.timeline.add(ai, ci, max(self.time - 1, 0), quantity)
+            return
+        if hour >= self.time + self.horizon:
+            raise ValueError(
+                f"Hour {hour} is beyond the inventory horizon ({self.horizon}h)"
+            )
+        s = hour % self.horizon
+        self._slot(s)[ai, ci] += quantity
+        self._writable_sums().add_one(s, ai, ci, quantity)
+        self.timeline.add(ai, ci, hour, quantity)
+
+    def commit_load(self, hour: int, quantity: int, ci: int, ai: int) -> None:
+        # kits taken from stock at `hour` (the stock itself is updated by the caller)
+        self.timeline.add(ai, ci, hour, -quantity)
+
+    def commit_loads(self, hour: int, quantities: np.ndarray, airports: np.ndarray) -> None:
+        # commit_load for whole rows: quantities[i] (per class) kits taken
+        # from airport index airports[i]
+        rows, classes = quantities.nonzero()
+        self.timeline.add_many(
+            airports[rows], classes, np.full(len(rows), hour), -quantities[rows, classes]
+        )
 
     # insert entry
     def insert(self, hour: int, quantity: int, kit_type: str, airport_id: str) -> None:
         # direct insert at the given hour
-        if hour not in self.processing_dict:
-            self.processing_dict[hour] = []
-        self.processing_dict[hour].append((quantity, kit_type, airport_id))
+        ci, ai = self._indices(kit_type, airport_id, "inventory")
+        self._push(hour, quantity, ci, ai)
 
     def insert_processing(
         self, hour: int, quantity: int, kit_type: str, airport_id: str
     ) -> None:
         # compute processing-time shift
-        airport = self.context.airport_dict[airport_id]
-
-        match kit_type:
-            case "first":
-                time_delta = airport.first_processing_time
-            case "business":
-                time_delta = airport.business_processing_time
-            case "premiumEconomy":
-                time_delta = airport.premium_economy_processing_time
-            case "economy":
-                time_delta = airport.economy_processing_time
-            case _:
-                raise ValueError("Kit type unrecognized: inventory")
-
-        future_hour = hour + time_delta
-
-        if future_hour not in self.processing_dict:
-            self.processing_dict[future_hour] = []
-        self.processing_dict[future_hour].append((quantity, kit_type, airport_id))
+        ci, ai = self._indices(kit_type, airport_id, "inventory")
+        time_delta = int(self.context.processing_time[ai, ci])
+        self._push(hour + time_delta, quantity, ci, ai)
+
+    def insert_processing_rows(
+        self, hour: int, quantities: np.ndarray, airports: np.ndarray
+    ) -> None:
+        # insert_processing for whole rows: quantities[i] (per class) kits
+        # landed at airport index airports[i]
+        rows, classes = quantities.nonzero()
+        airports = airports[rows]
+        hours = hour + self.context.processing_time[airports, classes]
+        quantities = quantities[rows, classes]
+        if len(hours) and hours.max() >= self.time + self.horizon:
+            raise ValueError(
+                f"Hour {hours.max()} is beyond the inventory horizon ({self.horizon}h)"
+            )
+        # hours already applied: available now, as in _push
+        past = hours < self.time
+        np.add.at(self.context.stock, (airports[past], classes[past]), quantities[past])
+        for h in np.unique(hours[~past]).tolist():
+            at = hours == h
+            np.add.at(self._slot(h % self.horizon), (airports[at], classes[at]), quantities[at])
+        future = ~past
+        if future.any():
+            self._writable_sums().add_many(
+                hours[future] % self.horizon, airports[future], classes[future], quantities[future]
+            )
+        self.timeline.add_many(
+            airports, classes, np.where(past, max(self.time - 1, 0), hours), quantities
+        )
 
     def insert_buying(
         self, hour: int, quantity: int, kit_type: str, airport_id: str
     ) -> None:
-        if kit_type not in RLT:
-            raise ValueError("Kit type unrecognized: buying")
-
-        time_delta = RLT[kit_type]
-        buy_hour = hour + time_delta
+        ci, ai = self._indices(kit_type, airport_id, "buying")
+        self._push(hour + RLT[kit_type], quantity, ci, ai)
 
-        if buy_hour not in self.processing_dict:
-            self.processing_dict[buy_hour] = []
-        self.processing_dict[buy_hour].append((quantity, kit_type, airport_id))
+    def pending(self, t0: int, t1: int) -> np.ndarray:
+        # kits arriving in hours [t0, t1), per airport and class
+        t0, t1 = max(t0, self.time), min(t1, self.time + self.horizon)
+        if t1 <= t0:
+            return np.zeros(self._empty.shape, dtype=np.int64)
+        if t1 - t0 == 1:
+            return self.slots[t0 % self.horizon].copy()
+        # every slot holds one hour of [time, time + horizon), so a window
+        # is one slot range, or two when it wraps around
+        sums = self._sums
+        s0, s1 = t0 % self.horizon, t1 % self.horizon
+        if s0 < s1:
+            return sums.prefix(s1) - sums.prefix(s0)
+        return sums.prefix(self.horizon) - sums.prefix(s0) + sums.prefix(s1)
 
     # process hour
     def process(self, hour: int) -> None:
-        if hour not in self.processing_dict:
-            return
-        airport_dict = self.context.airport_dict
-        for quantity, kit_type, airport_id in self.processing_dict[hour]:
-            match kit_type:  # we must check for going stock > quantity
-                case "first":
-                    airport_dict[airport_id].first_stock += quantity
-                case "business":
-                    airport_dict[airport_id].business_stock += quantity
-                case "premiumEconomy":
-                    airport_dict[airport_id].premium_economy_stock += quantity
-                case "economy":
-                    airport_dict[airport_id].economy_stock += quantity
-                case _:
-                    raise ValueError("Kit type unrecognized: inventory")
-
-        self.processing_dict.pop(hour)  # eliminate all entries
+        # applies every hour up to `hour` that was not applied yet
+        stock, capacity = self.context.stock, self.context.capacity
+        for h in range(self.time, hour + 1):
+            s = h % self.horizon
+            slot = self.slots[s]
+            if slot is self._empty:
+                continue
+            stock += slot
+            self._writable_sums().remove(s, slot)
+            # arrivals must not push the stock over capacity
+            arrived = slot != 0
+            if arrived.any():
+                self.applied_events += int(arrived.sum())
+                self.overflow_events += int((stock[arrived] > capacity[arrived]).sum())
+            # eliminate all entries
+            self.slots[s] = self._empty
+            self._owned[s] = False
+        self.time = max(self.time, hour + 1)
+        self.timeline.advance(self.time)
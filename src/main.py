@@ -1,7 +1,34 @@
 # Florin, Robert, Petru
 # SAP Hackathon
-from app import App
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+# before utils is imported, it reads DATA_DIR from the environment
+load_dotenv()
+
+from app import App  # noqa: E402
+from utils import ARCHIVE_DIR, CHECKPOINT_DIR  # noqa: E402
 
 if __name__ == "__main__":
-    app = App()
-    app.run()
+    arg_parser = argparse.ArgumentParser(description="Flight rotables bot")
+    arg_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the checkpointed session instead of starting a new one",
+    )
+    arg_parser.add_argument(
+        "--checkpoint-dir",
+        default=os.getenv("CHECKPOINT_DIR", CHECKPOINT_DIR),
+        help='round log and snapshots, "" disables checkpoints',
+    )
+    arg_parser.add_argument(
+        "--archive-dir",
+        default=os.getenv("ARCHIVE_DIR", ARCHIVE_DIR),
+        help='retired flights, one directory per session, "" keeps them in memory',
+    )
+    args = arg_parser.parse_args()
+
+    app = App(checkpoint_dir=args.checkpoint_dir or None, archive_dir=args.archive_dir or None)
+    app.run(resume=args.resume)
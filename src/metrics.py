@@ -0,0 +1,210 @@
+import bisect
+import contextlib
+import csv
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+"""
+Metrics = per-phase timers and per-round counters for the main loop.
+
+Every round becomes one row: the hour, seconds spent in each phase and the
+counters bumped during it. Phase timings also go to fixed-bucket
+histograms, which are what the Prometheus endpoint exposes; the rows are
+what the JSON / CSV reports contain.
+
+Disabled (the default), phase() hands back a shared no-op context manager
+and count() returns straight away, so the loop pays a method call.
+"""
+
+PHASES = (
+    "init_update_state",
+    "make_decision",
+    "encode",
+    "send",
+    "receive",
+    "update_state",
+    "record_round",
+    "checkpoint",
+)
+
+# histogram upper bounds, seconds
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+_NOOP = contextlib.nullcontext()
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        # counts[i] = samples <= BUCKETS[i], last slot = above every bucket
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.n += 1
+
+
+class _PhaseTimer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.rounds: List[dict] = []
+        self.histograms: Dict[str, _Histogram] = {name: _Histogram() for name in PHASES}
+        self.counters: Dict[str, int] = {}
+        self._row: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def begin_round(self, hour: int) -> None:
+        if not self.enabled:
+            return
+        self._row = {"hour": hour}
+
+    def end_round(self) -> None:
+        if not self.enabled or self._row is None:
+            return
+        with self._lock:
+            self.rounds.append(self._row)
+        self._row = None
+
+    def phase(self, name: str):
+        # with metrics.phase("make_decision"): ...
+        if not self.enabled:
+            return _NOOP
+        return _PhaseTimer(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = _Histogram()
+            histogram.observe(seconds)
+        if self._row is not None:
+            self._row[name] = self._row.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        if self._row is not None:
+            self._row[name] = self._row.get(name, 0) + n
+
+    # reports
+
+    def summary(self) -> dict:
+        phases = {}
+        for name, histogram in self.histograms.items():
+            samples = sorted(row[name] for row in self.rounds if name in row)
+            if not samples:
+                continue
+            phases[name] = {
+                "count": histogram.n,
+                "total_s": histogram.total,
+                "mean_ms": 1000 * histogram.total / histogram.n,
+                "p50_ms": 1000 * samples[len(samples) // 2],
+                "p95_ms": 1000 * samples[int(0.95 * (len(samples) - 1))],
+                "max_ms": 1000 * samples[-1],
+            }
+        return {"rounds": len(self.rounds), "phases": phases, "counters": dict(self.counters)}
+
+    def to_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(), "rounds": self.rounds}, f, indent=2)
+
+    def to_csv(self, path: str) -> None:
+        columns = ["hour"]
+        for row in self.rounds:
+            columns += [key for key in row if key not in columns]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+            writer.writeheader()
+            writer.writerows(self.rounds)
+
+    def export(self, path: str) -> None:
+        # format from the extension, .csv or JSON otherwise
+        if path.endswith(".csv"):
+            self.to_csv(path)
+        else:
+            self.to_json(path)
+        print(f"Metrics for {len(self.rounds)} rounds written to {path}")
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP rotables_phase_seconds Time spent per main loop phase.",
+            "# TYPE rotables_phase_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'rotables_phase_seconds_bucket{{phase="{name}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'rotables_phase_seconds_bucket{{phase="{name}",le="+Inf"}} {histogram.n}'
+                )
+                lines.append(f'rotables_phase_seconds_sum{{phase="{name}"}} {histogram.total}')
+                lines.append(f'rotables_phase_seconds_count{{phase="{name}"}} {histogram.n}')
+            lines.append("# TYPE rotables_rounds_total counter")
+            lines.append(f"rotables_rounds_total {len(self.rounds)}")
+            for name, value in self.counters.items():
+                lines.append(f"# TYPE rotables_{name}_total counter")
+                lines.append(f"rotables_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> None:
+        # Prometheus text endpoint on /metrics, from a daemon thread
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"Metrics on http://{host}:{port}/metrics")
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -1,9 +1,28 @@
+import copy
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
+import numpy as np
+
 CLASSES = ["first", "business", "premiumEconomy", "economy"]
 
+# FlightTable columns: dtype, width (0 = one value per flight)
+FLIGHT_COLUMNS = {
+    "status": (np.int8, 0),
+    "origin": (np.int32, 0),
+    "destination": (np.int32, 0),
+    "departure": (np.int32, 0),
+    "arrival": (np.int32, 0),
+    "aircraft": (np.int16, 0),
+    "distance": (np.int32, 0),
+    # per class, CLASSES order
+    "passengers": (np.int32, len(CLASSES)),
+    "load": (np.int32, len(CLASSES)),
+    # decision taken, load holds the kits on board
+    "loaded": (np.bool_, 0),
+}
+
 
 class FlightStatus(Enum):
     SCHEDULED = 1
@@ -30,26 +49,269 @@ class Aircraft:
     economy_kits_capacity: int
 
 
-@dataclass
+def _flight_column(name: str) -> property:
+    # attribute access to one cell of the flight's row
+    def get(self):
+        return getattr(self.table, name)[self.row].item()
+
+    def set(self, value):
+        getattr(self.table, name)[self.row] = value
+
+    return property(get, set)
+
+
+@dataclass(eq=False)
 class Flight:
-    status: FlightStatus
+    # thin view over row `row` of a FlightTable
+    table: "FlightTable" = field(repr=False)
+    row: int
 
-    flight_number: str
+    departure = _flight_column("departure")
+    arrival = _flight_column("arrival")
+    distance = _flight_column("distance")
+
+    @property
+    def flight_id(self) -> str:
+        return self.table.ids[self.row]
+
+    @property
+    def flight_number(self) -> str:
+        return self.table.numbers[self.row]
+
+    @property
+    def status(self) -> FlightStatus:
+        return FlightStatus(int(self.table.status[self.row]))
+
+    @status.setter
+    def status(self, value: FlightStatus) -> None:
+        self.table.set_status(self.row, value.value)
+
+    @property
+    def origin_airport_id(self) -> str:
+        return self.table.airport_codes[self.table.origin[self.row]]
+
+    @property
+    def destination_airport_id(self) -> str:
+        return self.table.airport_codes[self.table.destination[self.row]]
+
+    @property
+    def aircraft_id(self) -> str:
+        return self.table.aircraft_codes[self.table.aircraft[self.row]]
+
+    @property
+    def passengers(self) -> dict[str, int]:
+        return dict(zip(CLASSES, self.table.passengers[self.row].tolist()))
+
+    @passengers.setter
+    def passengers(self, value: dict[str, int]) -> None:
+        self.table.passengers[self.row] = [value[cls] for cls in CLASSES]
+
+    @property
+    def load(self) -> dict[str, int]:
+        # kits per class once loaded, {} before loading and after landing
+        if not self.table.loaded[self.row]:
+            return {}
+        return dict(zip(CLASSES, self.table.load[self.row].tolist()))
+
+    @load.setter
+    def load(self, value: dict[str, int]) -> None:
+        self.table.loaded[self.row] = bool(value)
+        self.table.load[self.row] = [value.get(cls, 0) for cls in CLASSES]
+
+
+@dataclass
+class FlightTable:
+    """
+    The live flights of the session, one row each in the order they were
+    first seen (landed ones are retired to a FlightArchive). Numeric data
+    lives in NumPy columns (airports and aircraft as indices into
+    airport_codes / aircraft_codes), ids and flight numbers in lists.
+    table[flight_id] gives a Flight view over the row. rows(status) is the
+    status index: statuses change through set_status so it stays current.
+    """
+
+    airport_codes: List[str]
+    aircraft_codes: List[str] = field(default_factory=list)
+    # allocated rows, doubled when full
+    capacity: int = 1024
+
+    def __post_init__(self):
+        self.airport_codes = list(self.airport_codes)
+        self.aircraft_codes = list(self.aircraft_codes)
+        self.airport_index = {code: i for i, code in enumerate(self.airport_codes)}
+        self.aircraft_index = {code: i for i, code in enumerate(self.aircraft_codes)}
+        self.size = 0
+        self.ids: List[str] = []
+        self.numbers: List[str] = []
+        # flight id -> row
+        self.index: Dict[str, int] = {}
+        # statuses -> their rows, filled by rows(), emptied by any change
+        self._status_rows: Dict[tuple, np.ndarray] = {}
+        for name, (dtype, width) in FLIGHT_COLUMNS.items():
+            shape = (self.capacity, width) if width else (self.capacity,)
+            setattr(self, name, np.zeros(shape, dtype=dtype))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, flight_id: str) -> bool:
+        return flight_id in self.index
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __getitem__(self, flight_id: str) -> Flight:
+        return Flight(self, self.index[flight_id])
+
+    def get(self, flight_id: str, default=None) -> Optional[Flight]:
+        row = self.index.get(flight_id)
+        return default if row is None else Flight(self, row)
+
+    def values(self):
+        return (Flight(self, row) for row in range(self.size))
+
+    def items(self):
+        return ((self.ids[row], Flight(self, row)) for row in range(self.size))
+
+    def airport(self, code: str) -> int:
+        # index of an airport code, codes the context does not know are added
+        index = self.airport_index.get(code)
+        if index is None:
+            index = self.airport_index[code] = len(self.airport_codes)
+            self.airport_codes.append(code)
+        return index
+
+    def aircraft_type(self, code: str) -> int:
+        index = self.aircraft_index.get(code)
+        if index is None:
+            index = self.aircraft_index[code] = len(self.aircraft_codes)
+            self.aircraft_codes.append(code)
+        return index
+
+    def append(
+        self,
+        flight_id: str,
+        flight_number: str,
+        origin: int,
+        destination: int,
+        aircraft: int,
+        distance: int,
+    ) -> int:
+        # a new row, status 0 (none yet) until the caller sets it
+        row = self.size
+        if row == self.capacity:
+            self._grow()
+        self.size += 1
+        self._status_rows = {}
+        self.ids.append(flight_id)
+        self.numbers.append(flight_number)
+        self.index[flight_id] = row
+        self.origin[row] = origin
+        self.destination[row] = destination
+        self.aircraft[row] = aircraft
+        self.distance[row] = distance
+        return row
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for name in FLIGHT_COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((self.capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def set_status(self, row: int, status: int) -> None:
+        self.status[row] = status
+        self._status_rows = {}
+
+    def rows(self, *statuses: FlightStatus) -> np.ndarray:
+        # rows currently in one of `statuses`, in row order; one scan per
+        # set of statuses between changes, callers must not modify the array
+        rows = self._status_rows.get(statuses)
+        if rows is None:
+            status = self.status[: self.size]
+            if len(statuses) == 1:
+                rows = np.flatnonzero(status == statuses[0].value)
+            else:
+                wanted = np.zeros(len(FlightStatus) + 1, dtype=bool)
+                wanted[[s.value for s in statuses]] = True
+                rows = np.flatnonzero(wanted[status])
+            self._status_rows[statuses] = rows
+        return rows
+
+    def retire(self, rows: np.ndarray) -> dict:
+        # takes `rows` out of the table and returns them (see FlightArchive);
+        # the rows left keep their order but not their row numbers, so
+        # Flight views taken before are stale
+        retired = {name: getattr(self, name)[rows].copy() for name in FLIGHT_COLUMNS}
+        retired.update(
+            ids=[self.ids[row] for row in rows.tolist()],
+            numbers=[self.numbers[row] for row in rows.tolist()],
+            # copies, a snapshot may pickle them while the table grows
+            airport_codes=list(self.airport_codes),
+            aircraft_codes=list(self.aircraft_codes),
+        )
+        keep = np.ones(self.size, dtype=bool)
+        keep[rows] = False
+        kept = np.flatnonzero(keep)
+        for name in FLIGHT_COLUMNS:
+            column = getattr(self, name)
+            column[: len(kept)] = column[kept]
+            column[len(kept) : self.size] = 0
+        self.ids = [self.ids[row] for row in kept.tolist()]
+        self.numbers = [self.numbers[row] for row in kept.tolist()]
+        self.index = {flight_id: row for row, flight_id in enumerate(self.ids)}
+        self.size = len(kept)
+        self._status_rows = {}
+        return retired
+
+    def fork(self) -> "FlightTable":
+        # for what-if decisions: own load columns, every other column shared
+        # (appending to a fork, or updating its parent while in use, is not)
+        child = copy.copy(self)
+        child.load = self.load.copy()
+        child.loaded = self.loaded.copy()
+        return child
+
+    def checkpoint(self) -> dict:
+        data = {name: getattr(self, name)[: self.size].copy() for name in FLIGHT_COLUMNS}
+        data.update(
+            ids=list(self.ids),
+            numbers=list(self.numbers),
+            airport_codes=list(self.airport_codes),
+            aircraft_codes=list(self.aircraft_codes),
+        )
+        return data
+
+    @classmethod
+    def restore(cls, data: dict) -> "FlightTable":
+        size = len(data["ids"])
+        table = cls(data["airport_codes"], data["aircraft_codes"], max(1024, size))
+        for name in FLIGHT_COLUMNS:
+            getattr(table, name)[:size] = data[name]
+        table.size = size
+        table.ids = list(data["ids"])
+        table.numbers = list(data["numbers"])
+        table.index = {flight_id: row for row, flight_id in enumerate(table.ids)}
+        return table
+
+
+@dataclass
+class FlightRecord:
+    # one row of flights.csv (what actually happened)
     flight_id: str
+    flight_number: str
 
     origin_airport_id: str
     destination_airport_id: str
+    aircraft_type_id: str
 
     departure: int
     arrival: int
-
-    passengers: dict[str, int]
-
-    aircraft_id: str
-
     distance: int
 
-    load: dict[str, int] = field(default_factory=dict)
+    planned_passengers: dict[str, int]
+    actual_passengers: dict[str, int]
 
 
 @dataclass
@@ -65,35 +327,81 @@ class PlannedFlight:
 
 
 @dataclass
+class AirportTables:
+    # airport x class matrices, rows follow Context.airport_index,
+    # columns follow CLASS_KEYS (first, business, premiumEconomy, economy)
+    stock: np.ndarray
+    capacity: np.ndarray
+    processing_time: np.ndarray
+    processing_cost: np.ndarray
+    loading_cost: np.ndarray
+
+    @classmethod
+    def empty(cls, n_airports: int) -> "AirportTables":
+        shape = (n_airports, len(CLASSES))
+        return cls(
+            stock=np.zeros(shape, dtype=np.int64),
+            capacity=np.zeros(shape, dtype=np.int64),
+            processing_time=np.zeros(shape, dtype=np.int64),
+            processing_cost=np.zeros(shape, dtype=np.float64),
+            loading_cost=np.zeros(shape, dtype=np.float64),
+        )
+
+    def with_stock(self, stock: np.ndarray) -> "AirportTables":
+        # same parameters, different stock matrix
+        return AirportTables(
+            stock=stock,
+            capacity=self.capacity,
+            processing_time=self.processing_time,
+            processing_cost=self.processing_cost,
+            loading_cost=self.loading_cost,
+        )
+
+
+def _column(table: str, class_index: int) -> property:
+    # attribute access to one cell of the airport's row
+    def get(self):
+        return getattr(self.tables, table)[self.index, class_index].item()
+
+    def set(self, value):
+        getattr(self.tables, table)[self.index, class_index] = value
+
+    return property(get, set)
+
+
+@dataclass(eq=False)
 class Airport:
+    # thin view over row `index` of the shared AirportTables
     id: str
     code: str
     name: str
-
-    first_processing_time: int
-    business_processing_time: int
-    premium_economy_processing_time: int
-    economy_processing_time: int
-
-    first_processing_cost: float
-    business_processing_cost: float
-    premium_economy_cost: float
-    economy_processing_cost: float
-
-    first_loading_cost: float
-    business_loading_cost: float
-    premium_economy_loading_cost: float
-    economy_loading_cost: float
-
-    first_stock: int
-    business_stock: int
-    premium_economy_stock: int
-    economy_stock: int
-
-    first_capacity: int
-    business_capacity: int
-    premium_economy_capacity: int
-    economy_capacity: int
+    index: int
+    tables: AirportTables = field(repr=False)
+
+    first_processing_time = _column("processing_time", 0)
+    business_processing_time = _column("processing_time", 1)
+    premium_economy_processing_time = _column("processing_time", 2)
+    economy_processing_time = _column("processing_time", 3)
+
+    first_processing_cost = _column("processing_cost", 0)
+    business_processing_cost = _column("processing_cost", 1)
+    premium_economy_cost = _column("processing_cost", 2)
+    economy_processing_cost = _column("processing_cost", 3)
+
+    first_loading_cost = _column("loading_cost", 0)
+    business_loading_cost = _column("loading_cost", 1)
+    premium_economy_loading_cost = _column("loading_cost", 2)
+    economy_loading_cost = _column("loading_cost", 3)
+
+    first_stock = _column("stock", 0)
+    business_stock = _column("stock", 1)
+    premium_economy_stock = _column("stock", 2)
+    economy_stock = _column("stock", 3)
+
+    first_capacity = _column("capacity", 0)
+    business_capacity = _column("capacity", 1)
+    premium_economy_capacity = _column("capacity", 2)
+    economy_capacity = _column("capacity", 3)
 
 
 @dataclass
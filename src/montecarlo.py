@@ -0,0 +1,366 @@
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from context import Context
+from forecast import Forecast
+from models import FlightStatus
+from parser import Parser
+from simulator import CHECK_IN_LEAD, SCHEDULE_LEAD
+from state import State
+from utils import *
+
+"""
+MonteCarlo = shortage / overflow risk per (airport, class, hour) over the
+coming hours, under uncertain passenger counts.
+
+Scheduled flights carry planned passengers until they check in. A run
+draws `scenarios` passenger counts for every scheduled flight (ratios
+actual / planned resampled from flights.csv, see PassengerNoise) and plays
+the hours ahead for all scenarios at once, on (scenario, airport x class)
+arrays; the only Python loop is over the hours.
+- the arrivals already queued in the inventory and the kits of flights
+  already loaded (back at the destination after its processing time) are
+  the same in every scenario
+- at its check-in hour a flight takes min(kit capacity, stock,
+  passengers * bias) per class, the greedy decision, the flights of one
+  airport in row order. Its kits reach the destination stock at arrival +
+  processing time
+- past the hours flights are announced ahead, the forecast demand leaves
+  the airports, with the same noise (where it lands is unknown, so those
+  kits do not come back within the run)
+
+shortage[a, h, c] is the share of scenarios where airport a cannot cover
+the class c kits wanted at hour start + h, overflow[a, h, c] the share
+where the kits arriving at that hour leave it above capacity.
+"""
+
+SCHEDULED = FlightStatus.SCHEDULED.value
+
+# planned passengers are binned by count, small counts barely change
+SIZE_BINS = np.array([5, 20, 100])
+
+
+@dataclass
+class PassengerNoise:
+    # inverse CDF of actual / planned passengers, per (class, size bin)
+    ratios: np.ndarray
+
+    @classmethod
+    def fit(
+        cls, planned: np.ndarray, actual: np.ndarray, quantiles: int = 256
+    ) -> "PassengerNoise":
+        levels = (np.arange(quantiles) + 0.5) / quantiles
+        bins = np.searchsorted(SIZE_BINS, planned, side="right")
+        ratios = np.ones((len(CLASS_KEYS), len(SIZE_BINS) + 1, quantiles))
+        for ci in range(len(CLASS_KEYS)):
+            for b in range(len(SIZE_BINS) + 1):
+                rows = (bins[:, ci] == b) & (planned[:, ci] > 0)
+                if rows.any():
+                    ratios[ci, b] = np.quantile(
+                        actual[rows, ci] / planned[rows, ci], levels
+                    )
+        return cls(ratios)
+
+    @classmethod
+    def load(cls, data_dir: str = DATA_DIR) -> "PassengerNoise":
+        planned, actual = Parser().parse_passengers(os.path.join(data_dir, "flights.csv"))
+        return cls.fit(planned, actual)
+
+    def sample(
+        self,
+        planned: np.ndarray,
+        scenarios: int,
+        rng: np.random.Generator,
+        classes: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        # planned.shape + (scenarios,) passengers; the last axis of planned
+        # holds `classes` (class indices, all of them by default)
+        if classes is None:
+            classes = np.arange(len(CLASS_KEYS))
+        bins = np.searchsorted(SIZE_BINS, planned, side="right")
+        quantiles = self.ratios.shape[2]
+        draws = rng.integers(
+            0, quantiles, size=planned.shape + (scenarios,), dtype=np.min_scalar_type(quantiles)
+        )
+        ratios = self.ratios[classes[:, None], bins[..., None], draws]
+        return np.rint(planned[..., None] * ratios).astype(np.int64)
+
+
+@dataclass
+class RiskProfile:
+    # first hour of the run
+    start: int
+    airport_index: Dict[str, int] = field(repr=False)
+    # (airport, hour, class) share of the scenarios
+    shortage: np.ndarray = field(repr=False)
+    overflow: np.ndarray = field(repr=False)
+
+    @property
+    def hours(self) -> int:
+        return self.shortage.shape[1]
+
+    def at(self, airport_code: str, hour: int, cls: str) -> Tuple[float, float]:
+        # (shortage, overflow) probability at an absolute hour
+        k = hour - self.start
+        if not 0 <= k < self.hours:
+            return 0.0, 0.0
+        index = (self.airport_index[airport_code], k, CLASS_INDEX[cls])
+        return float(self.shortage[index]), float(self.overflow[index])
+
+    def worst(self, kind: str = "shortage", n: int = 10) -> List[tuple]:
+        # the n riskiest (airport code, hour, class, probability), risk > 0
+        risk = getattr(self, kind)
+        codes = list(self.airport_index)
+        top = np.argsort(risk, axis=None, kind="stable")[::-1][:n]
+        return [
+            (codes[a], self.start + k, CLASS_KEYS[c], float(risk[a, k, c]))
+            for a, k, c in zip(*np.unravel_index(top, risk.shape))
+            if risk[a, k, c] > 0
+        ]
+
+
+@dataclass
+class MonteCarlo:
+    context: Context
+    noise: PassengerNoise
+    # demand past the announced flights, none = only the flights known
+    forecast: Optional[Forecast] = None
+    # share of the passengers the decision loads kits for (DecisionMaker.bias)
+    bias: Dict[str, float] = field(default_factory=lambda: dict(BIAS))
+    scenarios: int = 1000
+    hours: int = 72
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        if self.scenarios < 1 or self.hours < 1:
+            raise ValueError("Monte Carlo needs at least one scenario and one hour")
+        self.rng = np.random.default_rng(self.seed)
+
+    def _queued(self, state: State) -> np.ndarray:
+        # (hours, airports, classes) arrivals no scenario changes: the
+        # inventory queue and the kits of the flights already loaded
+        context, inventory, table = state.context, state.inventory, state.flights
+        t, n_airports = state.time, len(context.airport_codes)
+        queued = np.zeros((self.hours, n_airports, len(CLASS_KEYS)), dtype=np.int64)
+        end = min(t + self.hours, inventory.time + inventory.horizon)
+        for h in range(max(t, inventory.time), end):
+            queued[h - t] += inventory.slots[h % inventory.horizon]
+
+        rows = np.flatnonzero(table.loaded[: table.size])
+        rows = rows[table.destination[rows] < n_airports]
+        destination = table.destination[rows]
+        # landed flights are unloaded in this round's decision
+        landing = np.maximum(table.arrival[rows], t)
+        steps = landing[:, None] + context.processing_time[destination] - t
+        arrived = steps < self.hours
+        classes = np.broadcast_to(np.arange(len(CLASS_KEYS)), steps.shape)
+        np.add.at(
+            queued,
+            (
+                steps[arrived],
+                np.broadcast_to(destination[:, None], steps.shape)[arrived],
+                classes[arrived],
+            ),
+            table.load[rows][arrived],
+        )
+        return queued
+
+    def run(self, state: State) -> RiskProfile:
+        # arrays are (..., scenario): a row of an airport x class is contiguous
+        context, table = state.context, state.flights
+        t, S, H = state.time, self.scenarios, self.hours
+        n_airports, n_classes = len(context.airport_codes), len(CLASS_KEYS)
+        bias = np.array([self.bias[cls] for cls in CLASS_KEYS])
+        # classes nobody loads kits for want none, whatever the passengers
+        active = np.flatnonzero(bias > 0)
+        capacity = context.capacity.reshape(-1, 1)
+
+        queued = self._queued(state).reshape(H, -1)
+
+        # flights still to be loaded: scheduled (sampled) or checked in
+        # this round and not decided yet (actual passengers)
+        # (scheduled flights are never loaded)
+        rows = table.rows(FlightStatus.SCHEDULED, FlightStatus.CHECKED_IN)
+        rows = rows[~table.loaded[rows] & (table.origin[rows] < n_airports)]
+        scheduled = table.status[rows] == SCHEDULED
+        check_in = np.where(
+            scheduled, table.departure[rows] - CHECK_IN_LEAD - t, 0
+        ).clip(0)
+        rows, check_in = rows[check_in < H], check_in[check_in < H]
+        # by check-in hour, then origin, then row (the decision's order)
+        origin = table.origin[rows]
+        order = np.lexsort((rows, origin, check_in))
+        rows, check_in, origin = rows[order], check_in[order], origin[order]
+        destination = table.destination[rows]
+        bounds = np.searchsorted(check_in, np.arange(H + 1))
+
+        planned = table.passengers[rows][:, active]
+        passengers = np.repeat(planned[..., None], S, axis=-1).astype(np.int64)
+        sampled = table.status[rows] == SCHEDULED
+        passengers[sampled] = self.noise.sample(planned[sampled], S, self.rng, active)
+        kit_capacity = context.kit_capacity(table.aircraft_codes)[table.aircraft[rows]]
+        wanted = np.zeros((len(rows), n_classes, S), dtype=np.int64)
+        wanted[:, active] = np.minimum(
+            kit_capacity[:, active, None], (passengers * bias[active, None]).astype(np.int64)
+        )
+        taken = np.zeros_like(wanted)
+
+        # their kits back at the destination: (step, column, flight, class)
+        # events, sorted so one hour is a slice and a column a run in it
+        flight = np.repeat(np.flatnonzero(destination < n_airports), len(active))
+        cls = np.tile(active, len(flight) // max(len(active), 1))
+        steps = (
+            table.arrival[rows][flight]
+            + context.processing_time[destination[flight], cls]
+            - t
+        )
+        column = destination[flight] * n_classes + cls
+        keep = steps < H
+        events = np.lexsort((column[keep], steps[keep]))
+        event_step = steps[keep][events]
+        event_column = column[keep][events]
+        event_value = (flight[keep] * n_classes + cls[keep])[events]
+        event_bounds = np.searchsorted(event_step, np.arange(H + 1))
+
+        stock = np.repeat(context.stock.reshape(-1, 1), S, axis=1).astype(np.int64)
+        stock3d = stock.reshape(n_airports, n_classes, S)
+        taken2d = taken.reshape(-1, S)
+        shortage = np.zeros((n_airports, H, n_classes), dtype=np.int64)
+        overflow = np.zeros((H, n_airports * n_classes), dtype=np.int64)
+
+        for k in range(H):
+            # arrivals, the queued ones and the returns of sampled loads
+            fixed = np.flatnonzero(queued[k])
+            lo, hi = event_bounds[k], event_bounds[k + 1]
+            returned, starts = np.unique(event_column[lo:hi], return_index=True)
+            columns = np.union1d(fixed, returned)
+            if len(columns):
+                incoming = np.zeros((len(columns), S), dtype=np.int64)
+                incoming[np.searchsorted(columns, fixed)] += queued[k, fixed, None]
+                if hi > lo:
+                    incoming[np.searchsorted(columns, returned)] += np.add.reduceat(
+                        taken2d[event_value[lo:hi]], starts, axis=0
+                    )
+                arrived = stock[columns] + incoming
+                stock[columns] = arrived
+                overflow[k, columns] = (
+                    (incoming > 0) & (arrived > capacity[columns])
+                ).sum(axis=1)
+
+            # departures: the flights of one origin share its stock in order
+            lo, hi = bounds[k], bounds[k + 1]
+            if hi > lo:
+                want = wanted[lo:hi]
+                origins = origin[lo:hi]
+                new_group = np.r_[True, origins[1:] != origins[:-1]]
+                first = np.flatnonzero(new_group)
+                last = np.r_[first[1:], hi - lo] - 1
+                # kits wanted by the flights before, overall and in the group
+                cumulative = want.cumsum(axis=0)
+                before = cumulative - want
+                group_start = before[first]
+                available = stock3d[origins]
+                taken[lo:hi] = np.clip(
+                    available - (before - group_start[np.cumsum(new_group) - 1]), 0, want
+                )
+                total = cumulative[last] - group_start
+                airports = origins[first]
+                available = stock3d[airports]
+                shortage[airports, k] += (total > available).sum(axis=-1)
+                stock3d[airports] = available - np.minimum(total, available)
+
+            # unannounced departures, from the forecast
+            departure = t + k + CHECK_IN_LEAD
+            if (
+                self.forecast is not None
+                and len(active)
+                and departure > t + SCHEDULE_LEAD
+                and departure < self.forecast.horizon
+            ):
+                demand = self.forecast.demand[:, departure, active]
+                airports = np.flatnonzero(demand.any(axis=1))
+                if len(airports):
+                    want = (
+                        self.noise.sample(demand[airports], S, self.rng, active)
+                        * bias[active, None]
+                    ).astype(np.int64)
+                    available = stock3d[airports][:, active]
+                    shortage[airports[:, None], k, active] += (want > available).sum(axis=-1)
+                    stock3d[airports[:, None], active] = available - np.minimum(want, available)
+
+        return RiskProfile(
+            start=t,
+            airport_index=dict(context.airport_index),
+            shortage=(shortage / S).astype(np.float32),
+            overflow=(overflow.reshape(H, n_airports, n_classes).transpose(1, 0, 2) / S).astype(
+                np.float32
+            ),
+        )
+
+
+def play_until(app, hour: int) -> None:
+    # greedy rounds against app.client up to `hour`, that round's arrivals applied
+    app.client.start_session()
+    while app.state.time < hour:
+        app.state.init_update_state()
+        decision = app.decisionMaker.make_decision(app.state)
+        pending = app.client.send_round(decision)
+        app.state.update_state(app.client.receive_round(pending))
+    app.state.init_update_state()
+
+
+def main():
+    from api_client import ApiClient
+    from app import App
+    from forecast import load_forecast
+    from simulator import LocalTransport, Simulator
+
+    arg_parser = argparse.ArgumentParser(
+        description="Shortage / overflow risk at one hour of a local session"
+    )
+    arg_parser.add_argument("--hour", type=int, default=48, help="round to stop at")
+    arg_parser.add_argument("--scenarios", type=int, default=1000)
+    arg_parser.add_argument("--hours", type=int, default=72, help="hours ahead")
+    arg_parser.add_argument("--seed", type=int, default=None)
+    arg_parser.add_argument("--top", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    context = Context()
+    forecast = load_forecast(context)
+    app = App(
+        context=context.with_stock(),
+        client=ApiClient("local", "montecarlo", LocalTransport(Simulator(context=context))),
+    )
+    play_until(app, args.hour)
+    engine = MonteCarlo(
+        context,
+        PassengerNoise.load(),
+        forecast=forecast,
+        bias=app.decisionMaker.bias,
+        scenarios=args.scenarios,
+        hours=args.hours,
+        seed=args.seed,
+    )
+    start = time.perf_counter()
+    risk = engine.run(app.state)
+    elapsed = time.perf_counter() - start
+    app.client.end_session()
+
+    for kind in ("shortage", "overflow"):
+        print(f"Highest {kind} risk:")
+        for code, hour, cls, probability in risk.worst(kind, args.top):
+            day, hour_of_day = decode_time(hour)
+            print(f"  {code:>6} day {day} {hour_of_day:02d}h {cls:>15}: {probability:.1%}")
+    print(
+        f"{args.scenarios} scenarios x {args.hours} h from hour {risk.start}"
+        f" in {elapsed * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
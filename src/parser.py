@@ -1,6 +1,7 @@
 from models import *
+import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, Tuple
 
 
 @dataclass
@@ -42,47 +43,71 @@ class Parser:
 
     def parse_airports(self, path: str) -> Dict[str, Airport]:
         """
-        Parses airports_with_stocks.csv using pandas and populates airport_dict.
+        Parses airports_with_stocks.csv and returns airport_dict (views over
+        freshly built AirportTables).
+        """
+        airport_dict, _ = self.parse_airport_tables(path)
+        return airport_dict
+
+    def parse_airport_tables(
+        self, path: str
+    ) -> Tuple[Dict[str, Airport], AirportTables]:
+        """
+        Parses airports_with_stocks.csv using pandas into airport x class
+        matrices. Airports in the returned dict are views over those matrices,
+        row i is the i-th airport of the file.
         """
         airport_dict = {}
+        tables = AirportTables.empty(0)
         try:
             df = pd.read_csv(path, sep=";")
 
-            for _, row in df.iterrows():
-                # Mapping CSV columns to dataclass fields
-                airport = Airport(
-                    id=row["id"],
-                    code=row["code"],
-                    name=row["name"],
-                    first_processing_time=int(row["first_processing_time"]),
-                    business_processing_time=int(row["business_processing_time"]),
-                    premium_economy_processing_time=int(
-                        row["premium_economy_processing_time"]
-                    ),
-                    economy_processing_time=int(row["economy_processing_time"]),
-                    first_processing_cost=float(row["first_processing_cost"]),
-                    business_processing_cost=float(row["business_processing_cost"]),
-                    # Note: CSV column is premium_economy_processing_cost
-                    premium_economy_cost=float(row["premium_economy_processing_cost"]),
-                    economy_processing_cost=float(row["economy_processing_cost"]),
-                    first_loading_cost=float(row["first_loading_cost"]),
-                    business_loading_cost=float(row["business_loading_cost"]),
-                    premium_economy_loading_cost=float(
-                        row["premium_economy_loading_cost"]
-                    ),
-                    economy_loading_cost=float(row["economy_loading_cost"]),
-                    # Stock Mappings
-                    first_stock=int(row["initial_fc_stock"]),
-                    business_stock=int(row["initial_bc_stock"]),
-                    premium_economy_stock=int(row["initial_pe_stock"]),
-                    economy_stock=int(row["initial_ec_stock"]),
-                    # Capacity Mappings
-                    first_capacity=int(row["capacity_fc"]),
-                    business_capacity=int(row["capacity_bc"]),
-                    premium_economy_capacity=int(row["capacity_pe"]),
-                    economy_capacity=int(row["capacity_ec"]),
+            # Mapping CSV columns to matrix columns (CLASS_KEYS order)
+            # Note: CSV columns are initial_*_stock and capacity_*
+            tables = AirportTables(
+                stock=df[
+                    [
+                        "initial_fc_stock",
+                        "initial_bc_stock",
+                        "initial_pe_stock",
+                        "initial_ec_stock",
+                    ]
+                ].to_numpy(dtype=np.int64),
+                capacity=df[
+                    ["capacity_fc", "capacity_bc", "capacity_pe", "capacity_ec"]
+                ].to_numpy(dtype=np.int64),
+                processing_time=df[
+                    [
+                        "first_processing_time",
+                        "business_processing_time",
+                        "premium_economy_processing_time",
+                        "economy_processing_time",
+                    ]
+                ].to_numpy(dtype=np.int64),
+                processing_cost=df[
+                    [
+                        "first_processing_cost",
+                        "business_processing_cost",
+                        "premium_economy_processing_cost",
+                        "economy_processing_cost",
+                    ]
+                ].to_numpy(dtype=np.float64),
+                loading_cost=df[
+                    [
+                        "first_loading_cost",
+                        "business_loading_cost",
+                        "premium_economy_loading_cost",
+                        "economy_loading_cost",
+                    ]
+                ].to_numpy(dtype=np.float64),
+            )
+
+            for index, (airport_id, code, name) in enumerate(
+                zip(df["id"], df["code"], df["name"])
+            ):
+                airport_dict[code] = Airport(
+                    id=airport_id, code=code, name=name, index=index, tables=tables
                 )
-                airport_dict[airport.code] = airport
 
             print(f"Loaded {len(airport_dict)} airports.")
 
@@ -91,7 +116,7 @@ class Parser:
         except Exception as e:
             print(f"Error parsing airports: {e}")
 
-        return airport_dict
+        return airport_dict, tables
 
     def parse_scheduled_flights(self, path: str) -> Dict[str, List[PlannedFlight]]:
         """
@@ -130,3 +155,72 @@ class Parser:
             print(f"Error parsing flight plan: {e}")
 
         return flights_by_origin
+
+    def parse_flights(self, path: str) -> List[FlightRecord]:
+        """
+        Parses flights.csv (the realised schedule) into FlightRecord objects.
+        Times are encoded as hours since the start of the game.
+        """
+        records = []
+        try:
+            df = pd.read_csv(path, sep=";")
+
+            for _, row in df.iterrows():
+                record = FlightRecord(
+                    flight_id=row["id"],
+                    flight_number=row["flight_number"],
+                    origin_airport_id=row["origin_airport_id"],
+                    destination_airport_id=row["destination_airport_id"],
+                    aircraft_type_id=row["act_aircraft_type_id"],
+                    departure=int(row["scheduled_depart_day"]) * 24
+                    + int(row["scheduled_depart_hour"]),
+                    arrival=int(row["actual_arival_day"]) * 24
+                    + int(row["actual_arrival_hour"]),
+                    distance=int(row["actual_distance"]),
+                    planned_passengers={
+                        "first": int(row["planned_first_passengers"]),
+                        "business": int(row["planned_business_passengers"]),
+                        "premiumEconomy": int(
+                            row["planned_premium_economy_passengers"]
+                        ),
+                        "economy": int(row["planned_economy_passengers"]),
+                    },
+                    actual_passengers={
+                        "first": int(row["actual_first_passengers"]),
+                        "business": int(row["actual_business_passengers"]),
+                        "premiumEconomy": int(
+                            row["actual_premium_economy_passengers"]
+                        ),
+                        "economy": int(row["actual_economy_passengers"]),
+                    },
+                )
+                records.append(record)
+
+            print(f"Loaded {len(records)} flights.")
+
+        except FileNotFoundError:
+            print(f"Error: Flights file not found at {path}")
+        except Exception as e:
+            print(f"Error parsing flights: {e}")
+
+        return records
+
+    def parse_passengers(self, path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reads only the passenger columns of flights.csv: (planned, actual),
+        one flights x class matrix each, columns in CLASSES order.
+        """
+        names = ["first", "business", "premium_economy", "economy"]
+        planned = [f"planned_{name}_passengers" for name in names]
+        actual = [f"actual_{name}_passengers" for name in names]
+        empty = np.zeros((0, len(names)), dtype=np.int64)
+        try:
+            df = pd.read_csv(path, sep=";", usecols=planned + actual)
+            return df[planned].to_numpy(np.int64), df[actual].to_numpy(np.int64)
+
+        except FileNotFoundError:
+            print(f"Error: Flights file not found at {path}")
+        except Exception as e:
+            print(f"Error parsing passengers: {e}")
+
+        return empty, empty
@@ -0,0 +1,355 @@
+import heapq
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from context import Context
+from models import FlightStatus
+from utils import *
+
+"""
+FlowPlanner = rolling-horizon min-cost-flow over a time-expanded network.
+
+For every class, kits are a flow over the next `horizon` hours:
+- node (airport, hour) at the hours where something happens there: now,
+  load decisions (the hour before a departure), kits becoming available
+  (landing + processing), the window end
+- holding arcs between consecutive nodes of an airport (free, uncapacitated)
+- per flight two parallel arcs from (origin, departure - 1) to
+  (destination, arrival + processing): "served" up to min(passengers,
+  aircraft capacity) costing transport - unfulfilled penalty, and "extra"
+  for the rest of the aircraft capacity at plain transport cost
+- every airport's last node drains into a sink for free
+Supplies are the current stock plus the pending arrivals in the window.
+
+Solved with successive shortest paths (Dijkstra on reduced costs). Each
+round is warm-started: arc flows and node potentials of the previous
+solution are kept for the part of the window that is still there, arcs
+whose reduced cost became negative are saturated, and only the resulting
+imbalances are re-routed. Re-routing stops after `max_augmentations`
+shortest paths per round, so the same input always gives the same plan
+(replays and resumes included); loads are then taken from the best flow
+found so far. `budget_ms` is only a safety cap on the wall clock, a round
+that hits it is no longer reproducible.
+"""
+
+INF = 10**12
+EPS = 1e-9
+
+
+class _Network:
+    def __init__(self):
+        self.keys: List[tuple] = []
+        self.index: Dict[tuple, int] = {}
+        self.times: List[int] = []
+        self.supply: List[int] = []
+        self.out: List[List[int]] = []
+        # arc e and its reverse e ^ 1
+        self.head: List[int] = []
+        self.res: List[int] = []
+        self.cost: List[float] = []
+        self.cap: List[int] = []
+
+    def node(self, key: tuple, hour: int) -> int:
+        v = self.index.get(key)
+        if v is None:
+            v = self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.times.append(hour)
+            self.supply.append(0)
+            self.out.append([])
+        return v
+
+    def arc(self, u: int, v: int, cap: int, cost: float) -> int:
+        e = len(self.head)
+        self.head += [v, u]
+        self.res += [cap, 0]
+        self.cost += [cost, -cost]
+        self.cap += [cap, 0]
+        self.out[u].append(e)
+        self.out[v].append(e + 1)
+        return e
+
+    def tail(self, e: int) -> int:
+        return self.head[e ^ 1]
+
+    def flow(self, e: int) -> int:
+        return self.res[e ^ 1]
+
+    def push(self, e: int, amount: int, excess: List[int]) -> None:
+        self.res[e] -= amount
+        self.res[e ^ 1] += amount
+        excess[self.tail(e)] -= amount
+        excess[self.head[e]] += amount
+
+
+class _WindowFlight(NamedTuple):
+    # the columns of one FlightTable row the network is built from
+    flight_id: str
+    origin: int  # airport index
+    destination: int
+    aircraft_id: str
+    passengers: List[int]  # CLASS_KEYS order
+    distance: int
+    departure: int
+    arrival: int
+    status: int  # FlightStatus value
+
+
+@dataclass
+class _ClassPlan:
+    # warm start for one class
+    flows: Dict[tuple, int] = field(default_factory=dict)
+    potentials: Dict[tuple, float] = field(default_factory=dict)
+
+
+@dataclass
+class FlowPlanner:
+    context: Context
+    horizon: int = 24
+    # shortest paths per round, all classes together (shared out in turn)
+    max_augmentations: int = 200
+    # wall-clock safety cap per round, all classes together
+    budget_ms: float = 1000.0
+
+    def __post_init__(self):
+        self.warm = {cls: _ClassPlan() for cls in CLASS_KEYS}
+        self.penalty = {
+            cls: KIT_COST[cls] * PENALTY_FACTORS["UNFULFILLED_PASSENGERS"]
+            for cls in CLASS_KEYS
+        }
+        # stats of the last round
+        self.augmentations = 0
+        self.exhausted = False
+
+    def checkpoint(self) -> dict:
+        # the warm start, a resumed session plans from it as the original did
+        return {
+            cls: (dict(plan.flows), dict(plan.potentials)) for cls, plan in self.warm.items()
+        }
+
+    def restore(self, data: dict) -> None:
+        self.warm = {
+            cls: _ClassPlan(dict(flows), dict(potentials))
+            for cls, (flows, potentials) in data.items()
+        }
+
+    def _window_flights(self, state, now: int, end: int) -> List["_WindowFlight"]:
+        # not yet loaded flights departing in (now, end], in row order
+        table = state.flights
+        rows = table.rows(FlightStatus.CHECKED_IN, FlightStatus.SCHEDULED)
+        departure = table.departure[rows]
+        rows = rows[(departure > now) & (departure <= end) & ~table.loaded[rows]]
+        return [
+            _WindowFlight(table.ids[row], *values)
+            for row, values in zip(
+                rows.tolist(),
+                zip(
+                    table.origin[rows].tolist(),
+                    table.destination[rows].tolist(),
+                    [table.aircraft_codes[a] for a in table.aircraft[rows].tolist()],
+                    table.passengers[rows].tolist(),
+                    table.distance[rows].tolist(),
+                    table.departure[rows].tolist(),
+                    table.arrival[rows].tolist(),
+                    table.status[rows].tolist(),
+                ),
+            )
+        ]
+
+    def plan(self, state) -> Dict[str, Dict[str, int]]:
+        # kits per class for the flights boarding this round
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        now, end = state.time, state.time + self.horizon
+        flights = self._window_flights(state, now, end)
+        arrivals = [
+            (h, state.inventory.pending(h, h + 1)) for h in range(now + 1, end + 1)
+        ]
+
+        self.augmentations, self.exhausted = 0, False
+        loads: Dict[str, Dict[str, int]] = {}
+        for ci, cls in enumerate(CLASS_KEYS):
+            # what the classes before left over is shared by the rest
+            left = len(CLASS_KEYS) - ci
+            limit = self.augmentations + (self.max_augmentations - self.augmentations) // left
+            class_deadline = time.perf_counter() + (deadline - time.perf_counter()) / left
+            boarding = self._solve_class(
+                ci, cls, flights, arrivals, now, end, limit, class_deadline
+            )
+            for flight_id, kits in boarding.items():
+                loads.setdefault(flight_id, {})[cls] = kits
+        return loads
+
+    def _build(self, ci, cls, flights, arrivals, now, end):
+        ctx = self.context
+        net = _Network()
+        sink = net.node(("sink",), end + 1)
+
+        # supplies: stock now, pending arrivals later in the window
+        for code, ai in ctx.airport_index.items():
+            v = net.node((ai, now), now)
+            net.supply[v] += max(0, int(ctx.stock[ai, ci]))
+            net.node((ai, end), end)
+        for hour, matrix in arrivals:
+            for ai in matrix[:, ci].nonzero()[0].tolist():
+                v = net.node((ai, hour), hour)
+                net.supply[v] += int(matrix[ai, ci])
+        net.supply[sink] = -sum(net.supply)
+
+        flight_arcs = []
+        for flight in flights:
+            oi, di = flight.origin, flight.destination
+            aircraft = ctx.aircraft_dict[flight.aircraft_id]
+            kit_capacity = getattr(aircraft, CAPACITY_FIELDS[cls])
+            served = min(flight.passengers[ci], kit_capacity)
+
+            unit = (
+                float(ctx.loading_cost[oi, ci])
+                + KIT_WEIGHT[cls] * flight.distance * aircraft.cost_per_kg_per_km
+                + float(ctx.processing_cost[di, ci])
+            )
+            ready = flight.arrival + int(ctx.processing_time[di, ci])
+            # loads are decided the round before departure, from that stock
+            decided = flight.departure - 1
+            u = net.node((oi, decided), decided)
+            v = net.node((di, ready), ready) if ready <= end else sink
+
+            e_served = net.arc(u, v, served, unit - self.penalty[cls])
+            e_extra = net.arc(u, v, kit_capacity - served, unit)
+            flight_arcs.append((flight, e_served, e_extra))
+
+        # holding chains and drains, nodes of an airport in time order
+        chains: Dict[int, List[int]] = {}
+        for v, key in enumerate(net.keys):
+            if key[0] != "sink":
+                chains.setdefault(key[0], []).append(v)
+        holds = {}
+        for nodes in chains.values():
+            nodes.sort(key=net.times.__getitem__)
+            for u, v in zip(nodes, nodes[1:] + [sink]):
+                holds[u] = net.arc(u, v, INF, 0.0)
+
+        return net, chains, holds, flight_arcs
+
+    def _solve_class(self, ci, cls, flights, arrivals, now, end, limit, deadline):
+        net, chains, holds, flight_arcs = self._build(
+            ci, cls, flights, arrivals, now, end
+        )
+        warm = self.warm[cls]
+        n = len(net.keys)
+
+        # 1. flows: previous flight-arc flows, holding flows follow from them
+        excess = list(net.supply)
+        for flight, e_served, e_extra in flight_arcs:
+            for kind, e in (("served", e_served), ("extra", e_extra)):
+                previous = min(warm.flows.get((flight.flight_id, kind), 0), net.cap[e])
+                if previous > 0:
+                    net.push(e, previous, excess)
+        for nodes in chains.values():
+            for v in nodes:
+                if excess[v] > 0:
+                    net.push(holds[v], excess[v], excess)
+
+        # 2. potentials: keep the previous ones, lower them along the
+        # uncapacitated arcs (in time order) so those never need saturating
+        order = sorted(range(n), key=net.times.__getitem__)
+        pot = [warm.potentials.get(net.keys[v]) for v in range(n)]
+        incoming: List[List[int]] = [[] for _ in range(n)]
+        for e in range(0, len(net.head), 2):
+            incoming[net.head[e]].append(e)
+        for v in order:
+            known = pot[v] is not None
+            for e in incoming[v]:
+                u = net.tail(e)
+                # a new node respects every arc into it, a known one the
+                # uncapacitated ones
+                if net.res[e] <= 0 or (known and net.cap[e] != INF):
+                    continue
+                candidate = pot[u] + net.cost[e]
+                if pot[v] is None or candidate < pot[v]:
+                    pot[v] = candidate
+            if pot[v] is None:
+                pot[v] = 0.0
+
+        # 3. saturate every residual arc with a negative reduced cost
+        for e in range(len(net.head)):
+            if net.res[e] > 0 and net.cap[e] != INF:
+                u, v = net.tail(e), net.head[e]
+                if net.cost[e] + pot[u] - pot[v] < -EPS:
+                    net.push(e, net.res[e], excess)
+
+        # 4. successive shortest paths from surplus to deficit nodes
+        self._reroute(net, pot, excess, limit, deadline)
+
+        # 5. keep the solution for the next round, report this round's loads
+        warm.flows = {}
+        boarding = {}
+        for flight, e_served, e_extra in flight_arcs:
+            served, extra = net.flow(e_served), net.flow(e_extra)
+            warm.flows[(flight.flight_id, "served")] = served
+            warm.flows[(flight.flight_id, "extra")] = extra
+            if flight.departure == now + 1 and flight.status == FlightStatus.CHECKED_IN.value:
+                boarding[flight.flight_id] = served + extra
+        warm.potentials = {net.keys[v]: pot[v] for v in range(n)}
+        return boarding
+
+    def _reroute(self, net: _Network, pot, excess, limit, deadline) -> None:
+        # until no surplus is left, `limit` augmentations in total, or the
+        # safety deadline
+        n = len(net.keys)
+        while True:
+            sources = [v for v in range(n) if excess[v] > 0]
+            if not sources:
+                return
+            if self.augmentations >= limit or time.perf_counter() > deadline:
+                self.exhausted = True
+                return
+
+            dist = [None] * n
+            parent = [-1] * n
+            heap = [(0.0, v) for v in sources]
+            for v in sources:
+                dist[v] = 0.0
+            done = [False] * n
+            target = None
+            while heap:
+                d, u = heapq.heappop(heap)
+                if done[u]:
+                    continue
+                done[u] = True
+                if excess[u] < 0:
+                    target = u
+                    break
+                for e in net.out[u]:
+                    if net.res[e] <= 0:
+                        continue
+                    v = net.head[e]
+                    nd = d + net.cost[e] + pot[u] - pot[v]
+                    if dist[v] is None or nd < dist[v] - EPS:
+                        dist[v] = nd
+                        parent[v] = e
+                        heapq.heappush(heap, (nd, v))
+            if target is None:
+                # nothing reachable can absorb the surplus
+                self.exhausted = True
+                return
+
+            reach = dist[target]
+            for v in range(n):
+                pot[v] += dist[v] if done[v] else reach
+
+            # bottleneck along the path back to a surplus node
+            amount, v = -excess[target], target
+            while parent[v] != -1:
+                e = parent[v]
+                amount = min(amount, net.res[e])
+                v = net.tail(e)
+            amount = min(amount, excess[v])
+            v = target
+            while parent[v] != -1:
+                e = parent[v]
+                net.push(e, amount, excess)
+                v = net.tail(e)
+            self.augmentations += 1
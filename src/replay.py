@@ -0,0 +1,256 @@
+import argparse
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from api_client import ApiClient
+from context import Context
+from decision_maker import DecisionMaker
+from metrics import Metrics
+from roundlog import RoundLogWriter, load_index, read_record, write_index
+from state import State
+from transport import LocalResponse, TransportResponse
+from utils import *
+
+"""
+Record / replay of API traffic.
+
+RecordingTransport wraps any transport and writes every session start,
+round request, round response and session end to a RoundLog (same format
+as the checkpoint log), plus an index so a replay can seek to any round.
+
+ReplayTransport answers from such a trace without network, and compares
+each request it gets with the recorded one. Round responses (flight
+events) do not depend on the loads sent, so a different strategy can be
+replayed over a recorded session; only the costs in the responses are the
+recorded ones.
+
+    python replay.py trace.rlog --mode planner --from-round 300
+replays 720 rounds at CPU speed, using the recorded loads before round 300
+(fast-forward) and the strategy after it, and reports phase timings and
+where the new decisions differ.
+"""
+
+_ENDPOINT_KINDS = {"round": b"R", "end": b"E"}
+
+
+class RecordingTransport:
+    def __init__(self, inner, path: str):
+        self.inner = inner
+        self.path = path
+        self.log = RoundLogWriter(path)
+
+    def submit(self, url: str, headers: dict, body: Optional[dict] = None) -> Future:
+        future = self.inner.submit(url, headers, body)
+        endpoint = url.rsplit("/", 1)[-1]
+        hour = encode_time(body["day"], body["hour"]) if body else 0
+        if endpoint == "round":
+            self.log.write(b"Q", hour, body)
+        future.add_done_callback(lambda done: self._record(endpoint, hour, done))
+        return future
+
+    def _record(self, endpoint: str, hour: int, done: Future) -> None:
+        if done.exception() is not None:
+            return
+        response = done.result()
+        if response.status_code != 200:
+            return
+        if endpoint == "start":
+            self.log.write(b"S", 0, {"session_id": response.text})
+            return
+        # in-process responses carry a dict, HTTP ones the JSON bytes
+        payload = getattr(response, "payload", None)
+        self.log.write(
+            _ENDPOINT_KINDS[endpoint], hour, payload if payload is not None else response.content
+        )
+
+    def close(self) -> None:
+        self.inner.close()
+        self.log.close()
+        write_index(f"{self.path}.idx", self.log.index, self.log.offset)
+        print(f"Recorded {len(self.log.index)} records to {self.path}")
+
+
+class RoundTrace:
+    # indexed read access to a recorded session
+    def __init__(self, path: str):
+        self.path = path
+        self.requests: Dict[int, int] = {}
+        self.responses: Dict[int, int] = {}
+        self._session: Optional[int] = None
+        self._end: Optional[int] = None
+        for offset, kind, hour in load_index(path):
+            if kind == b"Q":
+                self.requests[hour] = offset
+            elif kind == b"R":
+                self.responses[hour] = offset
+            elif kind == b"S":
+                self._session = offset
+            elif kind == b"E":
+                self._end = offset
+        self._file = open(path, "rb")
+
+    @property
+    def hours(self) -> List[int]:
+        return sorted(self.responses)
+
+    @property
+    def session_id(self) -> str:
+        if self._session is None:
+            return "replay"
+        return read_record(self._file, self._session)["session_id"]
+
+    def request(self, hour: int) -> Optional[dict]:
+        offset = self.requests.get(hour)
+        return None if offset is None else read_record(self._file, offset)
+
+    def response(self, hour: int) -> Optional[dict]:
+        offset = self.responses.get(hour)
+        return None if offset is None else read_record(self._file, offset)
+
+    def end(self) -> Optional[dict]:
+        return None if self._end is None else read_record(self._file, self._end)
+
+    def loads(self, hour: int) -> Dict[str, Dict[str, int]]:
+        # recorded kits per flight and class for that round
+        request = self.request(hour) or {}
+        return {
+            load["flightId"]: {cls: load["loadedKits"][cls] for cls in CLASS_KEYS}
+            for load in request.get("flightLoads", [])
+        }
+
+    def close(self) -> None:
+        self._file.close()
+
+
+@dataclass
+class DecisionDiff:
+    hour: int
+    flight_id: str
+    recorded: Optional[dict]
+    replayed: Optional[dict]
+
+
+def diff_requests(hour: int, recorded: dict, replayed: dict) -> List[DecisionDiff]:
+    def by_flight(request):
+        return {
+            load["flightId"]: load["loadedKits"]
+            for load in request.get("flightLoads", [])
+        }
+
+    old, new = by_flight(recorded), by_flight(replayed)
+    diffs = []
+    for flight_id in sorted(old.keys() | new.keys()):
+        if old.get(flight_id) != new.get(flight_id):
+            diffs.append(DecisionDiff(hour, flight_id, old.get(flight_id), new.get(flight_id)))
+    return diffs
+
+
+class ReplayTransport:
+    def __init__(self, trace: RoundTrace, compare_from: int = 0):
+        self.trace = trace
+        # rounds before this one are not compared (fast-forwarded)
+        self.compare_from = compare_from
+        self.diffs: List[DecisionDiff] = []
+
+    def submit(self, url: str, headers: dict, body: Optional[dict] = None) -> Future:
+        future = Future()
+        if url.endswith("/api/v1/session/start"):
+            future.set_result(TransportResponse(200, "OK", self.trace.session_id.encode()))
+        elif url.endswith("/api/v1/play/round"):
+            hour = encode_time(body["day"], body["hour"])
+            response = self.trace.response(hour)
+            if response is None:
+                future.set_result(
+                    TransportResponse(404, "Not Recorded", b'{"message": "Round not in trace."}')
+                )
+                return future
+            recorded = self.trace.request(hour)
+            if hour >= self.compare_from and recorded is not None:
+                self.diffs += diff_requests(hour, recorded, body)
+            future.set_result(LocalResponse(200, response))
+        else:
+            future.set_result(LocalResponse(200, self.trace.end() or {}))
+        return future
+
+    def report(self, limit: int = 10) -> dict:
+        hours = sorted({diff.hour for diff in self.diffs})
+        kits = {cls: 0 for cls in CLASS_KEYS}
+        for diff in self.diffs:
+            for cls in CLASS_KEYS:
+                kits[cls] += (diff.replayed or {}).get(cls, 0) - (diff.recorded or {}).get(cls, 0)
+        return {
+            "differing_loads": len(self.diffs),
+            "differing_rounds": len(hours),
+            "first_difference": hours[0] if hours else None,
+            "kit_delta": kits,
+            "examples": [vars(diff) for diff in self.diffs[:limit]],
+        }
+
+    def close(self) -> None:
+        self.trace.close()
+
+
+def replay(
+    path: str,
+    from_round: int = 0,
+    mode: str = "greedy",
+    metrics: Optional[Metrics] = None,
+) -> ReplayTransport:
+    # recorded loads before `from_round`, the strategy from there on
+    trace = RoundTrace(path)
+    transport = ReplayTransport(trace, compare_from=from_round)
+    metrics = metrics or Metrics()
+    client = ApiClient("replay", "replay", transport, metrics=metrics)
+
+    context = Context()
+    state = State(context)
+    decision_maker = DecisionMaker(context, mode=mode)
+    client.start_session()
+    while state.time in trace.responses:
+        metrics.begin_round(state.time)
+        with metrics.phase("init_update_state"):
+            state.init_update_state()
+        planned = None
+        if state.time < from_round:
+            planned = trace.loads(state.time)
+            if mode == "planner":
+                # warm starts as in the recorded run, for the same plans after it
+                decision_maker.plan(state)
+        with metrics.phase("make_decision"):
+            decision = decision_maker.make_decision(state, planned)
+        response = client.play_round(decision)
+        with metrics.phase("update_state"):
+            state.update_state(response)
+        metrics.end_round()
+    return transport
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Replay a recorded session")
+    arg_parser.add_argument("trace", help="log written with RECORD_TRACE")
+    arg_parser.add_argument("--from-round", type=int, default=0)
+    arg_parser.add_argument("--mode", default="greedy", choices=("greedy", "planner"))
+    args = arg_parser.parse_args()
+
+    metrics = Metrics(enabled=True)
+    start = time.perf_counter()
+    transport = replay(args.trace, args.from_round, args.mode, metrics)
+    elapsed = time.perf_counter() - start
+    transport.close()
+
+    print(f"Replayed {len(metrics.rounds)} rounds in {elapsed:.2f} s")
+    for name, stats in metrics.summary()["phases"].items():
+        print(f"{name:>18}: mean {stats['mean_ms']:.3f} ms, total {stats['total_s']:.2f} s")
+    report = transport.report()
+    print(
+        f"{report['differing_loads']} loads differ in {report['differing_rounds']} rounds"
+        f" (first at hour {report['first_difference']}), kit delta {report['kit_delta']}"
+    )
+    for example in report["examples"]:
+        print(f"  {example}")
+
+
+if __name__ == "__main__":
+    main()
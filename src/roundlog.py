@@ -0,0 +1,168 @@
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+from typing import Callable, Iterator, List, Tuple
+
+"""
+RoundLog = append-only binary log of session traffic.
+
+File = MAGIC, then records: header (payload length, crc32, kind, hour)
+followed by the zlib-compressed JSON payload. Kinds are one byte, e.g.
+b"S" session start, b"Q" round request, b"R" round response, b"E" end.
+
+Payloads are JSON objects, or bytes that already hold JSON (written as
+they are). The writer keeps (offset, kind, hour) of every record it
+wrote; write_index() saves that next to the log as `<log>.idx` so a
+reader can seek straight to a round instead of scanning.
+
+A crash can leave a torn record at the tail; readers stop at the first
+record that is short or fails its checksum, and opening the log for
+appending cuts that tail off first.
+
+RoundLogWriter serializes, compresses and writes on its own thread, the
+caller only pays for a queue put. Payloads must not be mutated after
+being handed over.
+"""
+
+MAGIC = b"RLOG1\n"
+_HEADER = struct.Struct("<IIcI")
+# index file: log length it describes, then one row per record
+_INDEX_HEADER = struct.Struct("<Q")
+_INDEX_ROW = struct.Struct("<QcI")
+
+
+def encode_record(kind: bytes, hour: int, payload) -> bytes:
+    if not isinstance(payload, bytes):
+        payload = json.dumps(payload, separators=(",", ":")).encode()
+    data = zlib.compress(payload, 1)
+    return _HEADER.pack(len(data), zlib.crc32(data), kind, hour) + data
+
+
+def scan_records(path: str) -> Iterator[Tuple[int, bytes, int, bytes]]:
+    # (offset, kind, hour, compressed payload) of every intact record
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a round log")
+        offset = len(MAGIC)
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, crc, kind, hour = _HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                return
+            yield offset, kind, hour, data
+            offset += _HEADER.size + length
+
+
+def decode_payload(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+
+def read_records(path: str) -> Iterator[Tuple[bytes, int, object]]:
+    for _, kind, hour, data in scan_records(path):
+        yield kind, hour, decode_payload(data)
+
+
+def read_record(f, offset: int):
+    # the payload of the record at `offset`, f an open binary file
+    f.seek(offset)
+    length, crc, _, _ = _HEADER.unpack(f.read(_HEADER.size))
+    data = f.read(length)
+    if len(data) < length or zlib.crc32(data) != crc:
+        raise ValueError(f"Corrupt round log record at offset {offset}")
+    return decode_payload(data)
+
+
+def write_index(path: str, rows: List[Tuple[int, bytes, int]], log_length: int) -> None:
+    with open(path, "wb") as f:
+        f.write(_INDEX_HEADER.pack(log_length))
+        for row in rows:
+            f.write(_INDEX_ROW.pack(*row))
+
+
+def load_index(log_path: str) -> List[Tuple[int, bytes, int]]:
+    # (offset, kind, hour) per record, from <log>.idx when it is current
+    index_path = f"{log_path}.idx"
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            data = f.read()
+        (log_length,) = _INDEX_HEADER.unpack_from(data)
+        if log_length == os.path.getsize(log_path):
+            return list(_INDEX_ROW.iter_unpack(data[_INDEX_HEADER.size :]))
+    return [(offset, kind, hour) for offset, kind, hour, _ in scan_records(log_path)]
+
+
+def valid_length(path: str) -> int:
+    # bytes up to the end of the last intact record
+    end = len(MAGIC)
+    for offset, _, _, data in scan_records(path):
+        end = offset + _HEADER.size + len(data)
+    return end
+
+
+class RoundLogWriter:
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            end = valid_length(path)
+            self._file = open(path, "r+b")
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, "wb")
+            self._file.write(MAGIC)
+        # bytes written so far, i.e. the offset of the next record
+        self.offset = self._file.tell()
+        # (offset, kind, hour) of the records written by this writer
+        self.index: List[Tuple[int, bytes, int]] = []
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._drain, name="round-log", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, kind: bytes, hour: int, payload) -> None:
+        self._queue.put((kind, hour, payload))
+
+    def call(self, fn: Callable[[], None]) -> None:
+        # runs fn on the writer thread, after everything queued before it
+        self._queue.put(fn)
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if callable(item):
+                    item()
+                    continue
+                kind, hour, payload = item
+                record = encode_record(kind, hour, payload)
+                self._file.write(record)
+                # in the OS cache, survives the process dying
+                self._file.flush()
+                self.index.append((self.offset, kind, hour))
+                self.offset += len(record)
+            except Exception as e:
+                print(f"Round log write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def sync(self) -> None:
+        # flushed to disk, survives the machine dying (writer thread only)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import csv
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+# before utils is imported, it reads DATA_DIR from the environment
+load_dotenv()
+
+from api_client import ApiClient  # noqa: E402
+from app import App  # noqa: E402
+from context import Context  # noqa: E402
+from transport import AsyncTransport  # noqa: E402
+from utils import DATA_DIR  # noqa: E402
+
+"""
+Runner = several sessions at once, one per API key of teams.csv, each
+playing its own strategy.
+
+    python runner.py --sessions 3 --modes greedy,planner
+
+The sessions run as coroutines on one event loop (App.run_async): while a
+round of one session is on the network, the others compute theirs. They
+share one aiohttp pool and one parsed Context, frozen read-only. What a
+session owns is its stock matrix (Context.with_stock), its State (flight
+table, inventory wheel) and its decision maker.
+"""
+
+
+@dataclass
+class Team:
+    name: str
+    api_key: str
+
+
+def load_teams(
+    path: str = os.path.join(DATA_DIR, "teams.csv"), internal: bool = False
+) -> List[Team]:
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    return [
+        Team(row["name"], row["api_key"])
+        for row in rows
+        if internal or row.get("internal_use", "false").lower() != "true"
+    ]
+
+
+def build_apps(
+    context: Context,
+    teams: List[Team],
+    modes: List[str],
+    base_url: str,
+    transport,
+) -> List[App]:
+    # one App per team, `modes` in the same order
+    context.freeze()
+    return [
+        App(
+            context=context.with_stock(),
+            client=ApiClient(base_url=base_url, api_key=team.api_key, transport=transport),
+            mode=mode,
+        )
+        for team, mode in zip(teams, modes)
+    ]
+
+
+async def run_apps(apps: List[App]) -> List[dict]:
+    return await asyncio.gather(*(app.run_async() for app in apps))
+
+
+def run_sessions(
+    teams: List[Team],
+    modes: List[str],
+    base_url: str,
+    context: Optional[Context] = None,
+    transport=None,
+) -> List[dict]:
+    if not teams:
+        raise ValueError("No teams to run.")
+    # round-robin over the teams
+    modes = [modes[i % len(modes)] for i in range(len(teams))]
+    own_transport = transport is None
+    if own_transport:
+        transport = AsyncTransport(
+            timeout=float(os.getenv("HTTP_TIMEOUT", "30")),
+            retries=int(os.getenv("HTTP_RETRIES", "3")),
+            pool_size=len(teams),
+        )
+    try:
+        apps = build_apps(context or Context(), teams, modes, base_url, transport)
+        results = asyncio.run(run_apps(apps))
+    finally:
+        if own_transport:
+            transport.close()
+    for team, mode, result in zip(teams, modes, results):
+        result.update(team=team.name, mode=mode)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Concurrent sessions, one per team")
+    arg_parser.add_argument("--teams-file", default=os.path.join(DATA_DIR, "teams.csv"))
+    arg_parser.add_argument("--sessions", type=int, default=0, help="0 = every team")
+    arg_parser.add_argument(
+        "--modes", default="greedy", help="comma separated, assigned to the teams in turn"
+    )
+    arg_parser.add_argument("--internal", action="store_true", help="include internal teams")
+    arg_parser.add_argument("--base-url", default=os.getenv("BASE_URL", "http://localhost:8080"))
+    args = arg_parser.parse_args()
+
+    teams = load_teams(args.teams_file, args.internal)
+    if args.sessions:
+        teams = teams[: args.sessions]
+    start = time.perf_counter()
+    results = run_sessions(teams, args.modes.split(","), args.base_url)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result["error"] is not None:
+            print(f"{result['team']:>20} {result['mode']:>8}: error {result['error']}")
+            continue
+        print(
+            f"{result['team']:>20} {result['mode']:>8}: cost {result['cost']:,.2f}"
+            f" penalty {result['penalty']:,.2f} {result['penalties']}"
+        )
+    print(f"{len(results)} sessions in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,532 @@
+import argparse
+import csv
+import itertools
+import os
+import shutil
+import string
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils import CLASS_KEYS, DATA_DIR, ROOT_DIR
+
+"""
+Scenario generator = synthetic networks in the bundled CSV schemas.
+
+The bundled data (data/) is one hub and ~160 spokes. generate() writes a
+scenario of any size into a directory, in the same four files:
+
+    airports_with_stocks.csv  hubs HUB1..HUBn, spokes with random codes
+    aircraft_types.csv        the bundled types, as they are
+    flight_plan.csv           weekly schedule, round trips spoke <-> home hub
+                              and hub <-> hub trunks
+    flights.csv               the schedule played out over `days` days
+
+What each column follows:
+
+    processing times     statistics/processing_times_summary.csv
+                         (normal with the class mean / std, clipped to min / max)
+    capacity, stock      statistics/airport_stock_capacity_summary.csv, a
+                         random spoke row (hubs: the hub row), scaled by how
+                         much traffic the airport gets vs. the bundled one
+    passengers           route mean from route_demand_distance_summary.csv,
+                         split per class as in flight_kits_vs_capacity_summary.csv,
+                         per flight spread as in data/flights.csv
+    route distances      route_demand_distance_summary.csv
+    everything else      resampled from the templates in data/ (costs, day
+                         masks, departure hours, delays, detours, aircraft)
+
+Rows are streamed: the plan (~60k rows for 1M flights) is held in memory,
+flights are generated and written one day at a time. The same seed gives
+byte-identical files.
+
+    python scenario.py ../scenarios/large --airports 5000 --hubs 5 --flights 1000000
+    python simulator.py --data-dir ../scenarios/large
+    DATA_DIR=../scenarios/large python main.py
+"""
+
+STATISTICS_DIR = os.path.join(ROOT_DIR, "statistics")
+
+DAY_COLUMNS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# CSV column prefix of each class, CLASS_KEYS order
+CLASS_COLUMNS = ("first", "business", "premium_economy", "economy")
+STOCK_COLUMNS = ("fc", "bc", "pe", "ec")
+# class names used by the statistics summaries
+SUMMARY_CLASSES = {
+    "first": "First",
+    "business": "Business",
+    "premiumEconomy": "PremiumEconomy",
+    "economy": "Economy",
+}
+
+AIRPORT_HEADER = (
+    ["id", "code", "name"]
+    + [f"{c}_processing_time" for c in CLASS_COLUMNS]
+    + [f"{c}_processing_cost" for c in CLASS_COLUMNS]
+    + [f"{c}_loading_cost" for c in CLASS_COLUMNS]
+    + [f"initial_{c}_stock" for c in STOCK_COLUMNS]
+    + [f"capacity_{c}" for c in STOCK_COLUMNS]
+)
+PLAN_HEADER = [
+    "depart_code",
+    "arrival_code",
+    "scheduled_hour",
+    "scheduled_arrival_hour",
+    "arrival_next_day",
+    "distance_km",
+] + DAY_COLUMNS
+FLIGHT_HEADER = (
+    [
+        "id",
+        "flight_number",
+        "origin_airport_id",
+        "destination_airport_id",
+        "sched_aircraft_type_id",
+        "act_aircraft_type_id",
+        "scheduled_depart_day",
+        "scheduled_depart_hour",
+        "scheduled_arrival_day",
+        "scheduled_arrival_hour",
+        "distance",
+        "actual_distance",
+        "actual_arival_day",
+        "actual_arrival_hour",
+    ]
+    + [f"planned_{c}_passengers" for c in CLASS_COLUMNS]
+    + [f"actual_{c}_passengers" for c in CLASS_COLUMNS]
+)
+
+# hours between a leg landing and the return leg leaving (bundled plan: 1-2)
+TURNAROUND = (1, 2)
+
+
+@dataclass
+class ScenarioConfig:
+    airports: int = 5000
+    hubs: int = 5
+    flights: int = 1_000_000
+    days: int = 31
+    seed: int = 0
+    # share of the round trips flown between hubs
+    trunk_share: float = 0.1
+
+    def __post_init__(self):
+        if self.hubs < 1 or self.airports <= self.hubs:
+            raise ValueError("Need at least one hub and one spoke")
+        if self.flights < 1 or self.days < 1:
+            raise ValueError("flights and days must be positive")
+        if not 0.0 <= self.trunk_share < 1.0:
+            raise ValueError("trunk_share must be in [0, 1)")
+
+
+@dataclass
+class Templates:
+    """
+    Everything the generator samples from, read from data/ and statistics/.
+    """
+
+    hub: pd.Series
+    spoke_costs: np.ndarray  # spoke x 8, processing then loading cost
+    stock_capacity: pd.DataFrame  # spoke rows of the summary
+    hub_stock_capacity: pd.Series
+    processing: pd.DataFrame  # indexed by summary class name
+    route_pax: np.ndarray
+    route_distance: np.ndarray
+    class_share: np.ndarray  # per class, of a flight's passengers
+    class_max: np.ndarray
+    class_cv: np.ndarray  # spread of a class's passengers on one route
+    planned_offset: np.ndarray  # flight x class, planned - actual
+    aircraft: pd.DataFrame
+    aircraft_weights: np.ndarray
+    swap_rate: float  # flights flown by another aircraft type
+    day_masks: np.ndarray  # plan row x 7
+    departure_hours: np.ndarray
+    delays: np.ndarray  # hours
+    detours: np.ndarray  # actual / planned distance
+    km_per_hour: float
+    hub_traffic: int  # flights touching the bundled hub
+    spoke_traffic: float  # mean flights touching a bundled spoke
+
+    @classmethod
+    def load(cls, data_dir: str = DATA_DIR, statistics_dir: str = STATISTICS_DIR):
+        airports = pd.read_csv(os.path.join(data_dir, "airports_with_stocks.csv"), sep=";")
+        aircraft = pd.read_csv(os.path.join(data_dir, "aircraft_types.csv"), sep=";")
+        plan = pd.read_csv(os.path.join(data_dir, "flight_plan.csv"), sep=";")
+        flights = pd.read_csv(os.path.join(data_dir, "flights.csv"), sep=";")
+
+        def summary(name):
+            return pd.read_csv(os.path.join(statistics_dir, f"{name}_summary.csv"))
+
+        stock_capacity = summary("airport_stock_capacity")
+        processing = summary("processing_times").set_index("class")
+        kits = summary("flight_kits_vs_capacity").set_index("class")
+        routes = summary("route_demand_distance")
+
+        # the hub is the airport every bundled flight touches
+        hub_mask = airports["id"].isin(flights["origin_airport_id"].value_counts().index[:1])
+        hub_code = airports.loc[hub_mask, "code"].iloc[0]
+        spokes = airports[~hub_mask]
+        cost_columns = [f"{c}_processing_cost" for c in CLASS_COLUMNS] + [
+            f"{c}_loading_cost" for c in CLASS_COLUMNS
+        ]
+
+        actual = flights[[f"actual_{c}_passengers" for c in CLASS_COLUMNS]].to_numpy()
+        planned = flights[[f"planned_{c}_passengers" for c in CLASS_COLUMNS]].to_numpy()
+        by_route = flights.groupby("flight_number")[
+            [f"actual_{c}_passengers" for c in CLASS_COLUMNS]
+        ]
+        cv = (by_route.std() / by_route.mean()).median().to_numpy()
+
+        departure = flights["scheduled_depart_day"] * 24 + flights["scheduled_depart_hour"]
+        arrival = flights["scheduled_arrival_day"] * 24 + flights["scheduled_arrival_hour"]
+        landed = flights["actual_arival_day"] * 24 + flights["actual_arrival_hour"]
+        share = kits.loc[list(CLASS_KEYS), "avg_kits_needed"].to_numpy()
+
+        return cls(
+            hub=airports[hub_mask].iloc[0],
+            spoke_costs=spokes[cost_columns].to_numpy(dtype=np.float64),
+            stock_capacity=stock_capacity[stock_capacity["code"] != hub_code],
+            hub_stock_capacity=stock_capacity[stock_capacity["code"] == hub_code].iloc[0],
+            processing=processing,
+            route_pax=routes["avg_actual_pax"].to_numpy(),
+            route_distance=routes["median_distance"].to_numpy(),
+            class_share=share / share.sum(),
+            class_max=kits.loc[list(CLASS_KEYS), "max_kits_needed"].to_numpy(),
+            class_cv=cv,
+            planned_offset=planned - actual,
+            aircraft=aircraft,
+            aircraft_weights=flights["act_aircraft_type_id"]
+            .value_counts(normalize=True)
+            .reindex(aircraft["id"], fill_value=0.0)
+            .to_numpy(),
+            swap_rate=float(
+                (flights["sched_aircraft_type_id"] != flights["act_aircraft_type_id"]).mean()
+            ),
+            day_masks=plan[DAY_COLUMNS].to_numpy(dtype=np.int64),
+            departure_hours=plan["scheduled_hour"].to_numpy(),
+            delays=(landed - arrival).to_numpy(),
+            detours=(flights["actual_distance"] / flights["distance"]).to_numpy(),
+            km_per_hour=float((flights["distance"] / (arrival - departure)).max()),
+            hub_traffic=len(flights),
+            spoke_traffic=len(flights) / len(spokes),
+        )
+
+
+def random_ids(rng: np.random.Generator, n: int) -> List[str]:
+    # uuid4 strings drawn from the seeded generator
+    raw = rng.bytes(16 * n)
+    return [str(uuid.UUID(bytes=raw[16 * i : 16 * i + 16], version=4)) for i in range(n)]
+
+
+def spoke_codes(rng: np.random.Generator, n: int) -> List[str]:
+    letters = string.ascii_uppercase
+    codes = []
+    for value in rng.choice(26**4, size=n, replace=False):
+        code = ""
+        for _ in range(4):
+            value, digit = divmod(int(value), 26)
+            code += letters[digit]
+        codes.append(code)
+    return codes
+
+
+def flight_number(row: int) -> str:
+    # AB1000 .. AB9999, then AC1000 ..
+    prefix, number = divmod(row, 9000)
+    first, second = divmod(prefix + 1, 26)
+    return f"{string.ascii_uppercase[first % 26]}{string.ascii_uppercase[second]}{1000 + number}"
+
+
+@dataclass
+class Plan:
+    # one entry per flight_plan.csv row
+    origin: np.ndarray  # airport index
+    destination: np.ndarray
+    departure_hour: np.ndarray
+    duration: np.ndarray
+    distance: np.ndarray
+    aircraft: np.ndarray  # template aircraft row
+    route_pax: np.ndarray
+    day_masks: np.ndarray  # row x 7
+
+
+def build_plan(
+    config: ScenarioConfig, templates: Templates, rng: np.random.Generator
+) -> Plan:
+    hubs = config.hubs
+    spokes = np.arange(hubs, config.airports)
+    trunks = [(a, b) for a in range(hubs) for b in range(a + 1, hubs)]
+
+    # routes: every spoke to its home hub, then hub pairs
+    route_ends = [(int(spoke) % hubs, int(spoke)) for spoke in spokes] + trunks
+    n_routes = len(route_ends)
+    distance = rng.choice(templates.route_distance, size=n_routes)
+    route_pax = rng.choice(templates.route_pax, size=n_routes)
+    aircraft = rng.choice(len(templates.aircraft), size=n_routes, p=templates.aircraft_weights)
+    # hubs are busier, trunks fly the biggest demand seen
+    route_pax[len(spokes) :] = templates.route_pax.max()
+
+    # flights a day mask yields over the scenario
+    weekday_counts = np.bincount(np.arange(config.days) % 7, minlength=7)
+    mask_flights = templates.day_masks @ weekday_counts
+
+    trips: List[tuple] = []
+    expected = 0
+    spoke_order = rng.permutation(len(spokes))
+    while expected < config.flights:
+        if len(trips) < len(spokes):
+            route = int(spoke_order[len(trips)])
+        elif trunks and rng.random() < config.trunk_share:
+            route = len(spokes) + int(rng.integers(len(trunks)))
+        else:
+            route = int(rng.integers(len(spokes)))
+        mask = int(rng.integers(len(templates.day_masks)))
+        if mask_flights[mask] == 0:
+            continue
+        trips.append((route, mask, int(rng.choice(templates.departure_hours))))
+        expected += 2 * int(mask_flights[mask])
+
+    origin, destination, departure_hour, duration = [], [], [], []
+    rows_distance, rows_aircraft, rows_pax, rows_mask = [], [], [], []
+    for route, mask, hour in trips:
+        a, b = route_ends[route]
+        hours = max(1, int(np.ceil(distance[route] / templates.km_per_hour)))
+        back = (hour + hours + int(rng.choice(TURNAROUND))) % 24
+        for start, end, leave in ((a, b, hour), (b, a, back)):
+            origin.append(start)
+            destination.append(end)
+            departure_hour.append(leave)
+            duration.append(hours)
+            rows_distance.append(distance[route])
+            rows_aircraft.append(aircraft[route])
+            rows_pax.append(route_pax[route])
+            rows_mask.append(templates.day_masks[mask])
+    return Plan(
+        origin=np.array(origin),
+        destination=np.array(destination),
+        departure_hour=np.array(departure_hour),
+        duration=np.array(duration),
+        distance=np.array(rows_distance, dtype=np.int64),
+        aircraft=np.array(rows_aircraft),
+        route_pax=np.array(rows_pax),
+        day_masks=np.array(rows_mask),
+    )
+
+
+def airport_rows(
+    config: ScenarioConfig,
+    templates: Templates,
+    plan: Plan,
+    ids: List[str],
+    codes: List[str],
+    rng: np.random.Generator,
+):
+    # flights touching each airport, against the bundled network's traffic
+    weekday_counts = np.bincount(np.arange(config.days) % 7, minlength=7)
+    per_row = plan.day_masks @ weekday_counts
+    traffic = np.bincount(plan.origin, per_row, config.airports) + np.bincount(
+        plan.destination, per_row, config.airports
+    )
+    stock_columns = [f"{cls}_stock" for cls in CLASS_KEYS]
+    capacity_columns = [f"{cls}_capacity" for cls in CLASS_KEYS]
+    processing = templates.processing.loc[[SUMMARY_CLASSES[cls] for cls in CLASS_KEYS]]
+
+    hub = templates.hub
+    hub_costs = hub[[f"{c}_processing_cost" for c in CLASS_COLUMNS]].tolist() + hub[
+        [f"{c}_loading_cost" for c in CLASS_COLUMNS]
+    ].tolist()
+    hub_times = hub[[f"{c}_processing_time" for c in CLASS_COLUMNS]].astype(int).tolist()
+    for index in range(config.airports):
+        if index < config.hubs:
+            scale = traffic[index] / templates.hub_traffic
+            source = templates.hub_stock_capacity
+            times, costs = hub_times, hub_costs
+            name = "Main Hub Airport" if index == 0 else f"Hub Airport {codes[index]}"
+        else:
+            scale = traffic[index] / templates.spoke_traffic
+            source = templates.stock_capacity.iloc[int(rng.integers(len(templates.stock_capacity)))]
+            times = np.clip(
+                np.rint(rng.normal(processing["mean"], processing["std"])),
+                processing["min"],
+                processing["max"],
+            ).astype(int).tolist()
+            costs = templates.spoke_costs[int(rng.integers(len(templates.spoke_costs)))].tolist()
+            name = f"Airport {codes[index]}"
+        capacity = np.maximum(
+            1, np.rint(source[capacity_columns].to_numpy(dtype=np.float64) * max(scale, 0.1))
+        )
+        ratio = source[stock_columns].to_numpy(dtype=np.float64) / source[
+            capacity_columns
+        ].to_numpy(dtype=np.float64)
+        stock = np.minimum(capacity, np.rint(capacity * ratio))
+        yield (
+            [ids[index], codes[index], name]
+            + times
+            + [round(cost, 2) for cost in costs]
+            + stock.astype(int).tolist()
+            + capacity.astype(int).tolist()
+        )
+
+
+def plan_rows(plan: Plan, codes: List[str]):
+    for row in range(len(plan.origin)):
+        arrival = int(plan.departure_hour[row] + plan.duration[row])
+        yield [
+            codes[plan.origin[row]],
+            codes[plan.destination[row]],
+            int(plan.departure_hour[row]),
+            arrival % 24,
+            int(arrival >= 24),
+            int(plan.distance[row]),
+        ] + plan.day_masks[row].tolist()
+
+
+def flight_rows(
+    config: ScenarioConfig,
+    templates: Templates,
+    plan: Plan,
+    airport_ids: List[str],
+    rng: np.random.Generator,
+):
+    # one batch of rows per day, in departure order
+    aircraft = templates.aircraft
+    aircraft_ids = aircraft["id"].to_numpy()
+    seats = aircraft[
+        ["first_class_seats", "business_seats", "premium_economy_seats", "economy_seats"]
+    ].to_numpy()
+    numbers = [flight_number(row) for row in range(len(plan.origin))]
+    shape = 1.0 / templates.class_cv**2
+
+    for day in range(config.days):
+        rows = np.flatnonzero(plan.day_masks[:, day % 7])
+        rows = rows[np.argsort(plan.departure_hour[rows], kind="stable")]
+        n = len(rows)
+        if n == 0:
+            continue
+
+        scheduled = plan.aircraft[rows]
+        swapped = rng.random(n) < templates.swap_rate
+        other = (scheduled + rng.integers(1, len(aircraft), n)) % len(aircraft)
+        flown = np.where(swapped, other, scheduled)
+
+        mean = plan.route_pax[rows, None] * templates.class_share
+        actual = np.rint(rng.gamma(shape, mean / shape))
+        actual = np.minimum(actual, np.minimum(templates.class_max, seats[flown])).astype(int)
+        offset = templates.planned_offset[rng.integers(len(templates.planned_offset), size=n)]
+        planned = np.clip(actual + offset, 0, seats[scheduled])
+
+        departure = day * 24 + plan.departure_hour[rows]
+        arrival = departure + plan.duration[rows]
+        landed = arrival + rng.choice(templates.delays, n)
+        distance = plan.distance[rows]
+        actual_distance = np.rint(distance * rng.choice(templates.detours, n)).astype(int)
+
+        ids = random_ids(rng, n)
+        columns = [
+            ids,
+            [numbers[row] for row in rows],
+            [airport_ids[i] for i in plan.origin[rows]],
+            [airport_ids[i] for i in plan.destination[rows]],
+            aircraft_ids[scheduled].tolist(),
+            aircraft_ids[flown].tolist(),
+            (departure // 24).tolist(),
+            (departure % 24).tolist(),
+            (arrival // 24).tolist(),
+            (arrival % 24).tolist(),
+            distance.tolist(),
+            actual_distance.tolist(),
+            (landed // 24).tolist(),
+            (landed % 24).tolist(),
+        ]
+        columns += [planned[:, c].tolist() for c in range(len(CLASS_KEYS))]
+        columns += [actual[:, c].tolist() for c in range(len(CLASS_KEYS))]
+        yield zip(*columns)
+
+
+def write_csv(path: str, header: List[str], rows) -> int:
+    count = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def generate(
+    config: ScenarioConfig,
+    out_dir: str,
+    data_dir: str = DATA_DIR,
+    statistics_dir: str = STATISTICS_DIR,
+) -> Dict[str, int]:
+    """
+    Writes a scenario into out_dir, returns the rows written per file.
+    """
+    templates = Templates.load(data_dir, statistics_dir)
+    rng = np.random.default_rng(config.seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    codes = [f"HUB{i + 1}" for i in range(config.hubs)] + spoke_codes(
+        rng, config.airports - config.hubs
+    )
+    airport_ids = random_ids(rng, config.airports)
+    plan = build_plan(config, templates, rng)
+
+    written = {}
+    written["airports_with_stocks.csv"] = write_csv(
+        os.path.join(out_dir, "airports_with_stocks.csv"),
+        AIRPORT_HEADER,
+        airport_rows(config, templates, plan, airport_ids, codes, rng),
+    )
+    shutil.copyfile(
+        os.path.join(data_dir, "aircraft_types.csv"),
+        os.path.join(out_dir, "aircraft_types.csv"),
+    )
+    written["aircraft_types.csv"] = len(templates.aircraft)
+    written["flight_plan.csv"] = write_csv(
+        os.path.join(out_dir, "flight_plan.csv"), PLAN_HEADER, plan_rows(plan, codes)
+    )
+
+    written["flights.csv"] = write_csv(
+        os.path.join(out_dir, "flights.csv"),
+        FLIGHT_HEADER,
+        itertools.chain.from_iterable(flight_rows(config, templates, plan, airport_ids, rng)),
+    )
+    return written
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic scenario")
+    arg_parser.add_argument("out_dir")
+    arg_parser.add_argument("--airports", type=int, default=5000)
+    arg_parser.add_argument("--hubs", type=int, default=5)
+    arg_parser.add_argument("--flights", type=int, default=1_000_000)
+    arg_parser.add_argument("--days", type=int, default=31)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--trunk-share", type=float, default=0.1)
+    arg_parser.add_argument("--data-dir", default=DATA_DIR, help="template CSVs")
+    args = arg_parser.parse_args()
+
+    config = ScenarioConfig(
+        airports=args.airports,
+        hubs=args.hubs,
+        flights=args.flights,
+        days=args.days,
+        seed=args.seed,
+        trunk_share=args.trunk_share,
+    )
+    start = time.perf_counter()
+    written = generate(config, args.out_dir, args.data_dir)
+    for name, rows in written.items():
+        print(f"{name}: {rows} rows")
+    print(f"Scenario written to {args.out_dir} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
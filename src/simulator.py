@@ -0,0 +1,520 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from context import Context
+from models import Aircraft, Airport, FlightRecord
+from parser import Parser
+from transport import LocalResponse, TransportResponse
+from utils import *
+
+"""
+Simulator = local stand-in for the HackitAll game server.
+It replays data/flights.csv hour by hour and speaks the same
+/api/v1/session/start, /api/v1/play/round and /api/v1/session/end contract,
+so App.run can play a full session offline.
+
+Round t (day, hour) works like this:
+- the loads sent for round t belong to flights that checked in at t
+- the clock moves to t + 1, flights departing at t + 1 take off with their loads
+- landed kits enter processing at the destination, processed kits reach stock
+- the response carries the flight events of hour t + 1
+"""
+
+# hours before departure a flight is announced (planned passengers)
+SCHEDULE_LEAD = 24
+# hours before departure a flight is checked in (actual passengers)
+CHECK_IN_LEAD = 1
+# responses above this size are gzipped when the client accepts it
+GZIP_MIN_BYTES = 1024
+
+
+def records_to_columns(records: List[FlightRecord]) -> Dict[str, np.ndarray]:
+    # flat arrays (ids as fixed-width bytes), e.g. to place them in shared memory
+    def passengers(attr):
+        return np.array(
+            [[getattr(r, attr)[cls] for cls in CLASS_KEYS] for r in records],
+            dtype=np.int32,
+        ).reshape(-1, len(CLASS_KEYS))
+
+    return {
+        "flight_id": np.array([r.flight_id for r in records], dtype="S"),
+        "flight_number": np.array([r.flight_number for r in records], dtype="S"),
+        "origin": np.array([r.origin_airport_id for r in records], dtype="S"),
+        "destination": np.array([r.destination_airport_id for r in records], dtype="S"),
+        "aircraft": np.array([r.aircraft_type_id for r in records], dtype="S"),
+        "departure": np.array([r.departure for r in records], dtype=np.int32),
+        "arrival": np.array([r.arrival for r in records], dtype=np.int32),
+        "distance": np.array([r.distance for r in records], dtype=np.int32),
+        "planned": passengers("planned_passengers"),
+        "actual": passengers("actual_passengers"),
+    }
+
+
+def records_from_columns(columns: Dict[str, np.ndarray]) -> List[FlightRecord]:
+    def text(name):
+        return [value.decode() for value in columns[name].tolist()]
+
+    def passengers(name):
+        return [dict(zip(CLASS_KEYS, row)) for row in columns[name].tolist()]
+
+    return [
+        FlightRecord(*fields)
+        for fields in zip(
+            text("flight_id"),
+            text("flight_number"),
+            text("origin"),
+            text("destination"),
+            text("aircraft"),
+            columns["departure"].tolist(),
+            columns["arrival"].tolist(),
+            columns["distance"].tolist(),
+            passengers("planned"),
+            passengers("actual"),
+        )
+    ]
+
+
+class SimulatorError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class Simulator:
+    data_dir: str = DATA_DIR
+    end_time: int = END_TIME
+    # already parsed data, read from data_dir when missing.
+    # the context is only read: its stock is the initial stock of every session
+    context: Optional[Context] = None
+    records: Optional[List[FlightRecord]] = None
+
+    def __post_init__(self):
+        parser = Parser()
+        if self.context is None:
+            aircraft_dict = parser.parse_aircraft(
+                os.path.join(self.data_dir, "aircraft_types.csv")
+            )
+            airport_dict, tables = parser.parse_airport_tables(
+                os.path.join(self.data_dir, "airports_with_stocks.csv")
+            )
+            self.context = Context(
+                aircraft_dict=aircraft_dict, airport_dict=airport_dict, tables=tables
+            )
+        if self.records is None:
+            self.records = parser.parse_flights(
+                os.path.join(self.data_dir, "flights.csv")
+            )
+        records = self.records
+        self.airport_dict: Dict[str, Airport] = self.context.airport_dict
+
+        # flights.csv references aircraft and airports by id
+        self.aircraft_by_id: Dict[str, Aircraft] = {
+            aircraft.type_id: aircraft for aircraft in self.context.aircraft_dict.values()
+        }
+        self.airport_by_id: Dict[str, Airport] = {
+            airport.id: airport for airport in self.airport_dict.values()
+        }
+
+        self.flights: Dict[str, FlightRecord] = {}
+        self.scheduled_at: Dict[int, List[FlightRecord]] = defaultdict(list)
+        self.check_in_at: Dict[int, List[FlightRecord]] = defaultdict(list)
+        self.departures: Dict[int, List[FlightRecord]] = defaultdict(list)
+        self.arrivals: Dict[int, List[FlightRecord]] = defaultdict(list)
+
+        for record in records:
+            if record.departure >= self.end_time:
+                continue
+            self.flights[record.flight_id] = record
+            # the first events are delivered with the answer to round 0
+            self.scheduled_at[max(1, record.departure - SCHEDULE_LEAD)].append(record)
+            if record.departure - CHECK_IN_LEAD >= 1:
+                self.check_in_at[record.departure - CHECK_IN_LEAD].append(record)
+            self.departures[record.departure].append(record)
+            self.arrivals[record.arrival].append(record)
+
+    def new_session(self) -> "SimSession":
+        return SimSession(self, str(uuid.uuid4()))
+
+    def initial_stock(self) -> Dict[str, Dict[str, int]]:
+        return {
+            code: {cls: getattr(airport, STOCK_FIELDS[cls]) for cls in CLASS_KEYS}
+            for code, airport in self.airport_dict.items()
+        }
+
+    def flight_event(self, record: FlightRecord, event_type: str) -> dict:
+        # flight events carry 1-based days, see State.update_flights
+        aircraft = self.aircraft_by_id[record.aircraft_type_id]
+        departure_day, departure_hour = decode_time(record.departure)
+        arrival_day, arrival_hour = decode_time(record.arrival)
+        if event_type == "SCHEDULED":
+            passengers = record.planned_passengers
+        else:
+            passengers = record.actual_passengers
+
+        return {
+            "eventType": event_type,
+            "flightNumber": record.flight_number,
+            "flightId": record.flight_id,
+            "originAirport": record.origin_airport_id,
+            "destinationAirport": record.destination_airport_id,
+            "departure": {"day": departure_day + 1, "hour": departure_hour},
+            "arrival": {"day": arrival_day + 1, "hour": arrival_hour},
+            "passengers": dict(passengers),
+            "aircraftType": aircraft.type_code,
+            "distance": record.distance,
+        }
+
+
+@dataclass
+class SimSession:
+    simulator: Simulator
+    session_id: str
+    time: int = 0
+    total_cost: float = 0.0
+    ended: bool = False
+
+    # airport code -> class -> kits
+    stock: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # hour -> [(airport code, class, kits)] reaching stock at that hour
+    processing: Dict[int, list] = field(default_factory=dict)
+    # flight id -> kits per class, waiting for departure / in the air
+    loads: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    in_flight: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    penalty_count: Dict[str, int] = field(default_factory=dict)
+    last_response: Optional[dict] = None
+
+    def __post_init__(self):
+        self.stock = self.simulator.initial_stock()
+
+    def _queue(self, hour: int, code: str, cls: str, quantity: int) -> None:
+        if hour not in self.processing:
+            self.processing[hour] = []
+        self.processing[hour].append((code, cls, quantity))
+
+    def _penalty(
+        self, penalties: list, code: str, amount: float, reason: str, flight=None
+    ) -> None:
+        entry = {"code": code, "penalty": amount, "reason": reason}
+        if flight is not None:
+            entry["flightId"] = flight.flight_id
+            entry["flightNumber"] = flight.flight_number
+        penalties.append(entry)
+        self.penalty_count[code] = self.penalty_count.get(code, 0) + 1
+
+    def play_round(self, body: dict) -> dict:
+        round_time = encode_time(int(body["day"]), int(body["hour"]))
+
+        # a retransmitted round is answered from cache instead of replayed
+        if self.last_response is not None and round_time == self.time - 1:
+            return self.last_response
+        if self.ended:
+            raise SimulatorError(400, "Session already ended.")
+        if round_time != self.time:
+            day, hour = decode_time(self.time)
+            raise SimulatorError(400, f"Expected round day {day} hour {hour}.")
+
+        simulator = self.simulator
+        penalties, cost = [], 0.0
+
+        # 1. purchases are delivered to the hub after the lead time
+        orders = body.get("kitPurchasingOrders") or {}
+        for cls in CLASS_KEYS:
+            quantity = int(orders.get(cls, 0))
+            if quantity > 0:
+                cost += quantity * KIT_COST[cls]
+                self._queue(round_time + RLT[cls], HUB_CODE, cls, quantity)
+
+        # 2. loads are only valid for flights checked in this round
+        for flight_load in body.get("flightLoads", []):
+            record = simulator.flights.get(flight_load["flightId"])
+            kits = {
+                cls: int(flight_load["loadedKits"].get(cls, 0)) for cls in CLASS_KEYS
+            }
+            if record is None or record.departure != round_time + CHECK_IN_LEAD:
+                wrong = sum(abs(q) for q in kits.values())
+                self._penalty(
+                    penalties,
+                    "INCORRECT_FLIGHT_LOAD",
+                    wrong * KIT_COST["economy"] * PENALTY_FACTORS["INCORRECT_FLIGHT_LOAD"],
+                    f"Flight {flight_load['flightId']} is not boarding this round.",
+                )
+                continue
+            self.loads[record.flight_id] = kits
+
+        # 3. advance the clock and run the hour
+        self.time = round_time + 1
+        cost += self._depart(penalties)
+        cost += self._land()
+        self._receive(penalties)
+
+        self.total_cost += cost + sum(p["penalty"] for p in penalties)
+        if self.time >= simulator.end_time:
+            self.ended = True
+
+        updates = []
+        if not self.ended:
+            for event_type, bucket in (
+                ("SCHEDULED", simulator.scheduled_at),
+                ("CHECKED_IN", simulator.check_in_at),
+                ("LANDED", simulator.arrivals),
+            ):
+                for record in bucket.get(self.time, ()):
+                    updates.append(simulator.flight_event(record, event_type))
+
+        day, hour = decode_time(self.time)
+        self.last_response = {
+            "day": day,
+            "hour": hour,
+            "flightUpdates": updates,
+            "penalties": penalties,
+            "totalCost": self.total_cost,
+        }
+        return self.last_response
+
+    def _depart(self, penalties: list) -> float:
+        simulator = self.simulator
+        cost = 0.0
+        touched = set()
+        for record in simulator.departures.get(self.time, ()):
+            kits = self.loads.pop(record.flight_id, {cls: 0 for cls in CLASS_KEYS})
+            origin = simulator.airport_by_id[record.origin_airport_id]
+            aircraft = simulator.aircraft_by_id[record.aircraft_type_id]
+
+            for cls in CLASS_KEYS:
+                quantity = max(0, kits[cls])
+                capacity = getattr(aircraft, CAPACITY_FIELDS[cls])
+                if quantity > capacity:
+                    self._penalty(
+                        penalties,
+                        "FLIGHT_OVERLOAD",
+                        (quantity - capacity)
+                        * KIT_COST[cls]
+                        * PENALTY_FACTORS["FLIGHT_OVERLOAD"],
+                        f"{cls} load {quantity} exceeds aircraft capacity {capacity}.",
+                        record,
+                    )
+                missing = record.actual_passengers[cls] - quantity
+                if missing > 0:
+                    self._penalty(
+                        penalties,
+                        "UNFULFILLED_PASSENGERS",
+                        missing
+                        * KIT_COST[cls]
+                        * PENALTY_FACTORS["UNFULFILLED_PASSENGERS"],
+                        f"{missing} {cls} passengers without a kit.",
+                        record,
+                    )
+
+                self.stock[origin.code][cls] -= quantity
+                cost += quantity * getattr(origin, LOADING_COST_FIELDS[cls])
+                cost += (
+                    quantity
+                    * KIT_WEIGHT[cls]
+                    * record.distance
+                    * aircraft.cost_per_kg_per_km
+                )
+                kits[cls] = quantity
+
+            touched.add(origin.code)
+            self.in_flight[record.flight_id] = kits
+
+        for code in touched:
+            for cls in CLASS_KEYS:
+                stock = self.stock[code][cls]
+                if stock < 0:
+                    self._penalty(
+                        penalties,
+                        "NEGATIVE_INVENTORY",
+                        -stock * KIT_COST[cls] * PENALTY_FACTORS["NEGATIVE_INVENTORY"],
+                        f"{code} {cls} stock is {stock}.",
+                    )
+        return cost
+
+    def _land(self) -> float:
+        simulator = self.simulator
+        cost = 0.0
+        for record in simulator.arrivals.get(self.time, ()):
+            kits = self.in_flight.pop(record.flight_id, None)
+            if not kits:
+                continue
+            destination = simulator.airport_by_id[record.destination_airport_id]
+            for cls in CLASS_KEYS:
+                quantity = kits[cls]
+                if quantity <= 0:
+                    continue
+                cost += quantity * getattr(destination, PROCESSING_COST_FIELDS[cls])
+                ready = self.time + getattr(destination, PROCESSING_TIME_FIELDS[cls])
+                self._queue(ready, destination.code, cls, quantity)
+        return cost
+
+    def _receive(self, penalties: list) -> None:
+        touched = set()
+        for code, cls, quantity in self.processing.pop(self.time, ()):
+            self.stock[code][cls] += quantity
+            touched.add((code, cls))
+
+        for code, cls in touched:
+            airport = self.simulator.airport_dict[code]
+            capacity = getattr(airport, AIRPORT_CAPACITY_FIELDS[cls])
+            over = self.stock[code][cls] - capacity
+            if over > 0:
+                self._penalty(
+                    penalties,
+                    "OVER_CAPACITY",
+                    over * KIT_COST[cls] * PENALTY_FACTORS["OVER_CAPACITY"],
+                    f"{code} {cls} stock exceeds capacity {capacity}.",
+                )
+
+    def end(self) -> dict:
+        self.ended = True
+        return {
+            "totalCost": self.total_cost,
+            "penalties": self.penalty_count,
+            "day": decode_time(self.time)[0],
+            "hour": decode_time(self.time)[1],
+        }
+
+
+class LocalTransport:
+    # in-process transport: ApiClient talks to a Simulator without HTTP
+    def __init__(self, simulator: Simulator):
+        self.simulator = simulator
+        self.sessions: Dict[str, SimSession] = {}
+
+    def submit(self, url: str, headers: dict, body: Optional[dict] = None) -> Future:
+        future = Future()
+        try:
+            if url.endswith("/api/v1/session/start"):
+                session = self.simulator.new_session()
+                self.sessions[session.session_id] = session
+                future.set_result(LocalResponse(200, session.session_id))
+                return future
+
+            session = self.sessions.get(headers.get("SESSION-ID"))
+            if session is None:
+                raise SimulatorError(404, "Unknown session.")
+            if url.endswith("/api/v1/play/round"):
+                future.set_result(LocalResponse(200, session.play_round(body)))
+            elif url.endswith("/api/v1/session/end"):
+                self.sessions.pop(session.session_id)
+                future.set_result(LocalResponse(200, session.end()))
+            else:
+                raise SimulatorError(404, f"Unknown endpoint {url}.")
+        except SimulatorError as e:
+            future.set_result(
+                TransportResponse(e.status, "Error", json.dumps({"message": e.message}).encode())
+            )
+        return future
+
+    def close(self) -> None:
+        self.sessions.clear()
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, simulator: Simulator):
+        super().__init__(address, SimulatorHandler)
+        self.simulator = simulator
+        self.sessions: Dict[str, SimSession] = {}
+        self.lock = threading.Lock()
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    # keep-alive, the client reuses one connection for the whole session
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes, don't wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload, content_type="application/json") -> None:
+        if content_type == "application/json":
+            body = json.dumps(payload).encode()
+        else:
+            body = str(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        accepted = self.headers.get("Accept-Encoding", "")
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return {}
+        raw = self.rfile.read(length)
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw)
+
+    def _session(self) -> SimSession:
+        session_id = self.headers.get("SESSION-ID")
+        session = self.server.sessions.get(session_id)
+        if session is None:
+            raise SimulatorError(404, f"Unknown session {session_id}.")
+        return session
+
+    def do_POST(self):
+        try:
+            body = self._read_body()
+            if not self.headers.get("API-KEY"):
+                raise SimulatorError(401, "Missing API-KEY header.")
+
+            with self.server.lock:
+                if self.path == "/api/v1/session/start":
+                    session = self.server.simulator.new_session()
+                    self.server.sessions[session.session_id] = session
+                    self._send(200, session.session_id, "text/plain")
+                elif self.path == "/api/v1/play/round":
+                    self._send(200, self._session().play_round(body))
+                elif self.path == "/api/v1/session/end":
+                    session = self._session()
+                    self.server.sessions.pop(session.session_id)
+                    self._send(200, session.end())
+                else:
+                    raise SimulatorError(404, f"Unknown endpoint {self.path}.")
+        except SimulatorError as e:
+            self._send(e.status, {"message": e.message})
+        except (KeyError, ValueError, TypeError) as e:
+            self._send(400, {"message": f"Malformed request: {e}"})
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Local HackitAll game server")
+    arg_parser.add_argument("--host", default="localhost")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--data-dir", default=DATA_DIR)
+    args = arg_parser.parse_args()
+
+    server = SimulatorServer((args.host, args.port), Simulator(args.data_dir))
+    print(f"Simulator listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import dataclasses
+import hashlib
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+
+from models import Aircraft, Airport, AirportTables
+from utils import *
+
+"""
+Snapshot = the static CSV data (aircraft types, airports and their tables)
+compiled once into a binary .npz under data/.cache.
+
+The file name carries a key built from the name, size, mtime and content
+hash of every input CSV, so editing a CSV simply misses the cache. Loading
+a snapshot needs numpy only; pandas (through Parser) is imported just when
+the snapshot has to be built.
+"""
+
+SNAPSHOT_INPUTS = ("aircraft_types.csv", "airports_with_stocks.csv")
+TABLE_FIELDS = ("stock", "capacity", "processing_time", "processing_cost", "loading_cost")
+AIRCRAFT_FIELDS = tuple(f.name for f in dataclasses.fields(Aircraft))
+
+
+def snapshot_key(data_dir: str = DATA_DIR, inputs=SNAPSHOT_INPUTS) -> str:
+    digest = hashlib.sha256()
+    for name in inputs:
+        path = os.path.join(data_dir, name)
+        info = os.stat(path)
+        digest.update(f"{name}:{info.st_size}:{info.st_mtime_ns}:".encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def parse_static_data(data_dir: str = DATA_DIR):
+    # the slow path: pandas over the CSVs
+    from parser import Parser
+
+    parser = Parser()
+    aircraft_dict = parser.parse_aircraft(os.path.join(data_dir, "aircraft_types.csv"))
+    airport_dict, tables = parser.parse_airport_tables(
+        os.path.join(data_dir, "airports_with_stocks.csv")
+    )
+    return aircraft_dict, airport_dict, tables
+
+
+def save_snapshot(
+    path: str,
+    aircraft_dict: Dict[str, Aircraft],
+    airport_dict: Dict[str, Airport],
+    tables: AirportTables,
+) -> None:
+    arrays = {name: getattr(tables, name) for name in TABLE_FIELDS}
+    airports = sorted(airport_dict.values(), key=lambda airport: airport.index)
+    arrays["airport.id"] = np.array([a.id for a in airports], dtype=str)
+    arrays["airport.code"] = np.array([a.code for a in airports], dtype=str)
+    arrays["airport.name"] = np.array([a.name for a in airports], dtype=str)
+    aircraft = list(aircraft_dict.values())
+    for name in AIRCRAFT_FIELDS:
+        arrays[f"aircraft.{name}"] = np.array([getattr(a, name) for a in aircraft])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write then rename, a crashed run never leaves a half-written snapshot
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str):
+    with np.load(path) as data:
+        tables = AirportTables(**{name: data[name] for name in TABLE_FIELDS})
+        ids, codes, names = (
+            data[f"airport.{column}"].tolist() for column in ("id", "code", "name")
+        )
+        columns = {name: data[f"aircraft.{name}"].tolist() for name in AIRCRAFT_FIELDS}
+
+    aircraft_dict = {}
+    for values in zip(*columns.values()):
+        aircraft = Aircraft(**dict(zip(AIRCRAFT_FIELDS, values)))
+        aircraft_dict[aircraft.type_code] = aircraft
+    airport_dict = {
+        code: Airport(id=airport_id, code=code, name=name, index=i, tables=tables)
+        for i, (airport_id, code, name) in enumerate(zip(ids, codes, names))
+    }
+    return aircraft_dict, airport_dict, tables
+
+
+def load_static_data(
+    data_dir: str = DATA_DIR,
+) -> Tuple[Dict[str, Aircraft], Dict[str, Airport], AirportTables]:
+    path = os.path.join(data_dir, ".cache", f"context-{snapshot_key(data_dir)}.npz")
+    if os.path.exists(path):
+        return load_snapshot(path)
+
+    aircraft_dict, airport_dict, tables = parse_static_data(data_dir)
+    if airport_dict:
+        save_snapshot(path, aircraft_dict, airport_dict, tables)
+        print(f"Compiled static data snapshot at {path}")
+    return aircraft_dict, airport_dict, tables
@@ -1,9 +1,16 @@
-from typing import Dict
+import copy
+import operator
+import sys
+from typing import List, Optional
+
+import numpy as np
+
 from models import *
 from context import Context
-from utils import encode_time
 from models import Aircraft, Airport
 from inventory import Inventory
+from archive import FlightArchive
+from utils import CLASS_KEYS
 
 """
 State object:
@@ -11,76 +18,129 @@ Data that changes every hour.
 - Schedules
 - Actual arrival times
 - Etc.
+
+fork() gives a child state for lookahead: decisions and inventory steps
+on it leave this one untouched. Stock, load columns and the changed
+rows are copied, the inventory is copy-on-write, the rest is shared.
+
+Flights that landed and whose kits went to processing leave the flight
+table for the archive (retire_flights), in batches of `retire_batch`, so
+the table stays the size of the flights still in play.
 """
 
+# eventType -> FlightTable status code
+_STATUS = {status.name: status.value for status in FlightStatus}
+# passengers dict -> tuple in CLASS_KEYS order
+_PASSENGERS = operator.itemgetter(*CLASS_KEYS)
+
 
 @dataclass
 class State:
     context: Context
-    flights_dict: Dict[str, Flight] = field(default_factory=dict)
     time: int = 0
 
+    # rows of the flights that appeared or changed status in the last
+    # update, in row order (the order flights were first seen)
+    changed_rows: List[int] = field(default_factory=list)
+    # retired flights, compressed chunks in memory when not given
+    archive: Optional[FlightArchive] = None
+    # retire once this many flights are done with
+    retire_batch: int = 256
+
     def __post_init__(self):
         self.inventory: Inventory = Inventory(self.context)
+        self.flights = FlightTable(
+            self.context.airport_codes, list(self.context.aircraft_dict)
+        )
+        if self.archive is None:
+            # in memory, only App writes an archive directory
+            self.archive = FlightArchive(directory=None)
+
+    @property
+    def flights_dict(self) -> FlightTable:
+        # flight id -> Flight view, as before the table
+        return self.flights
 
     def update_flights(self, response: dict):
-        flights = response["flightUpdates"]
-        for flight_entry in flights:
-            # --- 1. Calculate Time ---
-            departure_days_elapsed = flight_entry["departure"]["day"] - 1
-            arrival_days_elapsed = flight_entry["arrival"]["day"] - 1
-
-            departure_time = encode_time(
-                days=departure_days_elapsed, hours=flight_entry["departure"]["hour"]
-            )
-
-            arrival_time = encode_time(
-                days=arrival_days_elapsed, hours=flight_entry["arrival"]["hour"]
-            )
-
-            # --- 2. Convert Status and Get Aircraft ID ---
-            status_enum = FlightStatus[flight_entry["eventType"]]
-            flight_id = flight_entry["flightId"]
-
-            aircraft_id = flight_entry.get("aircraftType", "")
-
-            origin_code = self.context.airport_id_to_code.get(
-                flight_entry["originAirport"], flight_entry["originAirport"]
-            )
-            dest_code = self.context.airport_id_to_code.get(
-                flight_entry["destinationAirport"], flight_entry["destinationAirport"]
-            )
-
-            # --- 3. Check for Existing Flight and Update/Create ---
-            if flight_id in self.flights_dict:
-                existing_flight = self.flights_dict[flight_id]
-
-                # Typically, only certain attributes are updated, like status, times, and passengers.
-                # We assume flight number, airport IDs, and aircraft ID remain constant in an update.
-                existing_flight.status = status_enum
-                existing_flight.origin_airport_id = origin_code
-                existing_flight.destination_airport_id = dest_code
-                existing_flight.departure = departure_time
-                existing_flight.arrival = arrival_time
-                existing_flight.passengers = flight_entry["passengers"]
-
-            else:
-                # Flight does not exist: Create and store a new Flight object
-                new_flight = Flight(
-                    status=status_enum,
-                    flight_number=flight_entry["flightNumber"],
-                    flight_id=flight_id,
-                    origin_airport_id=origin_code,
-                    destination_airport_id=dest_code,
-                    departure=departure_time,
-                    arrival=arrival_time,
-                    passengers=flight_entry["passengers"],
-                    aircraft_id=aircraft_id,
-                    distance=flight_entry["distance"],
+        # status changes are found entry by entry, times and passengers are
+        # collected and written to their columns in one go
+        table = self.flights
+        index = table.index
+        id_to_code = self.context.airport_id_to_code
+        changed = []
+        rows, departures, arrivals, passengers = [], [], [], []
+        for entry in response["flightUpdates"]:
+            row = index.get(entry["flightId"])
+            if row is None:
+                # the id is interned once, the table and its index hold that
+                # object and later entries only look it up
+                origin = entry["originAirport"]
+                destination = entry["destinationAirport"]
+                row = table.append(
+                    sys.intern(entry["flightId"]),
+                    entry["flightNumber"],
+                    table.airport(id_to_code.get(origin, origin)),
+                    table.airport(id_to_code.get(destination, destination)),
+                    table.aircraft_type(entry.get("aircraftType", "")),
+                    entry["distance"],
                 )
-
-                # Store the new flight
-                self.flights_dict[new_flight.flight_id] = new_flight
+            status = _STATUS[entry["eventType"]]
+            # (columns are reallocated when the table grows, no local alias)
+            if table.status[row] != status:
+                table.set_status(row, status)
+                changed.append(row)
+            rows.append(row)
+            # flight events carry 1-based days
+            departure = entry["departure"]
+            arrival = entry["arrival"]
+            departures.append((departure["day"] - 1) * 24 + departure["hour"])
+            arrivals.append((arrival["day"] - 1) * 24 + arrival["hour"])
+            passengers += _PASSENGERS(entry["passengers"])
+
+        if rows:
+            rows = np.array(rows)
+            table.departure[rows] = departures
+            table.arrival[rows] = arrivals
+            # flat, a list of lists converts ~3x slower
+            table.passengers[rows] = np.fromiter(
+                passengers, np.int32, len(passengers)
+            ).reshape(-1, len(CLASS_KEYS))
+        self.changed_rows = sorted(set(changed))
+
+    def retire_flights(self, force: bool = False) -> None:
+        # landed flights whose kits were inserted for processing (the
+        # decision clears `loaded`) move to the archive, between rounds so
+        # no row numbers are held; force retires them however few there are
+        table = self.flights
+        landed = table.rows(FlightStatus.LANDED)
+        done = landed[~table.loaded[landed]]
+        if len(done) and (force or len(done) >= self.retire_batch):
+            self.archive.append(table.retire(done))
+
+    def fork(self) -> "State":
+        child = copy.copy(self)
+        child.context = self.context.with_stock()
+        child.inventory = self.inventory.fork(child.context)
+        child.flights = self.flights.fork()
+        child.changed_rows = list(self.changed_rows)
+        return child
+
+    def checkpoint(self) -> dict:
+        # everything needed to continue the session (the context stock aside)
+        return {
+            "time": self.time,
+            "flights": self.flights.checkpoint(),
+            "inventory": self.inventory.checkpoint(),
+            "archive": self.archive.checkpoint(),
+        }
+
+    def restore(self, data: dict) -> None:
+        self.time = data["time"]
+        self.flights = FlightTable.restore(data["flights"])
+        self.changed_rows = []
+        self.inventory.restore(data["inventory"])
+        if "archive" in data:
+            self.archive.restore(data["archive"])
 
     def get_penalties(self, response):
         return response["penalties"]
@@ -90,6 +150,7 @@ class State:
 
     def update_state(self, response: dict):
         # update based on response
+        self.retire_flights()
         self.update_flights(response)
 
         # the state represents the next round (hour)
@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from api_client import ApiClient
+from app import App
+from context import Context
+from models import AirportTables
+from parser import Parser
+from simulator import LocalTransport, Simulator, records_from_columns, records_to_columns
+from utils import DATA_DIR
+
+"""
+Sweep = run a grid of strategy parameters as full sessions against the
+local simulator, on a process pool.
+
+The parent parses the CSVs once and puts every array (airport tables and
+the flight columns the simulator replays) in shared memory. Workers attach
+to those blocks instead of re-parsing with pandas; the only per-session
+copy is the stock matrix.
+
+Parameters are DecisionMaker attributes, dotted names reach into dicts:
+    python sweep.py --grid '{"bias.premiumEconomy": [0, 0.5, 1]}'
+"""
+
+TABLE_FIELDS = ("stock", "capacity", "processing_time", "processing_cost", "loading_cost")
+
+# per-worker data, set by _init_worker
+_worker = {}
+
+
+def parameter_grid(grid: Dict[str, list]) -> List[dict]:
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def share_arrays(arrays: Dict[str, np.ndarray]):
+    # copies arrays into shared memory, returns (spec for workers, blocks to unlink)
+    spec, blocks = {}, []
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        spec[name] = (block.name, array.shape, array.dtype.str)
+        blocks.append(block)
+    return spec, blocks
+
+
+def attach_arrays(spec: dict):
+    arrays, blocks = {}, []
+    for name, (block_name, shape, dtype) in spec.items():
+        # workers share the parent's resource tracker, the parent unlinks
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        blocks.append(block)
+    return arrays, blocks
+
+
+def _init_worker(spec: dict, meta: dict) -> None:
+    arrays, blocks = attach_arrays(spec)
+    tables = AirportTables(**{name: arrays[name] for name in TABLE_FIELDS})
+    context = Context.from_tables(
+        meta["aircraft_dict"],
+        meta["airport_ids"],
+        meta["airport_codes"],
+        meta["airport_names"],
+        tables,
+    )
+    flight_columns = {
+        name[len("flight.") :]: array
+        for name, array in arrays.items()
+        if name.startswith("flight.")
+    }
+    records = records_from_columns(flight_columns)
+    _worker.update(
+        blocks=blocks,
+        context=context,
+        simulator=Simulator(context=context, records=records),
+    )
+
+
+def _apply_params(target, params: dict) -> None:
+    for key, value in params.items():
+        attr, _, item = key.partition(".")
+        if item:
+            getattr(target, attr)[item] = value
+        else:
+            setattr(target, attr, value)
+
+
+def run_session(params: dict) -> dict:
+    # shared read-only parameters, private stock
+    context = _worker["context"].with_stock()
+    client = ApiClient("local", "sweep", LocalTransport(_worker["simulator"]))
+    app = App(context=context, client=client)
+    _apply_params(app.decisionMaker, params)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = app.run()
+    runtime = time.perf_counter() - start
+
+    row = dict(params)
+    row.update(
+        total_cost=result["cost"],
+        total_penalty=result["penalty"],
+        runtime_s=runtime,
+        error=result["error"],
+    )
+    for code, count in result["penalties"].items():
+        row[f"penalty.{code}"] = count
+    return row
+
+
+def run_sweep(grid: Dict[str, list], workers: int = 0) -> pd.DataFrame:
+    parser = Parser()
+    context = Context()
+    records = parser.parse_flights(os.path.join(DATA_DIR, "flights.csv"))
+
+    arrays = {name: getattr(context.tables, name) for name in TABLE_FIELDS}
+    for name, array in records_to_columns(records).items():
+        arrays[f"flight.{name}"] = array
+    meta = {
+        "aircraft_dict": context.aircraft_dict,
+        "airport_ids": [a.id for a in context.airport_dict.values()],
+        "airport_codes": context.airport_codes,
+        "airport_names": [a.name for a in context.airport_dict.values()],
+    }
+
+    combos = parameter_grid(grid)
+    spec, blocks = share_arrays(arrays)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(spec, meta),
+        ) as pool:
+            rows = []
+            for row in pool.map(run_session, combos):
+                print(row)
+                rows.append(row)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    results = pd.DataFrame(rows)
+    penalty_cols = [c for c in results.columns if c.startswith("penalty.")]
+    results[penalty_cols] = results[penalty_cols].fillna(0).astype(int)
+    return results.sort_values("total_cost", na_position="last").reset_index(drop=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parallel strategy sweep")
+    arg_parser.add_argument(
+        "--grid",
+        required=True,
+        help='JSON object of parameter -> values, e.g. {"bias.economy": [0, 1]}',
+    )
+    arg_parser.add_argument("--workers", type=int, default=0, help="0 = every core")
+    arg_parser.add_argument("--out", default="sweep_results.csv")
+    args = arg_parser.parse_args()
+
+    results = run_sweep(json.loads(args.grid), args.workers)
+    results.to_csv(args.out, index=False)
+    print(results.to_string())
+    print(f"Saved {len(results)} runs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
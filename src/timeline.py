@@ -0,0 +1,270 @@
+import copy
+from typing import Dict, Optional, Set, Tuple
+import numpy as np
+
+"""
+StockTimeline = projected stock per (airport, class) over the coming hours.
+
+Every stock change (committed loads, processing returns, purchases) is a
+delta at the hour it happens. Projected stock at hour h is
+base + (sum of deltas at hours <= h), so each (airport, class) keeps a
+segment tree over a window of hours storing, per node, the sum of its
+deltas and the min / max prefix sum inside it. That gives, in O(log W):
+- projected stock at any hour
+- min / max projected stock over a window
+- first hour the stock goes above capacity (or below a level)
+
+Every tree covers its own window, starting at its own origin. A tree
+slides when a delta lands past its window: the deltas before the clock are
+folded into `base`, so memory does not grow with the session length, and
+advance() only moves the clock. Trees nobody writes are never rebuilt.
+
+fork() shares the trees with the child, whichever side changes a tree
+first copies it.
+"""
+
+
+class _PrefixTree:
+    # segment tree over `size` hours: delta sum, min and max prefix per node
+    __slots__ = ("size", "origin", "sums", "mins", "maxs")
+
+    def __init__(self, size: int, origin: int):
+        self.size = size
+        # hour of the first leaf
+        self.origin = origin
+        self.sums = [0] * (2 * size)
+        self.mins = [0] * (2 * size)
+        self.maxs = [0] * (2 * size)
+
+    def copy(self) -> "_PrefixTree":
+        tree = _PrefixTree.__new__(_PrefixTree)
+        tree.size = self.size
+        tree.origin = self.origin
+        tree.sums = self.sums[:]
+        tree.mins = self.mins[:]
+        tree.maxs = self.maxs[:]
+        return tree
+
+    def _pull(self, p: int) -> None:
+        sums, mins, maxs = self.sums, self.mins, self.maxs
+        left, right = 2 * p, 2 * p + 1
+        left_sum = sums[left]
+        sums[p] = left_sum + sums[right]
+        mins[p] = min(mins[left], left_sum + mins[right])
+        maxs[p] = max(maxs[left], left_sum + maxs[right])
+
+    def add(self, i: int, delta: int) -> None:
+        sums, mins, maxs = self.sums, self.mins, self.maxs
+        p = i + self.size
+        value = sums[p] + delta
+        sums[p] = mins[p] = maxs[p] = value
+        p >>= 1
+        # _pull inlined, this runs for every stock change
+        while p:
+            left = 2 * p
+            left_sum = sums[left]
+            sums[p] = left_sum + sums[left + 1]
+            low, high = left_sum + mins[left + 1], left_sum + maxs[left + 1]
+            mins[p] = mins[left] if mins[left] < low else low
+            maxs[p] = maxs[left] if maxs[left] > high else high
+            p >>= 1
+
+    def rebuild(self, leaves: list) -> None:
+        size = self.size
+        self.sums[size:] = leaves
+        self.mins[size:] = leaves
+        self.maxs[size:] = leaves
+        for p in range(size - 1, 0, -1):
+            self._pull(p)
+
+    def leaves(self) -> list:
+        return self.sums[self.size :]
+
+    def nodes(self, lo: int, hi: int) -> list:
+        # nodes covering leaves [lo, hi), left to right
+        left, right = [], []
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                left.append(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right.append(hi)
+            lo >>= 1
+            hi >>= 1
+        return left + right[::-1]
+
+    def prefix(self, i: int) -> int:
+        # sum of leaves [0, i)
+        return sum(self.sums[p] for p in self.nodes(0, i))
+
+    def range(self, lo: int, hi: int) -> Tuple[int, int, int]:
+        # (sum, min prefix, max prefix) of leaves [lo, hi), prefixes start at lo
+        total, low, high = 0, None, None
+        for p in self.nodes(lo, hi):
+            node_low, node_high = total + self.mins[p], total + self.maxs[p]
+            low = node_low if low is None else min(low, node_low)
+            high = node_high if high is None else max(high, node_high)
+            total += self.sums[p]
+        return total, low, high
+
+    def find_first(self, lo: int, offset: int, threshold: int, above: bool):
+        # first leaf i >= lo with offset + prefix(lo..i) above / below threshold
+        sums, mins, maxs = self.sums, self.mins, self.maxs
+        for p in self.nodes(lo, self.size):
+            hit = offset + maxs[p] > threshold if above else offset + mins[p] < threshold
+            if not hit:
+                offset += sums[p]
+                continue
+            while p < self.size:
+                left = 2 * p
+                if above:
+                    hit = offset + maxs[left] > threshold
+                else:
+                    hit = offset + mins[left] < threshold
+                if hit:
+                    p = left
+                else:
+                    offset += sums[left]
+                    p = left + 1
+            return p - self.size
+        return None
+
+
+class StockTimeline:
+    def __init__(
+        self,
+        stock: np.ndarray,
+        capacity: np.ndarray,
+        window: int = 256,
+        start: int = 0,
+    ):
+        if window & (window - 1):
+            raise ValueError("Timeline window must be a power of two")
+        # stock before the first hour of each tree's window
+        self.base = stock.astype(np.int64).tolist()
+        self.capacity = capacity
+        self.window = window
+        # the clock: deltas before it are in the past, new trees start there
+        self.origin = start
+        # (airport index, class index) -> tree, created on first delta
+        self.trees: Dict[Tuple[int, int], _PrefixTree] = {}
+        # trees shared with a fork, copied before they change
+        self._shared: Set[Tuple[int, int]] = set()
+
+    def fork(self) -> "StockTimeline":
+        child = copy.copy(self)
+        child.base = [row[:] for row in self.base]
+        child.trees = dict(self.trees)
+        self._shared = set(self.trees)
+        child._shared = set(self.trees)
+        return child
+
+    def _writable(self, key: Tuple[int, int]) -> _PrefixTree:
+        tree = self.trees.get(key)
+        if tree is None:
+            tree = self.trees[key] = _PrefixTree(self.window, self.origin)
+        elif key in self._shared:
+            tree = self.trees[key] = tree.copy()
+            self._shared.discard(key)
+        return tree
+
+    def _leaf(self, tree: _PrefixTree, hour: int) -> int:
+        return min(max(hour - tree.origin, 0), self.window)
+
+    def add(self, ai: int, ci: int, hour: int, quantity: int) -> None:
+        # `quantity` kits enter (or leave, if negative) the stock at `hour`
+        if hour >= self.origin + self.window:
+            raise ValueError(f"Hour {hour} is beyond the timeline window")
+        tree = self.trees.get((ai, ci))
+        if tree is not None and hour >= tree.origin + self.window:
+            tree = self._writable((ai, ci))
+            self._slide(ai, ci, tree)
+        if hour < (self.origin if tree is None else tree.origin):
+            self.base[ai][ci] += quantity
+            return
+        tree = self._writable((ai, ci))
+        tree.add(hour - tree.origin, int(quantity))
+
+    def add_many(
+        self, ai: np.ndarray, ci: np.ndarray, hours: np.ndarray, quantities: np.ndarray
+    ) -> None:
+        # add() for arrays of deltas, one tree update per (airport, class, hour)
+        if not len(hours):
+            return
+        n_classes = self.capacity.shape[1]
+        keys = (ai.astype(np.int64) * n_classes + ci) << 32 | hours.astype(np.int64)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(totals, inverse.ravel(), quantities)
+        cells, hours = divmod(keys, 1 << 32)
+        for cell, hour, quantity in zip(cells.tolist(), hours.tolist(), totals.tolist()):
+            if quantity:
+                self.add(cell // n_classes, cell % n_classes, hour, quantity)
+
+    def _slide(self, ai: int, ci: int, tree: _PrefixTree) -> None:
+        # move the tree's window to start at the clock
+        shift = min(self.origin - tree.origin, self.window)
+        leaves = tree.leaves()
+        self.base[ai][ci] += sum(leaves[:shift])
+        tree.rebuild(leaves[shift:] + [0] * shift)
+        tree.origin = self.origin
+
+    def advance(self, now: int) -> None:
+        # only the clock moves, a tree slides on its next write past its window
+        self.origin = max(self.origin, now)
+
+    def projected(self, ai: int, ci: int, hour: int) -> int:
+        base = self.base[ai][ci]
+        tree = self.trees.get((ai, ci))
+        if tree is None or hour < tree.origin:
+            return base
+        return base + tree.prefix(self._leaf(tree, hour + 1))
+
+    def _window_stats(self, ai: int, ci: int, t0: int, t1: int):
+        value = self.projected(ai, ci, t0)
+        tree = self.trees.get((ai, ci))
+        if tree is None:
+            return value, value
+        lo, hi = self._leaf(tree, t0 + 1), self._leaf(tree, t1)
+        if lo >= hi:
+            return value, value
+        _, low, high = tree.range(lo, hi)
+        return min(value, value + low), max(value, value + high)
+
+    def min_stock(self, ai: int, ci: int, t0: int, t1: int) -> int:
+        # lowest projected stock over hours [t0, t1)
+        return self._window_stats(ai, ci, t0, t1)[0]
+
+    def max_stock(self, ai: int, ci: int, t0: int, t1: int) -> int:
+        # highest projected stock over hours [t0, t1)
+        return self._window_stats(ai, ci, t0, t1)[1]
+
+    def _find(self, ai, ci, t0, threshold, above) -> Optional[int]:
+        value = self.projected(ai, ci, t0)
+        if (value > threshold) if above else (value < threshold):
+            return t0
+        tree = self.trees.get((ai, ci))
+        if tree is None:
+            return None
+        lo = self._leaf(tree, t0 + 1)
+        if lo >= self.window:
+            return None
+        leaf = tree.find_first(lo, value, threshold, above)
+        return None if leaf is None else tree.origin + leaf
+
+    def first_overflow(
+        self, ai: int, ci: int, t0: int, capacity: Optional[int] = None
+    ) -> Optional[int]:
+        # first hour >= t0 with projected stock above capacity
+        if capacity is None:
+            capacity = int(self.capacity[ai, ci])
+        return self._find(ai, ci, t0, capacity, above=True)
+
+    def first_shortage(
+        self, ai: int, ci: int, t0: int, level: int = 0
+    ) -> Optional[int]:
+        # first hour >= t0 with projected stock below `level`
+        return self._find(ai, ci, t0, level, above=False)
@@ -0,0 +1,216 @@
+import asyncio
+import gzip
+import json
+import sys
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib decoder is ~3x slower on rounds
+    orjson = None
+
+"""
+Transport = how ApiClient talks HTTP.
+submit() never blocks on the network for the async transport: it returns a
+Future so the caller can do bookkeeping while the request is in flight.
+
+aiohttp is imported by AsyncTransport only, it is slow to import and the
+default transport does not need it.
+
+Response bodies are decoded with orjson when it is installed (bytes in,
+no intermediate str), json otherwise, see loads().
+
+Retries only cover failures to connect. Once a round has been written to
+the socket we never send it again, the server may already have applied it.
+"""
+
+
+def loads(content: bytes):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class TransportResponse:
+    # the subset of requests.Response that ApiClient and App rely on
+    def __init__(self, status_code: int, reason: str, content: bytes):
+        self.status_code = status_code
+        self.reason = reason
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode()
+
+    def json(self):
+        return loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} {self.reason}", response=self
+            )
+
+
+class LocalResponse(TransportResponse):
+    # skips the JSON round trip, json() hands back the in-process payload
+    def __init__(self, status_code: int, payload):
+        super().__init__(status_code, "OK", b"")
+        self.payload = payload
+
+    @property
+    def text(self) -> str:
+        return str(self.payload)
+
+    def json(self):
+        return self.payload
+
+
+class RequestsTransport:
+    # blocking transport, submit() returns an already completed Future
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        retries: int = 3,
+        pool_size: int = 1,
+    ):
+        self.timeout = (connect_timeout, timeout)
+        self._session = requests.Session()
+        retry = Retry(
+            total=retries, connect=retries, read=0, status=0, other=0, backoff_factor=0.1
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def submit(self, url: str, headers: dict, body: Optional[dict] = None) -> Future:
+        future = Future()
+        try:
+            response = self._session.post(
+                url, headers=headers, json=body, timeout=self.timeout
+            )
+            future.set_result(
+                TransportResponse(response.status_code, response.reason, response.content)
+            )
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class AsyncTransport:
+    # aiohttp on a background event loop, keep-alive pool and gzip responses
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        retries: int = 3,
+        pool_size: int = 4,
+        compress: bool = False,
+        backoff: float = 0.1,
+    ):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.compress = compress
+        self.backoff = backoff
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="api-transport", daemon=True
+        )
+        self._thread.start()
+        self._session = asyncio.run_coroutine_threadsafe(
+            self._open(), self._loop
+        ).result()
+
+    async def _open(self) -> "aiohttp.ClientSession":
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(
+            total=self.timeout, sock_connect=self.connect_timeout
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+
+    def submit(self, url: str, headers: dict, body: Optional[dict] = None) -> Future:
+        return asyncio.run_coroutine_threadsafe(
+            self._post(url, headers, body), self._loop
+        )
+
+    async def _post(
+        self, url: str, headers: dict, body: Optional[dict]
+    ) -> TransportResponse:
+        import aiohttp
+
+        data = None
+        if body is not None:
+            headers = {**headers, "Content-Type": "application/json"}
+            data = json.dumps(body).encode()
+            if self.compress:
+                headers["Content-Encoding"] = "gzip"
+                data = gzip.compress(data)
+
+        attempt = 0
+        while True:
+            try:
+                async with self._session.post(url, data=data, headers=headers) as resp:
+                    content = await resp.read()
+                    return TransportResponse(resp.status, resp.reason, content)
+            except aiohttp.ClientConnectorError:
+                # the connection was never established, nothing reached the server
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def is_connection_error(error: BaseException) -> bool:
+    # the server could not be reached (or stopped answering): the session
+    # itself is fine and can be resumed, unlike an HTTP error status
+    if isinstance(
+        error,
+        (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            ConnectionError,
+            TimeoutError,
+            asyncio.TimeoutError,
+        ),
+    ):
+        return True
+    # aiohttp is only imported by AsyncTransport
+    aiohttp = sys.modules.get("aiohttp")
+    return aiohttp is not None and isinstance(error, aiohttp.ClientConnectionError)
+
+
+def make_transport(kind: str, **kwargs):
+    match kind:
+        case "requests":
+            return RequestsTransport(**kwargs)
+        case "async":
+            return AsyncTransport(**kwargs)
+        case _:
+            raise ValueError(f"Unknown transport: {kind}")
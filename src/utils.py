@@ -1,8 +1,20 @@
+import os
 from typing import Tuple
 # CONSTANTS
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# DATA_DIR in the environment points the bot at another scenario
+DATA_DIR = os.environ.get("DATA_DIR") or os.path.join(ROOT_DIR, "data")
+# round log and snapshots of the running session
+CHECKPOINT_DIR = os.path.join(ROOT_DIR, "checkpoints")
+# retired flights, one directory per session
+ARCHIVE_DIR = os.path.join(ROOT_DIR, "archive")
+
 CLASS_KEYS = ("first", "business", "premiumEconomy", "economy")
 
+# column of each class in the airport x class matrices
+CLASS_INDEX = {cls: i for i, cls in enumerate(CLASS_KEYS)}
+
 STOCK_FIELDS = {
     "first": "first_stock",
     "business": "business_stock",
@@ -17,6 +29,34 @@ CAPACITY_FIELDS = {
     "economy": "economy_kits_capacity",
 }
 
+AIRPORT_CAPACITY_FIELDS = {
+    "first": "first_capacity",
+    "business": "business_capacity",
+    "premiumEconomy": "premium_economy_capacity",
+    "economy": "economy_capacity",
+}
+
+PROCESSING_TIME_FIELDS = {
+    "first": "first_processing_time",
+    "business": "business_processing_time",
+    "premiumEconomy": "premium_economy_processing_time",
+    "economy": "economy_processing_time",
+}
+
+PROCESSING_COST_FIELDS = {
+    "first": "first_processing_cost",
+    "business": "business_processing_cost",
+    "premiumEconomy": "premium_economy_cost",
+    "economy": "economy_processing_cost",
+}
+
+LOADING_COST_FIELDS = {
+    "first": "first_loading_cost",
+    "business": "business_loading_cost",
+    "premiumEconomy": "premium_economy_loading_cost",
+    "economy": "economy_loading_cost",
+}
+
 PCA_FIELDS = {
     "first": "first",
     "business": "business",
@@ -38,6 +78,37 @@ BIAS = {
     "economy": 0 / 100,
 }
 
+# hub where purchased kits are delivered
+HUB_CODE = "HUB1"
+
+# session length in hours (30 days)
+END_TIME = 30 * 24
+
+# kit economics used by the local simulator
+KIT_COST = {
+    "first": 200.0,
+    "business": 150.0,
+    "premiumEconomy": 100.0,
+    "economy": 50.0,
+}
+
+# kg per kit
+KIT_WEIGHT = {
+    "first": 5.0,
+    "business": 3.0,
+    "premiumEconomy": 2.5,
+    "economy": 1.5,
+}
+
+# penalty factors (multiplied by the kit cost of the class)
+PENALTY_FACTORS = {
+    "UNFULFILLED_PASSENGERS": 5.0,
+    "FLIGHT_OVERLOAD": 10.0,
+    "NEGATIVE_INVENTORY": 10.0,
+    "OVER_CAPACITY": 2.0,
+    "INCORRECT_FLIGHT_LOAD": 10.0,
+}
+
 
 def encode_time(days: int, hours: int) -> int:
     return days * 24 + hours
@@ -1,11 +1,13 @@
 from pathlib import Path
+from typing import Dict, Optional
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
+from sources import load_sources
+
 
-ROOT = Path(__file__).resolve().parents[1]
-AIRPORTS_CSV = ROOT / "data" / "airports_with_stocks.csv"
 IMG_DIR = Path(__file__).resolve().parent / "imgs"
 SUMMARY_CSV = Path(__file__).resolve().parent / "airport_stock_capacity_summary.csv"
 
@@ -24,43 +26,46 @@ CLASS_CAP_COLS = {
 }
 
 
-def load_data() -> pd.DataFrame:
-    return pd.read_csv(AIRPORTS_CSV, sep=";")
-
-
-def summarize(df: pd.DataFrame) -> pd.DataFrame:
-    per_airport = []
-    for _, row in df.iterrows():
-        total_stock = sum(row[CLASS_STOCK_COLS[c]] for c in CLASS_STOCK_COLS)
-        total_cap = sum(row[CLASS_CAP_COLS[c]] for c in CLASS_CAP_COLS)
-        per_airport.append(
-            {
-                "code": row["code"],
-                "name": row["name"],
-                "total_stock": total_stock,
-                "total_capacity": total_cap,
-                "stock_capacity_ratio": total_stock / total_cap if total_cap else 0,
-                **{
-                    f"{c}_stock": row[CLASS_STOCK_COLS[c]] for c in CLASS_STOCK_COLS
-                },
-                **{
-                    f"{c}_capacity": row[CLASS_CAP_COLS[c]] for c in CLASS_CAP_COLS
-                },
-                **{
-                    f"{c}_ratio": (row[CLASS_STOCK_COLS[c]] / row[CLASS_CAP_COLS[c]])
-                    if row[CLASS_CAP_COLS[c]]
-                    else 0
-                    for c in CLASS_STOCK_COLS
-                },
-            }
-        )
-    summary = pd.DataFrame(per_airport)
-    summary.to_csv(SUMMARY_CSV, index=False)
+SOURCES = ("airports_with_stocks",)
+FIGURES = (("plot_ratios", "summary"), ("plot_tight_airports", "summary"))
+
+
+def load_data(sources: Optional[Dict[str, pd.DataFrame]] = None) -> pd.DataFrame:
+    return (sources or load_sources(SOURCES))["airports_with_stocks"]
+
+
+def ratio(stock: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    # stock / capacity, 0 where there is no capacity
+    return np.divide(
+        stock, capacity, out=np.zeros(len(stock)), where=capacity != 0, casting="unsafe"
+    )
+
+
+def summarize(df: pd.DataFrame, path: Path = SUMMARY_CSV) -> pd.DataFrame:
+    stock = df[list(CLASS_STOCK_COLS.values())].to_numpy()
+    capacity = df[list(CLASS_CAP_COLS.values())].to_numpy()
+    total_stock = stock.sum(axis=1)
+    total_cap = capacity.sum(axis=1)
+    columns = {
+        "code": df["code"].to_numpy(),
+        "name": df["name"].to_numpy(),
+        "total_stock": total_stock,
+        "total_capacity": total_cap,
+        "stock_capacity_ratio": ratio(total_stock, total_cap),
+    }
+    for i, c in enumerate(CLASS_STOCK_COLS):
+        columns[f"{c}_stock"] = stock[:, i]
+    for i, c in enumerate(CLASS_CAP_COLS):
+        columns[f"{c}_capacity"] = capacity[:, i]
+    for i, c in enumerate(CLASS_STOCK_COLS):
+        columns[f"{c}_ratio"] = ratio(stock[:, i], capacity[:, i])
+    summary = pd.DataFrame(columns)
+    summary.to_csv(path, index=False)
     return summary
 
 
-def plot_ratios(summary: pd.DataFrame) -> Path:
-    IMG_DIR.mkdir(parents=True, exist_ok=True)
+def plot_ratios(summary: pd.DataFrame, img_dir: Path = IMG_DIR) -> Path:
+    img_dir.mkdir(parents=True, exist_ok=True)
     fig, ax = plt.subplots(figsize=(8, 5))
     ax.hist(summary["stock_capacity_ratio"], bins=30, color="#4C72B0", edgecolor="white", alpha=0.85)
     ax.set_title("Airport total stock / capacity ratio")
@@ -68,13 +73,14 @@ def plot_ratios(summary: pd.DataFrame) -> Path:
     ax.set_ylabel("Airports")
     ax.grid(True, linestyle="--", alpha=0.4)
     plt.tight_layout()
-    out_path = IMG_DIR / "airport_stock_capacity_ratio_hist.png"
+    out_path = img_dir / "airport_stock_capacity_ratio_hist.png"
     fig.savefig(out_path, dpi=200)
     plt.close(fig)
     return out_path
 
 
-def plot_tight_airports(summary: pd.DataFrame, top_n: int = 15) -> Path:
+def plot_tight_airports(summary: pd.DataFrame, img_dir: Path = IMG_DIR, top_n: int = 15) -> Path:
+    img_dir.mkdir(parents=True, exist_ok=True)
     tight = summary.nsmallest(top_n, "stock_capacity_ratio")
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.barh(tight["code"], tight["stock_capacity_ratio"], color="#55A868")
@@ -84,7 +90,7 @@ def plot_tight_airports(summary: pd.DataFrame, top_n: int = 15) -> Path:
     for i, v in enumerate(tight["stock_capacity_ratio"]):
         ax.text(v + 0.01, i, f"{v:.2f}", va="center")
     plt.tight_layout()
-    out_path = IMG_DIR / "airport_stock_capacity_tight.png"
+    out_path = img_dir / "airport_stock_capacity_tight.png"
     fig.savefig(out_path, dpi=200)
     plt.close(fig)
     return out_path
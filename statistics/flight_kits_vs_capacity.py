@@ -1,12 +1,12 @@
 from pathlib import Path
+from typing import Dict, Optional
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from sources import load_sources
+
 
-ROOT = Path(__file__).resolve().parents[1]
-FLIGHTS_CSV = ROOT / "data" / "flights.csv"
-AIRCRAFT_CSV = ROOT / "data" / "aircraft_types.csv"
 IMG_DIR = Path(__file__).resolve().parent / "imgs"
 SUMMARY_CSV = Path(__file__).resolve().parent / "flight_kits_vs_capacity_summary.csv"
 
@@ -18,21 +18,29 @@ CLASS_COLS = {
 }
 
 
-def load_data() -> pd.DataFrame:
-    flights = pd.read_csv(FLIGHTS_CSV, sep=";")
-    aircraft = pd.read_csv(AIRCRAFT_CSV, sep=";")
+SOURCES = ("flights", "aircraft_types")
+FIGURES = (("plot_utilization", "data"), ("plot_kits_needed", "data"))
+
+
+def load_data(sources: Optional[Dict[str, pd.DataFrame]] = None) -> pd.DataFrame:
+    sources = sources or load_sources(SOURCES)
+    flights = sources["flights"]
+    aircraft = sources["aircraft_types"]
 
     aircraft_caps = aircraft.set_index("id")[
         [v[1] for v in CLASS_COLS.values()]
     ]
 
     # prefer actual aircraft type when available
-    flights["aircraft_id_used"] = flights["act_aircraft_type_id"].fillna(flights["sched_aircraft_type_id"])
+    # (assign: the source frames are shared with the other scripts)
+    flights = flights.assign(
+        aircraft_id_used=flights["act_aircraft_type_id"].fillna(flights["sched_aircraft_type_id"])
+    )
     merged = flights.join(aircraft_caps, on="aircraft_id_used", how="left", rsuffix="_cap")
     return merged
 
 
-def summarize(df: pd.DataFrame) -> pd.DataFrame:
+def summarize(df: pd.DataFrame, path: Path = SUMMARY_CSV) -> pd.DataFrame:
     rows = []
     for cls, (pax_col, cap_col) in CLASS_COLS.items():
         subset = df[[pax_col, cap_col]].dropna()
@@ -52,12 +60,12 @@ def summarize(df: pd.DataFrame) -> pd.DataFrame:
             }
         )
     summary = pd.DataFrame(rows)
-    summary.to_csv(SUMMARY_CSV, index=False)
+    summary.to_csv(path, index=False)
     return summary
 
 
-def plot_utilization(df: pd.DataFrame) -> Path:
-    IMG_DIR.mkdir(parents=True, exist_ok=True)
+def plot_utilization(df: pd.DataFrame, img_dir: Path = IMG_DIR) -> Path:
+    img_dir.mkdir(parents=True, exist_ok=True)
     fig, axes = plt.subplots(2, 2, figsize=(10, 8))
     axes = axes.flatten()
 
@@ -75,13 +83,14 @@ def plot_utilization(df: pd.DataFrame) -> Path:
         ax.grid(True, linestyle="--", alpha=0.4)
 
     plt.tight_layout()
-    out_path = IMG_DIR / "flight_utilization_hist.png"
+    out_path = img_dir / "flight_utilization_hist.png"
     fig.savefig(out_path, dpi=200)
     plt.close(fig)
     return out_path
 
 
-def plot_kits_needed(df: pd.DataFrame) -> Path:
+def plot_kits_needed(df: pd.DataFrame, img_dir: Path = IMG_DIR) -> Path:
+    img_dir.mkdir(parents=True, exist_ok=True)
     fig, axes = plt.subplots(2, 2, figsize=(10, 8))
     axes = axes.flatten()
 
@@ -96,7 +105,7 @@ def plot_kits_needed(df: pd.DataFrame) -> Path:
         ax.grid(True, linestyle="--", alpha=0.4)
 
     plt.tight_layout()
-    out_path = IMG_DIR / "kits_needed_hist.png"
+    out_path = img_dir / "kits_needed_hist.png"
     fig.savefig(out_path, dpi=200)
     plt.close(fig)
     return out_path
@@ -1,10 +1,12 @@
 from pathlib import Path
+from typing import Dict, Optional
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from sources import load_sources
+
 
-DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "airports_with_stocks.csv"
 IMG_DIR = Path(__file__).resolve().parent / "imgs"
 SUMMARY_CSV = Path(__file__).resolve().parent / "processing_times_summary.csv"
 
@@ -17,20 +19,28 @@ COLUMN_MAP = {
 }
 
 
-def load_processing_times() -> pd.DataFrame:
-    df = pd.read_csv(DATA_PATH, sep=";")
+SOURCES = ("airports_with_stocks",)
+# figure functions and what they plot: "data" (load_data) or "summary"
+FIGURES = (("plot", "data"),)
+
+
+def load_processing_times(sources: Optional[Dict[str, pd.DataFrame]] = None) -> pd.DataFrame:
+    df = (sources or load_sources(SOURCES))["airports_with_stocks"]
     return df[list(COLUMN_MAP.keys())].rename(columns=COLUMN_MAP)
 
 
-def summarize(df: pd.DataFrame) -> pd.DataFrame:
+load_data = load_processing_times
+
+
+def summarize(df: pd.DataFrame, path: Path = SUMMARY_CSV) -> pd.DataFrame:
     summary = df.agg(["min", "max", "mean", "median", "std"]).T
     summary = summary.reset_index().rename(columns={"index": "class"})
-    summary.to_csv(SUMMARY_CSV, index=False)
+    summary.to_csv(path, index=False)
     return summary
 
 
-def plot(df: pd.DataFrame) -> Path:
-    IMG_DIR.mkdir(parents=True, exist_ok=True)
+def plot(df: pd.DataFrame, img_dir: Path = IMG_DIR) -> Path:
+    img_dir.mkdir(parents=True, exist_ok=True)
     fig, axes = plt.subplots(2, 2, figsize=(10, 8))
     axes = axes.flatten()
     for ax, column in zip(axes, df.columns):
@@ -41,7 +51,7 @@ def plot(df: pd.DataFrame) -> Path:
         ax.grid(True, linestyle="--", alpha=0.4)
 
     plt.tight_layout()
-    out_path = IMG_DIR / "processing_times.png"
+    out_path = img_dir / "processing_times.png"
     fig.savefig(out_path, dpi=200)
     plt.close(fig)
     return out_path
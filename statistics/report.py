@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from sources import DATA_DIR, file_hash, load_sources, source_hashes
+
+"""
+Single entry point for the statistics: every summary CSV and figure of the
+scripts in MODULES, for the bundled data or a generated scenario.
+
+    python statistics/report.py                          # data/ -> statistics/
+    python statistics/report.py --data-dir scenarios/1m  # -> scenarios/1m/statistics/
+
+Each source CSV is parsed once into the columnar cache (sources.py), the
+summaries are computed in this process and the figures are rendered on a
+process pool, each worker reading the frames back from the cache.
+
+An output is keyed by the hashes of the sources its script reads and of the
+script itself; <out>/.cache/manifest.json keeps the key each output was
+last built with, and outputs whose key is unchanged (and that still exist)
+are skipped. --force rebuilds everything.
+"""
+
+STATISTICS_DIR = Path(__file__).resolve().parent
+MODULES = (
+    "processing_times",
+    "airport_stock_capacity",
+    "flight_kits_vs_capacity",
+    "route_demand_distance",
+)
+
+
+def output_dirs(data_dir: Path) -> Tuple[Path, Path]:
+    # (summaries, cache): the bundled data reports next to the scripts,
+    # anything else into its own directory so the bundled summaries stay
+    if Path(data_dir).resolve() == DATA_DIR.resolve():
+        out_dir = STATISTICS_DIR
+    else:
+        out_dir = Path(data_dir) / "statistics"
+    return out_dir, out_dir / ".cache"
+
+
+def module_key(module, hashes: Dict[str, str]) -> str:
+    digest = hashlib.sha256(file_hash(Path(module.__file__)).encode())
+    for name in module.SOURCES:
+        digest.update(f"{name}={hashes[name]}".encode())
+    return digest.hexdigest()[:16]
+
+
+def load_manifest(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path: Path, manifest: Dict[str, dict]) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def is_fresh(manifest: Dict[str, dict], task: str, key: str) -> bool:
+    entry = manifest.get(task)
+    return entry is not None and entry["key"] == key and Path(entry["path"]).exists()
+
+
+def render(
+    module_name: str,
+    function: str,
+    kind: str,
+    data_dir: str,
+    out_dir: str,
+    cache_dir: str,
+    hashes: Dict[str, str],
+    sources: Optional[Dict[str, pd.DataFrame]] = None,
+) -> str:
+    # one figure; a worker process reads its frames back from the cache
+    module = importlib.import_module(module_name)
+    if kind == "summary":
+        df = pd.read_csv(Path(out_dir) / module.SUMMARY_CSV.name)
+    else:
+        df = module.load_data(sources or load_sources(module.SOURCES, data_dir, cache_dir, hashes))
+    return str(getattr(module, function)(df, Path(out_dir) / "imgs"))
+
+
+def build_report(data_dir: Path = DATA_DIR, force: bool = False) -> Dict[str, str]:
+    out_dir, cache_dir = output_dirs(data_dir)
+    modules = [importlib.import_module(name) for name in MODULES]
+    names = sorted({name for module in modules for name in module.SOURCES})
+    hashes = source_hashes(data_dir, names)
+    keys = {module.__name__: module_key(module, hashes) for module in modules}
+
+    manifest_path = cache_dir / "manifest.json"
+    manifest = {} if force else load_manifest(manifest_path)
+    summaries = [
+        module
+        for module in modules
+        if not is_fresh(manifest, f"{module.__name__}.summarize", keys[module.__name__])
+    ]
+    figures: List[Tuple[str, str, str]] = [
+        (module.__name__, function, kind)
+        for module in modules
+        for function, kind in module.FIGURES
+        if not is_fresh(manifest, f"{module.__name__}.{function}", keys[module.__name__])
+    ]
+    if not summaries and not figures:
+        print(f"Statistics in {out_dir} are up to date.")
+        return {}
+
+    # sources of whatever reads them: stale summaries and data figures
+    stale = {module.__name__ for module in summaries}
+    stale |= {name for name, _, kind in figures if kind == "data"}
+    needed = sorted(
+        {name for module in modules if module.__name__ in stale for name in module.SOURCES}
+    )
+
+    built: Dict[str, str] = {}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # parses every stale source once, and fills the cache the workers read
+    sources = load_sources(needed, data_dir, cache_dir, hashes)
+    for module in summaries:
+        path = out_dir / module.SUMMARY_CSV.name
+        module.summarize(module.load_data(sources), path)
+        built[f"{module.__name__}.summarize"] = str(path)
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    args = [
+        (name, function, kind, str(data_dir), str(out_dir), str(cache_dir), hashes)
+        for name, function, kind in figures
+    ]
+    workers = min(len(args), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = list(pool.map(render, *zip(*args)))
+    else:
+        paths = [render(*arg, sources=sources) for arg in args]
+    for (name, function, _), path in zip(figures, paths):
+        built[f"{name}.{function}"] = path
+
+    for task, path in built.items():
+        manifest[task] = {"key": keys[task.split(".")[0]], "path": path}
+    save_manifest(manifest_path, manifest)
+    return built
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Rebuild the statistics report")
+    arg_parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    arg_parser.add_argument("--force", action="store_true", help="ignore the manifest")
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    built = build_report(args.data_dir, args.force)
+    for task, path in built.items():
+        print(f"{task:>45}: {path}")
+    print(f"Built {len(built)} outputs in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable
+
+import pandas as pd
+
+
+"""
+Sources = the data/ CSVs the statistics read, each parsed once into a
+columnar cache.
+
+A CSV is cached under <cache_dir>/<name>-<hash>.<ext>, the hash being the
+first 16 hex digits of the file's sha256, so an edited CSV misses the cache
+and the stale copy is removed. The cache is Parquet: pyarrow is in
+requirements.txt. An environment without it falls back to a pickled
+DataFrame (pandas' own block format, also loads without parsing).
+"""
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+SOURCES = ("airports_with_stocks", "aircraft_types", "flights")
+
+try:
+    import pyarrow  # noqa: F401
+
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "pkl"
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def source_hashes(data_dir: Path = DATA_DIR, names: Iterable[str] = SOURCES) -> Dict[str, str]:
+    return {name: file_hash(Path(data_dir) / f"{name}.csv") for name in names}
+
+
+def load_source(
+    name: str,
+    data_dir: Path = DATA_DIR,
+    cache_dir: Path = CACHE_DIR,
+    digest: str = "",
+) -> pd.DataFrame:
+    csv_path = Path(data_dir) / f"{name}.csv"
+    digest = digest or file_hash(csv_path)
+    cache_dir = Path(cache_dir)
+    cache_path = cache_dir / f"{name}-{digest}.{CACHE_FORMAT}"
+    if cache_path.exists():
+        if CACHE_FORMAT == "parquet":
+            return pd.read_parquet(cache_path)
+        return pd.read_pickle(cache_path)
+
+    df = pd.read_csv(csv_path, sep=";")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale in cache_dir.glob(f"{name}-*.{CACHE_FORMAT}"):
+        stale.unlink()
+    tmp_path = cache_path.with_suffix(".tmp")
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    tmp_path.replace(cache_path)
+    return df
+
+
+def load_sources(
+    names: Iterable[str] = SOURCES,
+    data_dir: Path = DATA_DIR,
+    cache_dir: Path = CACHE_DIR,
+    hashes: Dict[str, str] = None,
+) -> Dict[str, pd.DataFrame]:
+    hashes = hashes or {}
+    return {
+        name: load_source(name, data_dir, cache_dir, hashes.get(name, ""))
+        for name in names
+    }
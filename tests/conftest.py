@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from api_client import ApiClient  # noqa: E402
+from app import App  # noqa: E402
+from context import Context  # noqa: E402
+from simulator import LocalTransport, Simulator  # noqa: E402
+
+"""
+Shared fixtures: the bundled data parsed once per test run, and sessions
+played in-process against the local simulator.
+"""
+
+
+@pytest.fixture(scope="session")
+def context() -> Context:
+    # read only, apps get their own stock through with_stock()
+    return Context()
+
+
+@pytest.fixture(scope="session")
+def simulator(context) -> Simulator:
+    return Simulator(context=context)
+
+
+@pytest.fixture
+def make_app(context, simulator):
+    # a greedy App on a LocalTransport over the shared simulator
+    def make(transport=None, **kwargs) -> App:
+        kwargs.setdefault("mode", "greedy")
+        transport = transport or LocalTransport(simulator)
+        client = ApiClient(base_url="http://local", api_key="test", transport=transport)
+        return App(context=context.with_stock(), client=client, **kwargs)
+
+    return make
+
+
+def quiet_run(app: App, **kwargs) -> dict:
+    # App.run prints every penalty, keep the test output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return app.run(**kwargs)
+
+
+@pytest.fixture
+def play():
+    return quiet_run
+
+
+@pytest.fixture(scope="session")
+def greedy_result(context, simulator) -> dict:
+    # one uninterrupted greedy session, the reference for resumed runs
+    client = ApiClient(
+        base_url="http://local", api_key="test", transport=LocalTransport(simulator)
+    )
+    app = App(context=context.with_stock(), client=client, mode="greedy")
+    return quiet_run(app)
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from archive import CHUNK_PREFIX, FlightArchive
+from models import FlightStatus, FlightTable
+from utils import CLASS_KEYS
+
+"""
+Retired flights go through FlightArchive chunks (on disk or in memory)
+and come back out of query() as they went in.
+"""
+
+AIRPORTS = ["HUB1", "AAA", "BBB", "CCC", "DDD"]
+
+
+def retire_flights(archive: FlightArchive, n_flights: int, seed: int = 0) -> pd.DataFrame:
+    # n_flights landed flights retired in uneven batches, returns what went in
+    rng = np.random.default_rng(seed)
+    table = FlightTable(AIRPORTS, ["A320"])
+    expected = []
+    for i in range(n_flights):
+        origin, destination = rng.choice(len(AIRPORTS), 2, replace=False)
+        flight_id, number = f"flight-{i:05d}", f"AB{rng.integers(100, 120)}"
+        row = table.append(flight_id, number, origin, destination, 0, int(rng.integers(300, 3000)))
+        departure = i // 4
+        table.departure[row], table.arrival[row] = departure, departure + 3
+        table.passengers[row] = rng.integers(0, 200, len(CLASS_KEYS))
+        table.load[row] = rng.integers(0, 200, len(CLASS_KEYS))
+        table.set_status(row, FlightStatus.LANDED.value)
+        expected.append(
+            {
+                "flight_id": flight_id,
+                "flight_number": number,
+                "origin": AIRPORTS[origin],
+                "destination": AIRPORTS[destination],
+                "departure": departure,
+                **{f"{c}_passengers": table.passengers[row, ci] for ci, c in enumerate(CLASS_KEYS)},
+                **{f"{c}_kits": table.load[row, ci] for ci, c in enumerate(CLASS_KEYS)},
+            }
+        )
+        if rng.random() < 0.05:
+            archive.append(table.retire(table.rows(FlightStatus.LANDED)))
+    archive.append(table.retire(table.rows(FlightStatus.LANDED)))
+    return pd.DataFrame(expected)
+
+
+def assert_rows(frame: pd.DataFrame, expected: pd.DataFrame) -> None:
+    frame = frame.sort_values("flight_id").reset_index(drop=True)
+    expected = expected.sort_values("flight_id").reset_index(drop=True)
+    assert len(frame) == len(expected)
+    for column in expected.columns:
+        assert frame[column].tolist() == expected[column].tolist(), column
+
+
+@pytest.mark.parametrize("on_disk", [True, False])
+def test_round_trip(tmp_path, on_disk):
+    archive = FlightArchive(str(tmp_path) if on_disk else None, chunk_rows=64)
+    archive.open("session")
+    expected = retire_flights(archive, 500)
+    archive.flush()
+    assert len(archive) == archive.flushed == 500
+    assert not archive.pending and not archive.writing
+
+    files = os.listdir(tmp_path / "session") if on_disk else []
+    assert len(files) == (len(archive.chunks) if on_disk else 0)
+    assert all(name.startswith(CHUNK_PREFIX) for name in files)
+    assert_rows(archive.query(), expected)
+
+    selected = expected[
+        ((expected.origin == "AAA") | (expected.destination == "AAA"))
+        & (expected.departure >= 20)
+        & (expected.departure < 60)
+    ]
+    assert_rows(archive.query(airport="AAA", start=20, end=60), selected)
+    number = expected.flight_number.iloc[0]
+    assert_rows(
+        archive.query(flight_number=number), expected[expected.flight_number == number]
+    )
+    assert archive.query(airport="NOPE").empty
+
+    if on_disk:
+        # a finished session read back from its directory
+        read = FlightArchive.read(str(tmp_path), "session")
+        assert_rows(read.query(), expected)
+        assert_rows(read.query(airport="AAA", start=20, end=60), selected)
+
+
+def test_rows_not_written_yet_are_queried(tmp_path):
+    archive = FlightArchive(str(tmp_path), chunk_rows=10_000)
+    archive.open("session")
+    expected = retire_flights(archive, 100)
+    assert archive.flushed == 0 and len(archive) == 100
+    assert_rows(archive.query(), expected)
+
+
+def test_restore_drops_chunks_written_after_the_checkpoint(tmp_path):
+    archive = FlightArchive(str(tmp_path), chunk_rows=64)
+    archive.open("session")
+    expected = retire_flights(archive, 300)
+    archive.wait()
+    data = archive.checkpoint()
+    retire_flights(archive, 300, seed=1)
+    archive.flush()
+
+    archive.restore(data)
+    assert len(archive) == 300
+    archive.flush()
+    assert_rows(FlightArchive.read(str(tmp_path), "session").query(), expected)
+
+
+def test_read_unknown_session(tmp_path):
+    with pytest.raises(ValueError):
+        FlightArchive.read(str(tmp_path), "missing")
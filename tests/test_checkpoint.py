@@ -0,0 +1,49 @@
+import pytest
+import requests
+
+from simulator import LocalTransport
+
+"""
+A session the server drops halfway is resumed from its checkpoint and
+ends exactly where an uninterrupted one does.
+"""
+
+
+class DroppingTransport(LocalTransport):
+    # the connection is lost when round `cut` is sent, until dropping stops
+    def __init__(self, simulator, cut: int):
+        super().__init__(simulator)
+        self.cut = cut
+        self.dropping = True
+
+    def submit(self, url, headers, body=None):
+        if self.dropping and url.endswith("/play/round"):
+            if body["day"] * 24 + body["hour"] == self.cut:
+                raise requests.exceptions.ConnectionError("dropped")
+        return super().submit(url, headers, body)
+
+    def close(self):
+        # the server keeps the session open for the resumed run
+        pass
+
+
+@pytest.mark.parametrize("cut", [5, 300])
+def test_resumed_session_matches_uninterrupted(
+    make_app, play, simulator, greedy_result, tmp_path, cut
+):
+    transport = DroppingTransport(simulator, cut)
+    first = play(make_app(transport, checkpoint_dir=str(tmp_path)))
+    assert first["error"] == "dropped"
+    assert first["cost"] is None
+
+    transport.dropping = False
+    resumed = play(make_app(transport, checkpoint_dir=str(tmp_path)), resume=True)
+    assert resumed["error"] is None
+    assert resumed["cost"] == greedy_result["cost"]
+    assert resumed["penalty"] == greedy_result["penalty"]
+    assert resumed["penalties"] == greedy_result["penalties"]
+
+
+def test_resume_without_checkpoint_dir_fails(make_app, play):
+    result = play(make_app(), resume=True)
+    assert "checkpoint directory" in result["error"]
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from evaluator import Evaluator
+from models import FlightLoadDto, FlightStatus, PerClassAmount
+from utils import CLASS_KEYS, END_TIME, HUB_CODE, RLT
+
+"""
+Evaluator.evaluate() against the local simulator: every round of a
+session, with the greedy loads randomly changed, purchases and loads for
+flights that are not boarding, predicts the totalCost increment and its
+penalties.
+"""
+
+
+def perturb(state, decision, rng) -> None:
+    # changes `decision` and, as make_decision would, the state behind it
+    table = state.flights
+    for flight_load in decision.flight_loads:
+        if rng.random() < 0.3:
+            row = table.index[flight_load.flight_id]
+            kits = np.maximum(table.load[row] + rng.integers(-5, 40, len(CLASS_KEYS)), 0)
+            state.context.stock[table.origin[row]] -= kits - table.load[row]
+            table.load[row] = kits
+            flight_load.loaded_kits = PerClassAmount(*kits.tolist())
+    landed = table.rows(FlightStatus.LANDED)
+    if len(landed) and rng.random() < 0.1:
+        decision.flight_loads.append(
+            FlightLoadDto(table.ids[int(landed[0])], PerClassAmount(1, 2, 3, 4))
+        )
+    if rng.random() < 0.1 and state.time + max(RLT.values()) < END_TIME:
+        quantities = rng.integers(0, 20, len(CLASS_KEYS)).tolist()
+        decision.kit_purchasing_orders = PerClassAmount(*quantities)
+        for cls, quantity in zip(CLASS_KEYS, quantities):
+            if quantity:
+                state.inventory.insert_buying(state.time, quantity, cls, HUB_CODE)
+
+
+def test_evaluate_matches_the_charged_cost(make_app):
+    app = make_app()
+    evaluator = Evaluator(app.context)
+    rng = np.random.default_rng(1)
+    client, state = app.client, app.state
+    client.start_session()
+    last_cost = 0.0
+    while state.time < END_TIME:
+        state.init_update_state()
+        before = state.fork()
+        decision = app.decisionMaker.make_decision(state)
+        perturb(state, decision, rng)
+        predicted = evaluator.evaluate(before, decision)
+
+        response = client.receive_round(client.send_round(decision))
+        charged, last_cost = response["totalCost"] - last_cost, response["totalCost"]
+        assert predicted.total == pytest.approx(charged, rel=1e-9, abs=1e-6), state.time
+        penalties = {}
+        for penalty in response["penalties"]:
+            penalties[penalty["code"]] = penalties.get(penalty["code"], 0.0) + penalty["penalty"]
+        assert predicted.penalties.keys() == penalties.keys(), state.time
+        for code, cost in penalties.items():
+            assert predicted.penalties[code] == pytest.approx(cost, rel=1e-9, abs=1e-6)
+        state.update_state(response)
+    client.close()
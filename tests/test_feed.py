@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+
+from feed import LiveFeed
+
+"""
+LiveFeed events, without the server: the first one carries every
+airport's stock, the next ones only the airports that changed, the totals
+accumulate, and rounds dropped on a full queue are carried over.
+"""
+
+
+class Recorder:
+    # stands in for a connected client
+    def __init__(self):
+        self.events = []
+
+    def offer(self, hour, event):
+        self.events.append((hour, json.loads(event)))
+
+
+def response(total_cost, *penalties) -> dict:
+    return {
+        "totalCost": total_cost,
+        "penalties": [{"code": code, "penalty": cost} for code, cost in penalties],
+    }
+
+
+def make_feed(context, **kwargs):
+    feed = LiveFeed(context, **kwargs)
+    client = Recorder()
+    feed._clients.add(client)
+    return feed, client
+
+
+def test_events_carry_only_changed_stock(context):
+    feed, client = make_feed(context)
+    codes = context.airport_codes
+    stock = context.stock.copy()
+
+    feed._apply(0, 10.0, {"OVER_CAPACITY": [1, 5.0]}, stock.copy(), 3)
+    hour, event = client.events[-1]
+    assert hour == 0
+    assert set(event["stock"]) == set(codes)
+    assert event["stock"][codes[2]] == stock[2].tolist()
+
+    stock[2, 1] -= 4
+    stock[5, 0] += 1
+    feed._apply(1, 30.0, {"OVER_CAPACITY": [2, 7.5]}, stock.copy(), 2)
+    _, event = client.events[-1]
+    assert event["stock"] == {codes[2]: stock[2].tolist(), codes[5]: stock[5].tolist()}
+    assert event["round"] == 1
+    assert event["totalCost"] == 30.0
+    assert event["penalties"] == {"OVER_CAPACITY": {"count": 3, "cost": 12.5}}
+    assert event["penaltyCost"] == 12.5
+    assert event["flightsLoaded"] == 5
+
+    feed._apply(2, 31.0, {}, stock.copy(), 0)
+    _, event = client.events[-1]
+    assert event["stock"] == {}
+    assert [entry["round"] for entry in feed.history] == [0, 1, 2]
+
+    # a client connecting now starts from the full snapshot
+    snapshot = feed.snapshot()
+    assert snapshot["round"] == 2
+    assert snapshot["penalties"] == event["penalties"]
+
+
+def test_rounds_skipped_on_a_full_queue_are_carried(context):
+    feed, client = make_feed(context, queue_size=1)
+    stock = context.stock
+    feed.publish(0, response(10.0, ("A", 1.0)), stock, 1)
+    # the feed thread is behind: this round is skipped
+    feed.publish(1, response(20.0, ("A", 2.0), ("B", 4.0)), stock, 2)
+    assert feed.skipped == 1
+
+    feed._apply(*feed._queue.get_nowait())
+    feed.publish(2, response(35.0, ("A", 3.0)), stock, 4)
+    feed._apply(*feed._queue.get_nowait())
+
+    _, event = client.events[-1]
+    assert event["round"] == 2
+    assert event["totalCost"] == 35.0
+    assert event["penalties"] == {
+        "A": {"count": 3, "cost": 6.0},
+        "B": {"count": 1, "cost": 4.0},
+    }
+    assert event["flightsLoaded"] == 7
+    np.testing.assert_array_equal(feed._stock, stock)
@@ -0,0 +1,82 @@
+import numpy as np
+
+from models import FlightStatus
+from utils import CLASS_KEYS
+
+"""
+State.fork() / DecisionMaker.what_if() during a live session: whatever a
+fork does, the parent state and the session's result stay the same.
+"""
+
+
+def snapshot(state) -> dict:
+    inventory, table = state.inventory, state.flights
+    return {
+        "time": state.time,
+        "stock": state.context.stock.copy(),
+        "slots": np.stack(inventory.slots),
+        "pending": inventory.pending(state.time, state.time + inventory.horizon),
+        "inventory_time": inventory.time,
+        "load": table.load[: table.size].copy(),
+        "loaded": table.loaded[: table.size].copy(),
+        "changed_rows": list(state.changed_rows),
+    }
+
+
+def assert_same(before: dict, after: dict) -> None:
+    assert before.keys() == after.keys()
+    for key, value in before.items():
+        np.testing.assert_array_equal(after[key], value, err_msg=key)
+
+
+def test_forks_leave_the_session_unchanged(make_app, play, greedy_result):
+    app = make_app()
+    decision_maker = app.decisionMaker
+    make_decision = decision_maker.make_decision
+    checked = []
+
+    def checking_make_decision(state, planned=None):
+        if state is app.state and state.time in (30, 150, 400):
+            before = snapshot(state)
+            for hours in (0, 5, 48):
+                child = decision_maker.what_if(state, hours=hours)
+                assert child.inventory.time >= state.time + hours
+            # a fork changed every way a decision can change it
+            child = state.fork()
+            child.context.stock[:] += 1
+            hub = child.context.airport_codes[0]
+            child.inventory.insert(child.time + 2, 7, "economy", hub)
+            child.inventory.insert_buying(child.time, 3, CLASS_KEYS[0], hub)
+            child.inventory.process(child.time + 10)
+            child.flights.load[: child.flights.size] += 1
+            child.flights.loaded[: child.flights.size] = True
+            assert_same(before, snapshot(state))
+            checked.append(state.time)
+        return make_decision(state, planned)
+
+    decision_maker.make_decision = checking_make_decision
+    result = play(app)
+    assert result["error"] is None
+    assert checked == [30, 150, 400]
+    assert result["cost"] == greedy_result["cost"]
+    assert result["penalties"] == greedy_result["penalties"]
+
+
+def test_what_if_applies_the_decision_to_the_fork(make_app):
+    app = make_app()
+    app.client.start_session()
+    state = app.state
+    # run to the first round with flights boarding
+    while True:
+        state.init_update_state()
+        checked_in = state.flights.rows(FlightStatus.CHECKED_IN)
+        boarding = checked_in[~state.flights.loaded[checked_in]]
+        if len(boarding):
+            break
+        decision = app.decisionMaker.make_decision(state)
+        state.update_state(app.client.receive_round(app.client.send_round(decision)))
+
+    child = app.decisionMaker.what_if(state)
+    assert not state.flights.loaded[boarding].any()
+    assert child.flights.loaded[boarding].any()
+    app.client.close()
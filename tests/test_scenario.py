@@ -0,0 +1,52 @@
+import filecmp
+import os
+
+import pytest
+
+from scenario import ScenarioConfig, generate
+from simulator import Simulator
+
+"""
+The scenario generator is seeded: a seed always writes the same files,
+and the files load like the bundled data.
+"""
+
+SMALL = dict(airports=20, hubs=2, flights=500, days=3)
+FILES = ["airports_with_stocks.csv", "aircraft_types.csv", "flight_plan.csv", "flights.csv"]
+
+
+def test_same_seed_same_files(tmp_path):
+    first = generate(ScenarioConfig(seed=7, **SMALL), str(tmp_path / "first"))
+    second = generate(ScenarioConfig(seed=7, **SMALL), str(tmp_path / "second"))
+    assert first == second
+    assert sorted(first) == sorted(FILES)
+    match, mismatch, errors = filecmp.cmpfiles(
+        tmp_path / "first", tmp_path / "second", FILES, shallow=False
+    )
+    assert sorted(match) == sorted(FILES)
+
+
+def test_other_seed_other_flights(tmp_path):
+    generate(ScenarioConfig(seed=7, **SMALL), str(tmp_path / "first"))
+    generate(ScenarioConfig(seed=8, **SMALL), str(tmp_path / "second"))
+    assert not filecmp.cmp(
+        tmp_path / "first" / "flights.csv", tmp_path / "second" / "flights.csv", shallow=False
+    )
+
+
+def test_scenario_loads(tmp_path):
+    written = generate(ScenarioConfig(seed=0, **SMALL), str(tmp_path))
+    assert written["airports_with_stocks.csv"] == SMALL["airports"]
+    assert all(os.path.getsize(tmp_path / name) for name in FILES)
+    simulator = Simulator(data_dir=str(tmp_path))
+    assert len(simulator.airport_dict) == SMALL["airports"]
+    assert len(simulator.flights) > 0
+
+
+@pytest.mark.parametrize(
+    "config",
+    [dict(hubs=0), dict(airports=2, hubs=2), dict(flights=0), dict(trunk_share=1.0)],
+)
+def test_invalid_config(config):
+    with pytest.raises(ValueError):
+        ScenarioConfig(**config)
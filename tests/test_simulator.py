@@ -0,0 +1,45 @@
+import pytest
+
+from simulator import SimulatorError
+
+"""
+The local simulator replays data/flights.csv: a greedy session against it
+always lands on the same cost.
+"""
+
+# Last Cost / penalties of the greedy decision maker on the bundled data
+GREEDY_COST = 489_749_864.62
+GREEDY_PENALTY = 298_297_400.00
+GREEDY_PENALTIES = {"UNFULFILLED_PASSENGERS": 14565, "OVER_CAPACITY": 61}
+
+
+def test_greedy_session_cost(greedy_result):
+    assert greedy_result["error"] is None
+    assert greedy_result["cost"] == pytest.approx(GREEDY_COST, abs=0.01)
+    assert greedy_result["penalty"] == pytest.approx(GREEDY_PENALTY, abs=0.01)
+    assert greedy_result["penalties"] == GREEDY_PENALTIES
+
+
+def empty_round(day: int, hour: int) -> dict:
+    return {"day": day, "hour": hour, "flightLoads": [], "kitPurchasingOrders": None}
+
+
+def test_rounds_are_played_in_order(simulator):
+    session = simulator.new_session()
+    first = session.play_round(empty_round(0, 0))
+    # a retransmitted round gets the same answer, it is not played twice
+    assert session.play_round(empty_round(0, 0)) is first
+    with pytest.raises(SimulatorError) as error:
+        session.play_round(empty_round(0, 5))
+    assert error.value.status == 400
+
+
+def test_load_for_a_flight_not_boarding_is_penalised(simulator):
+    session = simulator.new_session()
+    body = empty_round(0, 0)
+    body["flightLoads"] = [
+        {"flightId": "no-such-flight", "loadedKits": {"first": 1, "economy": 2}}
+    ]
+    response = session.play_round(body)
+    codes = [penalty["code"] for penalty in response["penalties"]]
+    assert "INCORRECT_FLIGHT_LOAD" in codes
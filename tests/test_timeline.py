@@ -0,0 +1,109 @@
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from inventory import Inventory
+from timeline import StockTimeline
+from utils import CLASS_KEYS
+
+"""
+StockTimeline against a brute force replay of its deltas, and the
+Inventory's timeline against its own stock and pending arrivals.
+"""
+
+
+class BruteTimeline:
+    # every delta kept, every answer a scan over the hours
+    def __init__(self, stock: np.ndarray):
+        self.stock = stock.astype(np.int64)
+        self.deltas = defaultdict(int)
+
+    def add(self, ai, ci, hour, quantity):
+        self.deltas[ai, ci, hour] += quantity
+
+    def projected(self, ai, ci, hour):
+        changes = sum(q for (a, c, h), q in self.deltas.items() if (a, c) == (ai, ci) and h <= hour)
+        return int(self.stock[ai, ci]) + changes
+
+    def first(self, ai, ci, t0, t1, test):
+        return next((h for h in range(t0, t1) if test(self.projected(ai, ci, h))), None)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_queries_match_brute_force(seed):
+    rng = random.Random(seed)
+    n_airports, window = 3, 32
+    stock = np.array([[rng.randrange(0, 50) for _ in CLASS_KEYS] for _ in range(n_airports)])
+    capacity = np.full(stock.shape, 60)
+    timeline = StockTimeline(stock, capacity, window=window)
+    brute = BruteTimeline(stock)
+
+    now = 0
+    for step in range(300):
+        # deltas from a little in the past to the end of the window
+        ai, ci = rng.randrange(n_airports), rng.randrange(len(CLASS_KEYS))
+        hour = rng.randrange(max(now - 3, 0), now + window)
+        quantity = rng.randrange(-20, 25)
+        timeline.add(ai, ci, hour, quantity)
+        brute.add(ai, ci, hour, quantity)
+        if step % 10 == 9:
+            now += rng.randrange(0, 12)
+            timeline.advance(now)
+
+        ai, ci = rng.randrange(n_airports), rng.randrange(len(CLASS_KEYS))
+        t0 = rng.randrange(now, now + window)
+        t1 = rng.randrange(t0 + 1, now + window + 1)
+        assert timeline.projected(ai, ci, t0) == brute.projected(ai, ci, t0)
+        values = [brute.projected(ai, ci, h) for h in range(t0, t1)]
+        assert timeline.min_stock(ai, ci, t0, t1) == min(values)
+        assert timeline.max_stock(ai, ci, t0, t1) == max(values)
+        # past the window the stock no longer changes, the brute scan can stop there
+        end = now + window
+        assert timeline.first_overflow(ai, ci, t0) == brute.first(
+            ai, ci, t0, end, lambda v: v > 60
+        )
+        assert timeline.first_shortage(ai, ci, t0, level=10) == brute.first(
+            ai, ci, t0, end, lambda v: v < 10
+        )
+
+
+def test_add_beyond_the_window_is_rejected():
+    timeline = StockTimeline(np.zeros((1, 4)), np.ones((1, 4)), window=16)
+    with pytest.raises(ValueError):
+        timeline.add(0, 0, 16, 1)
+    with pytest.raises(ValueError):
+        StockTimeline(np.zeros((1, 4)), np.ones((1, 4)), window=10)
+
+
+def test_fork_does_not_change_the_parent():
+    timeline = StockTimeline(np.zeros((1, 4)), np.full((1, 4), 5), window=16)
+    timeline.add(0, 0, 3, 4)
+    child = timeline.fork()
+    child.add(0, 0, 5, 10)
+    child.add(0, 1, 2, 7)
+    assert child.first_overflow(0, 0, 0) == 5
+    assert timeline.first_overflow(0, 0, 0) is None
+    assert timeline.projected(0, 1, 10) == 0
+
+
+def test_inventory_timeline_follows_stock_and_arrivals(context):
+    rng = random.Random(3)
+    inventory = Inventory(context.with_stock())
+    codes = context.airport_codes
+    for step in range(200):
+        for _ in range(4):
+            hour = inventory.time + rng.randrange(-2, inventory.horizon)
+            inventory.insert(hour, rng.randrange(1, 9), rng.choice(CLASS_KEYS), rng.choice(codes))
+        if step % 5 == 4:
+            inventory.process(inventory.time + rng.randrange(0, 4))
+        if step % 50 == 49:
+            inventory.restore(inventory.checkpoint())
+
+        stock, now = inventory.context.stock, inventory.time
+        for _ in range(5):
+            ai, ci = rng.randrange(len(codes)), rng.randrange(len(CLASS_KEYS))
+            hour = now + rng.randrange(0, inventory.horizon)
+            expected = stock[ai, ci] + inventory.pending(now, hour + 1)[ai, ci]
+            assert inventory.timeline.projected(ai, ci, hour) == expected